@@ -8,11 +8,13 @@ import logging
 from logging.handlers import RotatingFileHandler
 
 # Import from modular structure
-from flask_app.models import db, User, ResearchBrief, Todo, SubTask, Event, Project, Goal, ProjectNote, ProjectLink, Song, MusicImportJob, Playlist
+from flask_app.models import db, User, ResearchBrief, Todo, SubTask, Event, Project, Goal, ProjectNote, ProjectLink, Song, MusicImportJob, Playlist, SpotifySyncJob, PdfBlob
 from flask_app.routes import init_routes
 from flask_app.utils.logging_config import setup_logging
 from flask_app.utils.error_handler import init_error_alerting
 from flask_app.utils.monitoring import init_monitoring
+from flask_app.utils.spotify_client import spotify_client_manager
+from flask_app.utils.research_jobs import recover_research_jobs
 from config import DevelopmentConfig, ProductionConfig, TestingConfig
 from config.monitoring import DevelopmentMonitoringConfig, ProductionMonitoringConfig, TestingMonitoringConfig
 
@@ -50,10 +52,20 @@ app.extensions['login_manager'] = login_manager
 setup_logging(app)
 init_error_alerting(app)
 init_monitoring(app)
+spotify_client_manager.init_app(app)
 
 # Create the database tables
 with app.app_context():
     db.create_all()
+    # Fail background jobs a previous process left behind so they can be resumed
+    SpotifySyncJob.fail_stale()
+
+# Requeue or fail research imports a previous process left unfinished
+recover_research_jobs(app)
+
+# Repair PDF reference counts and remove stored PDFs nothing references
+with app.app_context():
+    PdfBlob.collect_garbage()
 
 # User loader callback for Flask-Login
 @login_manager.user_loader
@@ -18,16 +18,42 @@ class Config:
     # OpenAI configuration
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4-turbo')
+    LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'  # Reuse briefs for text already summarized
+    LLM_CACHE_MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # Least recently used responses are evicted beyond this
     
     # File upload configuration
     MAX_CONTENT_LENGTH = 25 * 1024 * 1024  # 25 MB
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')  # Optional, for temporary storage if needed
+    PDF_STORE_FOLDER = os.environ.get('PDF_STORE_FOLDER')  # Content-addressed research PDF store; defaults to <UPLOAD_FOLDER>/pdf_store
+    RESEARCH_CONCURRENCY = int(os.environ.get('RESEARCH_CONCURRENCY', 4))  # PDFs extracted and summarized at once
+    RESEARCH_CHUNK_SIZE = int(os.environ.get('RESEARCH_CHUNK_SIZE', 100000))  # Characters per part when a document is too long for one OpenAI request
+    RESEARCH_SUMMARY_WORKERS = int(os.environ.get('RESEARCH_SUMMARY_WORKERS', 4))  # Parts of one document summarized at once
+    RESEARCH_JOB_LEASE_SECONDS = int(os.environ.get('RESEARCH_JOB_LEASE_SECONDS', 900))  # Running import jobs without a stage change this long are failed at startup
+    PDF_EXTRACT_BACKEND = os.environ.get('PDF_EXTRACT_BACKEND', 'auto')  # auto, pdfium (fast) or pdfplumber (layout-aware)
+    PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))  # Processes for page extraction
+    PDF_EXTRACT_PAGES_PER_TASK = int(os.environ.get('PDF_EXTRACT_PAGES_PER_TASK', 8))
+    PDF_EXTRACT_MIN_PARALLEL_PAGES = int(os.environ.get('PDF_EXTRACT_MIN_PARALLEL_PAGES', 16))  # Shorter PDFs are extracted in-process
+    PDF_EXTRACT_TIME_BUDGET = float(os.environ.get('PDF_EXTRACT_TIME_BUDGET', 120))  # Seconds per document before giving up on remaining pages
     
     # Spotify OAuth configuration
     SPOTIPY_CLIENT_ID = os.environ.get('SPOTIPY_CLIENT_ID')
     SPOTIPY_CLIENT_SECRET = os.environ.get('SPOTIPY_CLIENT_SECRET')
     SPOTIPY_REDIRECT_URI = os.environ.get('SPOTIPY_REDIRECT_URI', 'http://127.0.0.1:5000/music/spotify/callback')
     SPOTIPY_SCOPE = os.environ.get('SPOTIPY_SCOPE', 'playlist-modify-public,playlist-modify-private,playlist-read-private,playlist-read-collaborative')
+    
+    # Shared Spotify HTTP client (see flask_app/utils/spotify_client.py)
+    SPOTIFY_API_URL = os.environ.get('SPOTIFY_API_URL')  # Override to point at a stand-in server, e.g. http://127.0.0.1:8001/v1/
+    SPOTIFY_TOKEN_URL = os.environ.get('SPOTIFY_TOKEN_URL')  # Override for token refreshes, e.g. http://127.0.0.1:8001/api/token
+    SPOTIFY_POOL_SIZE = int(os.environ.get('SPOTIFY_POOL_SIZE', 10))  # Keep-alive connections to api.spotify.com
+    SPOTIFY_REQUEST_TIMEOUT = int(os.environ.get('SPOTIFY_REQUEST_TIMEOUT', 10))  # Seconds
+    SPOTIFY_REQUEST_RETRIES = int(os.environ.get('SPOTIFY_REQUEST_RETRIES', 3))
+    SPOTIFY_RATE_LIMIT = float(os.environ.get('SPOTIFY_RATE_LIMIT', 10))  # Requests per second, shared by the process
+    SPOTIFY_RATE_BURST = int(os.environ.get('SPOTIFY_RATE_BURST', 20))
+    SPOTIFY_BACKGROUND_RESERVE = int(os.environ.get('SPOTIFY_BACKGROUND_RESERVE', 5))  # Tokens only interactive calls may use
+    SPOTIFY_MAX_RETRY_AFTER = int(os.environ.get('SPOTIFY_MAX_RETRY_AFTER', 60))  # Fail instead of waiting longer than this
+    SPOTIFY_IMPORT_WORKERS = int(os.environ.get('SPOTIFY_IMPORT_WORKERS', 4))  # Concurrent page fetches per import
+    SPOTIFY_ENRICH_WORKERS = int(os.environ.get('SPOTIFY_ENRICH_WORKERS', 2))  # Audio-feature calls in flight per enrichment job
+    SPOTIFY_JOB_LEASE_SECONDS = int(os.environ.get('SPOTIFY_JOB_LEASE_SECONDS', 300))  # Queued/running jobs without progress this long are failed
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -7,7 +7,11 @@ from .base import db, BaseModel
 from .user import User
 from .admin import AdminLog, SystemMetrics
 from .research_brief import ResearchBrief
+from .pdf_blob import PdfBlob
+from .research_import_job import ResearchImportJob
 from .tag import Tag
+from .user_tag_count import UserTagCount
+from .llm_response_cache import LlmResponseCache
 from .todo import Todo, SubTask, Event
 from .project import Project, project_research_briefs
 from .goal import Goal
@@ -17,5 +21,6 @@ from .song import Song
 from .music_import_job import MusicImportJob
 from .playlist import Playlist, playlist_songs
 from .spotify_auth import SpotifyAuth
+from .spotify_sync_job import SpotifySyncJob
 
-__all__ = ['db', 'BaseModel', 'User', 'AdminLog', 'SystemMetrics', 'ResearchBrief', 'Tag', 'Todo', 'SubTask', 'Event', 'Project', 'project_research_briefs', 'Goal', 'ProjectNote', 'ProjectLink', 'Song', 'MusicImportJob', 'Playlist', 'playlist_songs', 'SpotifyAuth']
+__all__ = ['db', 'BaseModel', 'User', 'AdminLog', 'SystemMetrics', 'ResearchBrief', 'PdfBlob', 'ResearchImportJob', 'Tag', 'UserTagCount', 'LlmResponseCache', 'Todo', 'SubTask', 'Event', 'Project', 'project_research_briefs', 'Goal', 'ProjectNote', 'ProjectLink', 'Song', 'MusicImportJob', 'Playlist', 'playlist_songs', 'SpotifyAuth', 'SpotifySyncJob']
@@ -83,3 +83,19 @@ class SystemMetrics(BaseModel):
             db.session.rollback()
             current_app.logger.error(f"Error setting metric {metric_name}: {str(e)}")
             return False
+    
+    @staticmethod
+    def increment_metric(metric_name, amount=1):
+        """Add to a counter metric in one statement, so concurrent requests and jobs never lose updates"""
+        try:
+            SystemMetrics.upsert(
+                {'metric_name': metric_name, 'metric_value': amount},
+                ['metric_name'],
+                {'metric_value': SystemMetrics.__table__.c.metric_value + amount}
+            )
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error incrementing metric {metric_name}: {str(e)}")
+            return False
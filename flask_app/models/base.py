@@ -14,6 +14,35 @@ class BaseModel(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
     
+    @classmethod
+    def upsert(cls, values, index_elements, set_):
+        """
+        Insert a row, or update the existing one on a unique key conflict, in one statement.
+        
+        Runs INSERT ... ON CONFLICT (index_elements) DO UPDATE SET set_ in the
+        PostgreSQL or SQLite dialect, so concurrent writers of the same key
+        never race between a check and an insert. created_at and updated_at
+        are filled in unless given. Runs in the current transaction (not
+        committed).
+        
+        Args:
+            values: Column values for a new row
+            index_elements: Column names of the unique key the row may collide on
+            set_: Column values for an existing row; may refer to its current
+                values, e.g. {'hits': cls.__table__.c.hits + 1}
+        """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        
+        now = datetime.now(timezone.utc)
+        values = {'created_at': now, 'updated_at': now, **values}
+        set_ = {'updated_at': now, **set_}
+        return db.session.execute(
+            insert(cls.__table__).values(**values).on_conflict_do_update(index_elements=index_elements, set_=set_)
+        )
+    
     @classmethod
     def safe_create(cls, **kwargs):
         """Safely create a new record with error handling"""
@@ -0,0 +1,163 @@
+# flask_app/models/llm_response_cache.py
+
+import re
+import json
+import hashlib
+from datetime import datetime, timezone
+from .base import db, BaseModel
+
+class LlmResponseCache(BaseModel):
+    """A parsed OpenAI response, keyed by model, prompt template version and input text"""
+    __tablename__ = 'llm_response_cache'
+    __table_args__ = (
+        db.UniqueConstraint('model', 'prompt_version', 'text_sha256', name='uq_llm_response_cache_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    model = db.Column(db.String(100), nullable=False)
+    prompt_version = db.Column(db.Integer, nullable=False)
+    text_sha256 = db.Column(db.String(64), nullable=False)  # Hash of the normalized input text
+    response = db.Column(db.Text, nullable=False)  # JSON of the parsed response
+    size = db.Column(db.Integer, nullable=False, default=0)  # Bytes of response, for the size bound
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    last_used_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+
+    def __repr__(self):
+        return f'<LlmResponseCache {self.model} v{self.prompt_version} {self.text_sha256[:12]}: {self.hit_count} hits>'
+
+    @staticmethod
+    def hash_text(text):
+        """SHA-256 of text with whitespace runs collapsed, so re-extracted or re-pasted copies match"""
+        normalized = re.sub(r'\s+', ' ', text or '').strip()
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def lookup(model, prompt_version, text):
+        """
+        Find a cached response and record the hit or miss.
+
+        A hit bumps the entry's hit count and last-used time (for LRU eviction)
+        and adds the tokens the original call used to llm_cache_tokens_saved.
+        Errors are logged and reported as a miss, so a broken cache never
+        blocks generation.
+
+        Returns:
+            Parsed response dict, or None on a miss
+        """
+        from .admin import SystemMetrics
+        try:
+            entry = LlmResponseCache.query.filter_by(
+                model=model, prompt_version=prompt_version, text_sha256=LlmResponseCache.hash_text(text)
+            ).first()
+            if entry is None:
+                SystemMetrics.increment_metric('llm_cache_misses')
+                return None
+
+            data = json.loads(entry.response)
+            db.session.execute(
+                LlmResponseCache.__table__.update()
+                .where(LlmResponseCache.__table__.c.id == entry.id)
+                .values(hit_count=LlmResponseCache.__table__.c.hit_count + 1, last_used_at=datetime.now(timezone.utc))
+            )
+            db.session.commit()
+            SystemMetrics.increment_metric('llm_cache_hits')
+            SystemMetrics.increment_metric('llm_cache_tokens_saved', entry.prompt_tokens + entry.completion_tokens)
+            return data
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error reading LLM response cache: {str(e)}")
+            return None
+
+    @staticmethod
+    def store(model, prompt_version, text, data, prompt_tokens=0, completion_tokens=0, max_bytes=None):
+        """
+        Cache a parsed response, then evict least recently used entries beyond max_bytes.
+
+        Two jobs generating the same text at once both upsert the same key
+        (INSERT ... ON CONFLICT DO UPDATE) instead of colliding.
+
+        Returns:
+            Tuple of (success, error_message)
+        """
+        try:
+            response = json.dumps(data)
+            now = datetime.now(timezone.utc)
+            values = {
+                'response': response,
+                'size': len(response.encode('utf-8')),
+                'prompt_tokens': prompt_tokens or 0,
+                'completion_tokens': completion_tokens or 0,
+                'last_used_at': now,
+            }
+
+            LlmResponseCache.upsert(
+                dict(values, model=model, prompt_version=prompt_version,
+                     text_sha256=LlmResponseCache.hash_text(text), hit_count=0),
+                ['model', 'prompt_version', 'text_sha256'],
+                values
+            )
+            db.session.commit()
+
+            if max_bytes:
+                LlmResponseCache.evict(max_bytes)
+            return True, None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error writing LLM response cache: {str(e)}")
+            return False, str(e)
+
+    @staticmethod
+    def evict(max_bytes):
+        """
+        Delete least recently used entries until the cached responses fit in max_bytes.
+
+        Returns:
+            Tuple of (removed_count, error_message)
+        """
+        try:
+            cache = LlmResponseCache.__table__
+            total = db.session.execute(db.select(db.func.coalesce(db.func.sum(cache.c.size), 0))).scalar()
+            if total <= max_bytes:
+                return 0, None
+
+            evicted = []
+            for entry_id, size in db.session.execute(
+                db.select(cache.c.id, cache.c.size).order_by(cache.c.last_used_at, cache.c.id)
+            ):
+                if total <= max_bytes:
+                    break
+                evicted.append(entry_id)
+                total -= size
+
+            db.session.execute(cache.delete().where(cache.c.id.in_(evicted)))
+            db.session.commit()
+            return len(evicted), None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error evicting LLM response cache entries: {str(e)}")
+            return 0, str(e)
+
+    @staticmethod
+    def get_stats():
+        """Cache size and the hit, miss and tokens-saved counters"""
+        from .admin import SystemMetrics
+        cache = LlmResponseCache.__table__
+        entries, size = db.session.execute(
+            db.select(db.func.count(), db.func.coalesce(db.func.sum(cache.c.size), 0)).select_from(cache)
+        ).one()
+        hits = SystemMetrics.get_metric('llm_cache_hits')
+        misses = SystemMetrics.get_metric('llm_cache_misses')
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'size': size,
+            'hits': int(hits),
+            'misses': int(misses),
+            'hit_rate': round(hits / lookups, 3) if lookups else 0,
+            'tokens_saved': int(SystemMetrics.get_metric('llm_cache_tokens_saved')),
+        }
@@ -0,0 +1,168 @@
+# flask_app/models/pdf_blob.py
+
+import os
+import time
+from .base import db, BaseModel
+
+class PdfBlob(BaseModel):
+    """A PDF in the content-addressed store, with the number of research briefs that reference it"""
+    __tablename__ = 'pdf_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)  # Content hash; also names the file in the store
+    size = db.Column(db.Integer, nullable=False, default=0)  # Bytes
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # Briefs pointing at this PDF
+
+    def __repr__(self):
+        return f'<PdfBlob {self.sha256[:12]}: {self.ref_count} refs>'
+
+    def path(self):
+        """Absolute path of the stored file"""
+        from flask_app.utils.pdf_store import blob_path
+        return blob_path(self.sha256)
+
+    @staticmethod
+    def acquire(pdf_data):
+        """
+        Store a PDF and add a reference to it as part of the current transaction.
+
+        The reference is counted first and the file written (or found already
+        present) after, so a purge that removed the file just before the
+        upsert cannot leave the new reference without one: the upsert waits
+        for that purge to commit, and the write then puts the file back. The
+        count is a single upsert, so two first uploads of the same PDF cannot
+        both insert the row. If the transaction is rolled back the file stays
+        unreferenced until collect_garbage removes it.
+
+        Returns:
+            Tuple of (sha256, error_message)
+        """
+        try:
+            from flask_app.utils.pdf_store import hash_pdf, write_blob
+            digest = hash_pdf(pdf_data)
+
+            PdfBlob.upsert(
+                {'sha256': digest, 'size': len(pdf_data), 'ref_count': 1},
+                ['sha256'],
+                {'ref_count': PdfBlob.__table__.c.ref_count + 1}
+            )
+            write_blob(pdf_data, digest)
+            return digest, None
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Error storing PDF: {str(e)}")
+            return None, str(e)
+
+    @staticmethod
+    def release(digest, count=1):
+        """Drop count references to a stored PDF as part of the current transaction (the file is removed by purge)"""
+        if not digest:
+            return
+        db.session.execute(
+            PdfBlob.__table__.update()
+            .where(PdfBlob.__table__.c.sha256 == digest)
+            .values(ref_count=PdfBlob.__table__.c.ref_count - count)
+        )
+
+    @staticmethod
+    def purge(digests):
+        """
+        Delete blobs among digests that no brief references any more, and their files.
+
+        The row is deleted only while its count is still zero, so a PDF that was
+        uploaded again in the meantime keeps its file. The file is removed
+        before the delete commits: an acquire of the same PDF blocks on the
+        row until then, and rewrites the file after its upsert.
+
+        Returns:
+            Tuple of (removed_count, error_message)
+        """
+        try:
+            from flask_app.utils.pdf_store import remove_blob
+            blobs = PdfBlob.__table__
+            removed = 0
+            for digest in set(filter(None, digests)):
+                result = db.session.execute(
+                    blobs.delete().where(blobs.c.sha256 == digest, blobs.c.ref_count <= 0)
+                )
+                if result.rowcount:
+                    remove_blob(digest)
+                    removed += 1
+                db.session.commit()
+            return removed, None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error purging unreferenced PDFs: {str(e)}")
+            return 0, str(e)
+
+    @staticmethod
+    def recompute_ref_counts():
+        """
+        Recompute ref_count from research_briefs.
+
+        Repairs drift caused by briefs removed without going through
+        ResearchBrief.safe_delete or User.safe_delete (manual SQL, a crash
+        between a commit and the purge that follows it).
+
+        Returns:
+            Tuple of (updated_row_count, error_message)
+        """
+        try:
+            from .research_brief import ResearchBrief
+            blobs = PdfBlob.__table__
+            ref_count = db.select(db.func.count())\
+                .select_from(ResearchBrief.__table__)\
+                .where(ResearchBrief.__table__.c.pdf_sha256 == blobs.c.sha256)\
+                .scalar_subquery()
+
+            result = db.session.execute(
+                blobs.update().values(ref_count=ref_count, updated_at=blobs.c.updated_at)
+            )
+            db.session.commit()
+            return result.rowcount, None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error recomputing PDF reference counts: {str(e)}")
+            return 0, str(e)
+
+    @staticmethod
+    def collect_garbage(min_age=3600):
+        """
+        Recompute reference counts, then remove unreferenced blobs and any
+        file in the store that has no blob row (left by rolled-back uploads).
+
+        Files without a row are only removed once they are min_age seconds
+        old, so uploads still being saved are left alone.
+
+        Returns:
+            Tuple of (removed_count, error_message)
+        """
+        from flask_app.utils.pdf_store import get_store_root, remove_blob
+
+        _, error = PdfBlob.recompute_ref_counts()
+        if error:
+            return 0, error
+
+        unreferenced = [digest for (digest,) in db.session.query(PdfBlob.sha256).filter(PdfBlob.ref_count <= 0)]
+        removed, error = PdfBlob.purge(unreferenced)
+        if error:
+            return removed, error
+
+        try:
+            root = get_store_root()
+            known = {digest for (digest,) in db.session.query(PdfBlob.sha256)}
+            cutoff = time.time() - min_age
+            for directory, _, filenames in os.walk(root):
+                for filename in filenames:
+                    digest, extension = os.path.splitext(filename)
+                    if extension != '.pdf' or digest in known:
+                        continue
+                    if os.path.getmtime(os.path.join(directory, filename)) < cutoff:
+                        remove_blob(digest)
+                        removed += 1
+            return removed, None
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Error removing orphaned PDF files: {str(e)}")
+            return removed, str(e)
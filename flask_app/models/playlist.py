@@ -2,6 +2,16 @@
 
 from .base import db, BaseModel
 from sqlalchemy import Index
+from datetime import datetime, timezone
+import json
+
+# Spacing between consecutive song positions. Leaving gaps lets a single song be
+# moved by rewriting only its own row; the playlist is rebalanced when a gap closes.
+POSITION_GAP = 1024
+
+# Songs whose positions are written per UPDATE ... CASE. Each song takes two bind
+# variables (its WHEN and its IN entry); this keeps a statement under SQLite's 999 limit.
+POSITION_WRITE_CHUNK = 400
 
 # Association table for many-to-many relationship between Playlist and Song
 playlist_songs = db.Table(
@@ -26,6 +36,15 @@ class Playlist(BaseModel):
     # Spotify integration fields
     spotify_playlist_id = db.Column(db.String(255), nullable=True)
     spotify_synced_at = db.Column(db.DateTime, nullable=True)
+    spotify_snapshot_id = db.Column(db.String(255), nullable=True)  # Spotify snapshot after last sync
+    spotify_synced_tracks = db.Column(db.Text, nullable=True)  # JSON list of track URIs as last synced
+    
+    # Denormalized counters, maintained by add/remove operations (see recompute_counters)
+    song_count = db.Column(db.Integer, nullable=False, default=0)
+    total_duration_ms = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    # Compiled smart playlist rule set (JSON); NULL for regular playlists
+    smart_rules = db.Column(db.Text, nullable=True)
     
     # Relationship to User
     user = db.relationship('User', backref=db.backref('playlists', lazy='dynamic', cascade='all, delete-orphan'))
@@ -48,31 +67,99 @@ class Playlist(BaseModel):
             'user_id': self.user_id,
             'name': self.name,
             'description': self.description,
-            'song_count': self.songs.count(),
+            'song_count': self.song_count or 0,
+            'total_duration_ms': self.total_duration_ms or 0,
             'spotify_playlist_id': self.spotify_playlist_id,
             'spotify_synced_at': self.spotify_synced_at.isoformat() if self.spotify_synced_at else None,
             'is_synced_to_spotify': self.is_synced_to_spotify(),
+            'is_smart': self.is_smart(),
+            'smart_rules': json.loads(self.smart_rules) if self.smart_rules else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
     
+    def is_smart(self):
+        """Check if playlist is a rule-based smart playlist"""
+        return bool(self.smart_rules)
+    
     def is_synced_to_spotify(self):
         """Check if playlist is synced to Spotify"""
         return self.spotify_playlist_id is not None and self.spotify_playlist_id != ''
     
+    def get_spotify_synced_tracks(self):
+        """Get the track URIs as they were at the last Spotify sync (empty list if unknown)"""
+        if not self.spotify_synced_tracks:
+            return []
+        try:
+            return json.loads(self.spotify_synced_tracks)
+        except (TypeError, ValueError):
+            return []
+    
+    def mark_spotify_synced(self, spotify_playlist_id, snapshot_id, track_uris):
+        """Record the Spotify playlist, snapshot and track list after a successful sync"""
+        return self.safe_update(
+            spotify_playlist_id=spotify_playlist_id,
+            spotify_snapshot_id=snapshot_id,
+            spotify_synced_tracks=json.dumps(list(track_uris)),
+            spotify_synced_at=datetime.now(timezone.utc)
+        )
+    
     def get_total_duration_ms(self):
-        """Calculate total duration of all songs in playlist in milliseconds"""
+        """Get total duration of all songs in playlist in milliseconds"""
+        return self.total_duration_ms or 0
+    
+    def _adjust_counters(self, song_delta, duration_delta):
+        """Atomically adjust the denormalized counters as part of the current transaction"""
+        self.song_count = Playlist.song_count + song_delta
+        self.total_duration_ms = Playlist.total_duration_ms + duration_delta
+    
+    @staticmethod
+    def recompute_counters(playlist_ids=None):
+        """
+        Recompute song_count and total_duration_ms from playlist_songs.
+        
+        Repairs drift caused by changes made outside the model methods (for example
+        songs deleted from the library, which cascade out of playlist_songs).
+        
+        Args:
+            playlist_ids: Optional list of playlist IDs to repair (all playlists if None)
+        
+        Returns:
+            Tuple of (updated_row_count, error_message)
+        """
         try:
-            from flask_app.models import Song
-            total = db.session.query(db.func.sum(Song.duration_ms))\
-                .join(playlist_songs)\
-                .filter(playlist_songs.c.playlist_id == self.id)\
-                .scalar()
-            return total or 0
+            updated = Playlist._write_counters(playlist_ids)
+            db.session.commit()
+            return updated, None
         except Exception as e:
+            db.session.rollback()
             from flask import current_app
-            current_app.logger.error(f"Error calculating playlist duration: {str(e)}")
-            return 0
+            current_app.logger.error(f"Error recomputing playlist counters: {str(e)}")
+            return 0, str(e)
+    
+    @staticmethod
+    def _write_counters(playlist_ids=None):
+        """Set song_count and total_duration_ms from playlist_songs with one UPDATE (no commit); returns rows updated"""
+        from flask_app.models import Song
+        playlists = Playlist.__table__
+        song_count = db.select(db.func.count())\
+            .select_from(playlist_songs)\
+            .where(playlist_songs.c.playlist_id == playlists.c.id)\
+            .scalar_subquery()
+        total_duration = db.select(db.func.coalesce(db.func.sum(Song.duration_ms), 0))\
+            .select_from(playlist_songs.join(Song, Song.track_uri == playlist_songs.c.track_uri))\
+            .where(playlist_songs.c.playlist_id == playlists.c.id)\
+            .scalar_subquery()
+        
+        statement = playlists.update().values(
+            song_count=song_count,
+            total_duration_ms=total_duration,
+            updated_at=playlists.c.updated_at
+        )
+        if playlist_ids is not None:
+            statement = statement.where(playlists.c.id.in_(playlist_ids))
+        
+        return db.session.execute(statement).rowcount
     
     def get_total_duration_formatted(self):
         """Get formatted total duration (e.g., '2h 15m' or '45m')"""
@@ -145,7 +232,7 @@ class Playlist(BaseModel):
                 max_position = db.session.query(db.func.max(playlist_songs.c.position))\
                     .filter_by(playlist_id=self.id)\
                     .scalar()
-                position = (max_position or -1) + 1
+                position = 0 if max_position is None else max_position + POSITION_GAP
             
             # Insert song
             db.session.execute(
@@ -155,6 +242,7 @@ class Playlist(BaseModel):
                     position=position
                 )
             )
+            self._adjust_counters(1, song.duration_ms or 0)
             db.session.commit()
             return True, None
         except Exception as e:
@@ -163,9 +251,91 @@ class Playlist(BaseModel):
             current_app.logger.error(f"Error adding song to playlist: {str(e)}")
             return False, str(e)
     
+    def add_songs(self, track_uris):
+        """
+        Add many songs to the playlist in a single transaction.
+
+        Validates every URI with one IN query, filters out existing members with
+        one query, assigns evenly spaced positions after the current last song and
+        inserts all new rows with a single executemany.
+
+        Args:
+            track_uris: List of track URIs in the order they should be appended
+
+        Returns:
+            Tuple of (added_track_uris, errors) where errors is a list of
+            {'track_uri': ..., 'error': ...} dicts, matching add_song's messages
+        """
+        try:
+            from flask_app.models import Song
+            unique_uris = list(dict.fromkeys(track_uris))
+            if not unique_uris:
+                return [], []
+
+            durations = dict(
+                db.session.query(Song.track_uri, Song.duration_ms)
+                .filter(Song.track_uri.in_(unique_uris))
+                .all()
+            )
+            member_uris = {
+                row[0] for row in db.session.query(playlist_songs.c.track_uri)
+                .filter(
+                    playlist_songs.c.playlist_id == self.id,
+                    playlist_songs.c.track_uri.in_(unique_uris)
+                )
+                .all()
+            }
+
+            max_position = db.session.query(db.func.max(playlist_songs.c.position))\
+                .filter_by(playlist_id=self.id)\
+                .scalar()
+            next_position = 0 if max_position is None else max_position + POSITION_GAP
+
+            rows = []
+            errors = []
+            seen = set()
+            for track_uri in track_uris:
+                if track_uri not in durations:
+                    errors.append({'track_uri': track_uri, 'error': "Song not found"})
+                elif track_uri in member_uris or track_uri in seen:
+                    errors.append({'track_uri': track_uri, 'error': "Song already in playlist"})
+                else:
+                    seen.add(track_uri)
+                    rows.append({
+                        'playlist_id': self.id,
+                        'track_uri': track_uri,
+                        'position': next_position
+                    })
+                    next_position += POSITION_GAP
+
+            if rows:
+                db.session.execute(playlist_songs.insert(), rows)
+                self._adjust_counters(
+                    len(rows),
+                    sum(durations[row['track_uri']] or 0 for row in rows)
+                )
+                db.session.commit()
+            return [row['track_uri'] for row in rows], errors
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error bulk adding songs to playlist: {str(e)}")
+            return [], [{'track_uri': track_uri, 'error': str(e)} for track_uri in track_uris]
+
     def remove_song(self, track_uri):
         """Remove a song from the playlist"""
         try:
+            from flask_app.models import Song
+            member = db.session.query(Song.duration_ms)\
+                .join(playlist_songs, Song.track_uri == playlist_songs.c.track_uri)\
+                .filter(
+                    playlist_songs.c.playlist_id == self.id,
+                    playlist_songs.c.track_uri == track_uri
+                )\
+                .first()
+            if not member:
+                return True, None
+            
             db.session.execute(
                 playlist_songs.delete().where(
                     db.and_(
@@ -174,6 +344,7 @@ class Playlist(BaseModel):
                     )
                 )
             )
+            self._adjust_counters(-1, -(member.duration_ms or 0))
             db.session.commit()
             return True, None
         except Exception as e:
@@ -182,6 +353,19 @@ class Playlist(BaseModel):
             current_app.logger.error(f"Error removing song from playlist: {str(e)}")
             return False, str(e)
     
+    def get_track_uris(self):
+        """Get the playlist's track URIs in order without loading Song rows"""
+        try:
+            rows = db.session.query(playlist_songs.c.track_uri)\
+                .filter(playlist_songs.c.playlist_id == self.id)\
+                .order_by(playlist_songs.c.position, playlist_songs.c.track_uri)\
+                .all()
+            return [row[0] for row in rows]
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Error getting playlist track URIs: {str(e)}")
+            return []
+    
     def get_songs_ordered(self):
         """Get all songs in the playlist in order"""
         try:
@@ -196,19 +380,94 @@ class Playlist(BaseModel):
             current_app.logger.error(f"Error getting ordered songs: {str(e)}")
             return []
     
+    def get_songs_page(self, after_position=None, after_uri=None, limit=100):
+        """
+        Get one page of the playlist's songs using keyset pagination on position.
+
+        Pages are anchored on the (position, track_uri) of the last row of the
+        previous page, so each page is an index range scan regardless of how far
+        into the playlist it is. Only the columns shown in the playlist table
+        are selected.
+
+        Args:
+            after_position: Position of the last row of the previous page (None for the first page)
+            after_uri: Track URI of the last row of the previous page, breaks position ties
+            limit: Maximum number of rows to return
+
+        Returns:
+            Tuple of (list_of_song_dicts, next_cursor_or_None)
+        """
+        try:
+            from flask_app.models import Song
+            query = db.session.query(
+                playlist_songs.c.position,
+                Song.track_uri,
+                Song.track_name,
+                Song.artist_names,
+                Song.album_name,
+                Song.release_date,
+                Song.duration_ms,
+                Song.popularity,
+                Song.explicit,
+                Song.tempo
+            ).join(Song, Song.track_uri == playlist_songs.c.track_uri)\
+                .filter(playlist_songs.c.playlist_id == self.id)
+
+            if after_position is not None:
+                query = query.filter(db.or_(
+                    playlist_songs.c.position > after_position,
+                    db.and_(
+                        playlist_songs.c.position == after_position,
+                        playlist_songs.c.track_uri > (after_uri or '')
+                    )
+                ))
+
+            # Fetch one extra row to know whether another page exists
+            rows = query.order_by(playlist_songs.c.position, playlist_songs.c.track_uri)\
+                .limit(limit + 1)\
+                .all()
+
+            songs = [row._asdict() for row in rows[:limit]]
+            next_cursor = None
+            if len(rows) > limit:
+                last = songs[-1]
+                next_cursor = {'after': last['position'], 'after_uri': last['track_uri']}
+            return songs, next_cursor
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Error getting playlist songs page: {str(e)}")
+            return [], None
+
+    def _write_positions(self, track_uris):
+        """Set positions for the given songs with one UPDATE ... CASE per POSITION_WRITE_CHUNK songs (no commit)"""
+        for start in range(0, len(track_uris), POSITION_WRITE_CHUNK):
+            chunk = track_uris[start:start + POSITION_WRITE_CHUNK]
+            db.session.execute(
+                playlist_songs.update()
+                .where(
+                    db.and_(
+                        playlist_songs.c.playlist_id == self.id,
+                        playlist_songs.c.track_uri.in_(chunk)
+                    )
+                )
+                .values(position=db.case(
+                    {track_uri: index * POSITION_GAP for index, track_uri in enumerate(chunk, start=start)},
+                    value=playlist_songs.c.track_uri
+                ))
+            )
+    
+    def rebalance_positions(self):
+        """Respace all positions evenly in their current order (no commit)"""
+        ordered = db.session.query(playlist_songs.c.track_uri)\
+            .filter(playlist_songs.c.playlist_id == self.id)\
+            .order_by(playlist_songs.c.position, playlist_songs.c.track_uri)\
+            .all()
+        self._write_positions([row[0] for row in ordered])
+    
     def reorder_songs(self, track_uris):
         """Reorder songs in playlist. track_uris should be a list in desired order"""
         try:
-            # Update positions
-            for position, track_uri in enumerate(track_uris):
-                db.session.execute(
-                    playlist_songs.update().where(
-                        db.and_(
-                            playlist_songs.c.playlist_id == self.id,
-                            playlist_songs.c.track_uri == track_uri
-                        )
-                    ).values(position=position)
-                )
+            self._write_positions(list(dict.fromkeys(track_uris)))
             db.session.commit()
             return True, None
         except Exception as e:
@@ -216,4 +475,83 @@ class Playlist(BaseModel):
             from flask import current_app
             current_app.logger.error(f"Error reordering songs: {str(e)}")
             return False, str(e)
-
+    
+    def _position_of(self, track_uri):
+        """Get the current position of a song in the playlist, or None"""
+        return db.session.query(playlist_songs.c.position)\
+            .filter_by(playlist_id=self.id, track_uri=track_uri)\
+            .scalar()
+    
+    def _slot_next_to(self, track_uri, anchor_uri, before):
+        """
+        Find a free position directly before or after the anchor song.
+        
+        Returns the new position, or None if the anchor is not in the playlist or
+        there is no integer gap left between the anchor and its neighbour.
+        """
+        anchor_position = self._position_of(anchor_uri)
+        if anchor_position is None:
+            return None
+        
+        neighbours = db.session.query(
+            db.func.max(playlist_songs.c.position) if before else db.func.min(playlist_songs.c.position)
+        ).filter(
+            playlist_songs.c.playlist_id == self.id,
+            playlist_songs.c.track_uri != track_uri,
+            playlist_songs.c.position < anchor_position if before else playlist_songs.c.position > anchor_position
+        )
+        neighbour_position = neighbours.scalar()
+        
+        if neighbour_position is None:
+            return anchor_position - POSITION_GAP if before else anchor_position + POSITION_GAP
+        if abs(anchor_position - neighbour_position) < 2:
+            return None
+        return (anchor_position + neighbour_position) // 2
+    
+    def move_song(self, track_uri, before=None, after=None):
+        """
+        Move a single song directly before or after another song.
+        
+        Only the moved row is rewritten. If the gap at the target is exhausted the
+        playlist is rebalanced first, which rewrites every row once.
+        
+        Args:
+            track_uri: Song to move
+            before: Track URI the song should be placed in front of
+            after: Track URI the song should be placed behind
+        
+        Returns:
+            Tuple of (success, error_message)
+        """
+        if (before is None) == (after is None):
+            return False, "Exactly one of before or after is required"
+        anchor_uri = before if before is not None else after
+        if anchor_uri == track_uri:
+            return False, "Cannot move a song relative to itself"
+        
+        try:
+            if self._position_of(track_uri) is None:
+                return False, "Song not in playlist"
+            if self._position_of(anchor_uri) is None:
+                return False, "Target song not in playlist"
+            
+            position = self._slot_next_to(track_uri, anchor_uri, before is not None)
+            if position is None:
+                self.rebalance_positions()
+                position = self._slot_next_to(track_uri, anchor_uri, before is not None)
+            
+            db.session.execute(
+                playlist_songs.update().where(
+                    db.and_(
+                        playlist_songs.c.playlist_id == self.id,
+                        playlist_songs.c.track_uri == track_uri
+                    )
+                ).values(position=position)
+            )
+            db.session.commit()
+            return True, None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error moving song in playlist: {str(e)}")
+            return False, str(e)
@@ -20,14 +20,18 @@ class ResearchBrief(BaseModel):
     title = db.Column(db.String(500), nullable=False)
     citation = db.Column(db.String(1000), nullable=False)
     summary = db.Column(db.Text, nullable=False)  # Bullet points stored as text
-    source_text = db.Column(db.Text, nullable=False)  # Extracted text from PDF or user input
+    source_text = db.deferred(db.Column(db.Text, nullable=False))  # Extracted text from PDF or user input (loaded on access)
     url = db.Column(db.String(500), nullable=True)  # URL to the source article or document
     pdf_filename = db.Column(db.String(255), nullable=True)  # Original filename if PDF uploaded
-    pdf_data = db.Column(db.LargeBinary, nullable=True)  # PDF file stored as binary
+    pdf_data = db.deferred(db.Column(db.LargeBinary, nullable=True))  # Legacy inline PDF; new uploads go to the PDF store
+    pdf_sha256 = db.Column(db.String(64), db.ForeignKey('pdf_blobs.sha256'), nullable=True, index=True)  # Stored PDF (see PdfBlob)
     content_hash = db.Column(db.String(64), nullable=True, index=True)  # MD5 hash of PDF content for duplicate detection
     source_type = db.Column(db.String(20), nullable=False)  # 'pdf', 'text', or 'manual'
     model_name = db.Column(db.String(50), nullable=True)  # OpenAI model used to generate the brief or source name for manual entries
     
+    # Computed in SQL so listings can tell whether a legacy PDF exists without loading it
+    has_pdf_data = db.column_property(pdf_data.expression.isnot(None))
+    
     # Relationship to User
     user = db.relationship('User', backref=db.backref('research_briefs', lazy='dynamic', cascade='all, delete-orphan'))
     
@@ -50,11 +54,62 @@ class ResearchBrief(BaseModel):
     def __repr__(self):
         return f'<ResearchBrief {self.id}: {self.title[:50]}>'
     
+    def has_pdf(self):
+        """Check if the original PDF can be downloaded"""
+        return self.source_type == 'pdf' and bool(self.pdf_sha256 or self.has_pdf_data)
+    
+    def safe_delete(self):
+        """
+        Delete the brief, dropping its reference to the stored PDF (removed once
+        nothing else uses it) and its owner's counts for its tags
+        """
+        try:
+            from .pdf_blob import PdfBlob
+            from .user_tag_count import UserTagCount
+            digest = self.pdf_sha256
+            tag_ids = [tag_id for (tag_id,) in db.session.query(research_brief_tags.c.tag_id)
+                       .filter(research_brief_tags.c.research_brief_id == self.id)]
+            PdfBlob.release(digest)
+            UserTagCount.adjust(self.user_id, tag_ids, -1)
+            db.session.delete(self)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error deleting research brief {self.id}: {str(e)}")
+            return False, str(e)
+        
+        if digest:
+            PdfBlob.purge([digest])
+        return True, None
+    
+    @staticmethod
+    def listing_options(*extra_columns):
+        """
+        Load only the columns list pages show (plus any extra_columns).
+        
+        Summaries, source text and PDF data can be many megabytes per row; with
+        this the cost of a listing depends on the number of rows, not on the
+        size of the documents. Other columns still load on access.
+        """
+        return db.load_only(
+            *extra_columns,
+            ResearchBrief.id,
+            ResearchBrief.user_id,
+            ResearchBrief.title,
+            ResearchBrief.citation,
+            ResearchBrief.source_type,
+            ResearchBrief.pdf_sha256,
+            ResearchBrief.has_pdf_data,
+            ResearchBrief.created_at,
+        )
+    
     @staticmethod
     def find_by_user(user_id, page=1, per_page=20):
-        """Find all briefs for a user with pagination"""
+        """Find all briefs for a user with pagination (listing columns only)"""
         try:
             return ResearchBrief.query.filter_by(user_id=user_id)\
+                .options(ResearchBrief.listing_options())\
                 .order_by(ResearchBrief.created_at.desc())\
                 .paginate(page=page, per_page=per_page, error_out=False)
         except Exception as e:
@@ -63,10 +118,13 @@ class ResearchBrief(BaseModel):
             return None
     
     @staticmethod
-    def find_by_id_and_user(brief_id, user_id):
-        """Find a brief by ID ensuring it belongs to the user"""
+    def find_by_id_and_user(brief_id, user_id, with_source_text=False):
+        """Find a brief by ID ensuring it belongs to the user, optionally loading the deferred source text up front"""
         try:
-            return ResearchBrief.query.filter_by(id=brief_id, user_id=user_id).first()
+            query = ResearchBrief.query.filter_by(id=brief_id, user_id=user_id)
+            if with_source_text:
+                query = query.options(db.undefer(ResearchBrief.source_text))
+            return query.first()
         except Exception as e:
             from flask import current_app
             current_app.logger.error(f"Database error finding brief {brief_id} for user {user_id}: {str(e)}")
@@ -142,7 +200,9 @@ class ResearchBrief(BaseModel):
                 return False, error or "Failed to create or find tag"
             
             if tag not in self.tags:
+                from .user_tag_count import UserTagCount
                 self.tags.append(tag)
+                UserTagCount.adjust(self.user_id, [tag.id], 1)
                 db.session.commit()
             
             return True, None
@@ -160,7 +220,9 @@ class ResearchBrief(BaseModel):
             tag = Tag.query.filter_by(name=normalized_name).first()
             
             if tag and tag in self.tags:
+                from .user_tag_count import UserTagCount
                 self.tags.remove(tag)
+                UserTagCount.adjust(self.user_id, [tag.id], -1)
                 db.session.commit()
             
             return True, None
@@ -170,6 +232,92 @@ class ResearchBrief(BaseModel):
             current_app.logger.error(f"Error removing tag '{tag_name}' from brief {self.id}: {str(e)}")
             return False, str(e)
     
+    @staticmethod
+    def find_by_user_grouped_by_tag(user_id, tag_id=None):
+        """
+        Get a user's briefs grouped by tag, with one joined query.
+        
+        Args:
+            user_id: Owner of the briefs
+            tag_id: Optional tag to restrict the result to
+            
+        Returns:
+            Tuple of (list of (Tag, list of briefs newest first) ordered by tag name,
+            error_message); a brief with several tags appears under each of them
+        """
+        try:
+            from .tag import Tag
+            query = db.session.query(Tag, ResearchBrief)\
+                .join(research_brief_tags, research_brief_tags.c.tag_id == Tag.id)\
+                .join(ResearchBrief, ResearchBrief.id == research_brief_tags.c.research_brief_id)\
+                .filter(ResearchBrief.user_id == user_id)\
+                .options(ResearchBrief.listing_options(ResearchBrief.summary, ResearchBrief.pdf_filename))
+            if tag_id:
+                query = query.filter(Tag.id == tag_id)
+            rows = query.order_by(Tag.name, ResearchBrief.created_at.desc(), ResearchBrief.id.desc()).all()
+            
+            tags_with_briefs = []
+            for tag, brief in rows:
+                if not tags_with_briefs or tags_with_briefs[-1][0] is not tag:
+                    tags_with_briefs.append((tag, []))
+                tags_with_briefs[-1][1].append(brief)
+            return tags_with_briefs, None
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Database error grouping briefs by tag for user {user_id}: {str(e)}")
+            return [], str(e)
+    
+    @staticmethod
+    def find_untagged_by_user(user_id):
+        """Find a user's briefs that have no tags, newest first (anti-join on research_brief_tags)"""
+        try:
+            has_tags = db.exists().where(research_brief_tags.c.research_brief_id == ResearchBrief.id)
+            return ResearchBrief.query.filter_by(user_id=user_id)\
+                .filter(~has_tags)\
+                .options(ResearchBrief.listing_options(ResearchBrief.summary, ResearchBrief.pdf_filename))\
+                .order_by(ResearchBrief.created_at.desc(), ResearchBrief.id.desc())\
+                .all()
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Database error finding untagged briefs for user {user_id}: {str(e)}")
+            return []
+    
+    @staticmethod
+    def get_tags_for_briefs(brief_ids):
+        """
+        Get the tags of many briefs in one query.
+        
+        Reads research_brief_tags for all the IDs at once (WHERE research_brief_id IN ...),
+        instead of one query per brief through the dynamic tags relationship.
+        
+        Args:
+            brief_ids: IDs of the briefs, e.g. the current page of a listing
+            
+        Returns:
+            Tuple of (dict of brief ID -> list of Tag ordered by name, error_message);
+            briefs without tags are not in the dict
+        """
+        try:
+            from .tag import Tag
+            brief_ids = list(brief_ids)
+            if not brief_ids:
+                return {}, None
+            
+            rows = db.session.query(research_brief_tags.c.research_brief_id, Tag)\
+                .join(Tag, Tag.id == research_brief_tags.c.tag_id)\
+                .filter(research_brief_tags.c.research_brief_id.in_(brief_ids))\
+                .order_by(Tag.name)\
+                .all()
+            
+            tags_by_brief = {}
+            for brief_id, tag in rows:
+                tags_by_brief.setdefault(brief_id, []).append(tag)
+            return tags_by_brief, None
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Error getting tags for briefs: {str(e)}")
+            return {}, str(e)
+    
     def get_tag_names(self):
         """Get list of tag names for this brief"""
         try:
@@ -181,9 +329,10 @@ class ResearchBrief(BaseModel):
     
     @staticmethod
     def find_by_user_and_tag(user_id, tag_id=None, page=1, per_page=20):
-        """Find all briefs for a user, optionally filtered by tag, with pagination"""
+        """Find all briefs for a user, optionally filtered by tag, with pagination (listing columns only)"""
         try:
-            query = ResearchBrief.query.filter_by(user_id=user_id)
+            query = ResearchBrief.query.filter_by(user_id=user_id)\
+                .options(ResearchBrief.listing_options())
             
             if tag_id:
                 query = query.join(ResearchBrief.tags).filter_by(id=tag_id)
@@ -193,4 +342,4 @@ class ResearchBrief(BaseModel):
         except Exception as e:
             from flask import current_app
             current_app.logger.error(f"Database error finding briefs for user {user_id} with tag {tag_id}: {str(e)}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,152 @@
+# flask_app/models/research_import_job.py
+
+from .base import db, BaseModel
+from datetime import datetime, timezone, timedelta
+import uuid
+
+class ResearchImportJob(BaseModel):
+    """Model for tracking one uploaded PDF through background research brief generation"""
+    __tablename__ = 'research_import_jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    batch_id = db.Column(db.String(36), nullable=False, index=True)  # Files uploaded together share a batch
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, duplicate, failed
+    stage = db.Column(db.String(20), nullable=False, default='queued')  # queued, extracting, summarizing, saving, done
+
+    # File metadata
+    original_filename = db.Column(db.String(255), nullable=False)
+    stored_path = db.Column(db.String(500), nullable=True)  # Removed once processing finishes
+    content_hash = db.Column(db.String(64), nullable=True)
+    file_size = db.Column(db.Integer, nullable=False, default=0)
+    tags = db.Column(db.Text, nullable=True)  # Comma-separated tags to apply to the brief
+
+    # Result: the created brief, or the existing one for duplicates
+    brief_id = db.Column(db.Integer, db.ForeignKey('research_briefs.id', ondelete='SET NULL'), nullable=True)
+
+    # Timestamps
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Error or duplicate information
+    error_message = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f'<ResearchImportJob {self.id}: {self.original_filename} {self.status}>'
+
+    def is_finished(self):
+        """Check if the job has reached a final status"""
+        return self.status in ('completed', 'duplicate', 'failed')
+
+    def to_dict(self):
+        """Convert job to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'stage': self.stage,
+            'original_filename': self.original_filename,
+            'file_size': self.file_size,
+            'brief_id': self.brief_id,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'error_message': self.error_message,
+        }
+
+    @staticmethod
+    def find_by_id(job_id):
+        """Find a job by ID"""
+        try:
+            return ResearchImportJob.query.filter_by(id=job_id).first()
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Database error finding research import job {job_id}: {str(e)}")
+            return None
+
+    @staticmethod
+    def find_by_batch(batch_id, user_id):
+        """Find all jobs of an upload batch belonging to the user"""
+        try:
+            return ResearchImportJob.query.filter_by(batch_id=batch_id, user_id=user_id)\
+                .order_by(ResearchImportJob.created_at.asc(), ResearchImportJob.original_filename.asc())\
+                .all()
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Database error finding research import batch {batch_id}: {str(e)}")
+            return []
+
+    @staticmethod
+    def claim(job_id):
+        """
+        Move a queued job to running, unless another worker already has.
+
+        Compare-and-set on the status, so a job queued twice (e.g. re-queued
+        at startup while another process still had it queued) runs once.
+
+        Returns:
+            True if the caller should run the job
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            table = ResearchImportJob.__table__
+            result = db.session.execute(
+                table.update()
+                .where(table.c.id == job_id, table.c.status == 'queued')
+                .values(status='running', started_at=now, updated_at=now)
+            )
+            db.session.commit()
+            return result.rowcount == 1
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Database error claiming research import job {job_id}: {str(e)}")
+            return False
+
+    @staticmethod
+    def find_unfinished():
+        """Find queued and running jobs, oldest first"""
+        try:
+            return ResearchImportJob.query.filter(ResearchImportJob.status.in_(['queued', 'running']))\
+                .order_by(ResearchImportJob.created_at.asc())\
+                .all()
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Database error finding unfinished research import jobs: {str(e)}")
+            return []
+
+    @staticmethod
+    def fail_stale(lease_seconds, error_message):
+        """
+        Mark running jobs that made no progress within lease_seconds as failed.
+
+        Every stage change bumps updated_at, which serves as the job's
+        heartbeat. The conditional UPDATE means only one process fails a job.
+
+        Returns:
+            Tuple of (failed_jobs, error_message)
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            cutoff = now - timedelta(seconds=lease_seconds)
+            stale = ResearchImportJob.query.filter(
+                ResearchImportJob.status == 'running',
+                ResearchImportJob.updated_at < cutoff
+            ).all()
+
+            table = ResearchImportJob.__table__
+            failed = []
+            for job in stale:
+                result = db.session.execute(
+                    table.update()
+                    .where(table.c.id == job.id, table.c.status == 'running', table.c.updated_at < cutoff)
+                    .values(status='failed', stage='done', finished_at=now, updated_at=now, error_message=error_message)
+                )
+                if result.rowcount:
+                    failed.append(job)
+            db.session.commit()
+            return failed, None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Database error failing stale research import jobs: {str(e)}")
+            return [], str(e)
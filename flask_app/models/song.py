@@ -1,7 +1,13 @@
 # flask_app/models/song.py
 
 from .base import db, BaseModel
-from sqlalchemy import Index
+from sqlalchemy import Index, or_, update
+
+# Columns filled from Spotify's audio-features endpoint
+AUDIO_FEATURES = (
+    'danceability', 'energy', 'key', 'loudness', 'mode', 'speechiness',
+    'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo', 'time_signature'
+)
 
 class Song(BaseModel):
     """Model for storing imported music tracks from CSV files"""
@@ -144,4 +150,56 @@ class Song(BaseModel):
             from flask import current_app
             current_app.logger.error(f"Database error searching songs: {str(e)}")
             return None
-
+    
+    @staticmethod
+    def _missing_audio_features_filter():
+        return or_(*(getattr(Song, name).is_(None) for name in AUDIO_FEATURES))
+    
+    @staticmethod
+    def count_missing_audio_features(after_uri=None):
+        """Count songs with at least one audio feature missing, optionally after a track URI"""
+        try:
+            q = db.session.query(db.func.count(Song.track_uri)).filter(Song._missing_audio_features_filter())
+            if after_uri is not None:
+                q = q.filter(Song.track_uri > after_uri)
+            return q.scalar()
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Database error counting songs missing audio features: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def find_missing_audio_features(after_uri=None, limit=100):
+        """
+        Get the next track URIs with at least one audio feature missing, in URI order.
+        
+        Keyset paging on track_uri means songs Spotify has no features for are
+        passed over instead of being returned again on the next call.
+        """
+        q = db.session.query(Song.track_uri).filter(Song._missing_audio_features_filter())
+        if after_uri is not None:
+            q = q.filter(Song.track_uri > after_uri)
+        return [row[0] for row in q.order_by(Song.track_uri).limit(limit).all()]
+    
+    @staticmethod
+    def bulk_update_audio_features(rows):
+        """
+        Write audio features for many songs with one executemany UPDATE.
+        
+        Args:
+            rows: List of dicts with 'track_uri' and any AUDIO_FEATURES keys
+        
+        Returns:
+            Tuple of (updated_count, error_message)
+        """
+        try:
+            if not rows:
+                return 0, None
+            db.session.execute(update(Song), rows)
+            db.session.commit()
+            return len(rows), None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Database error updating audio features: {str(e)}")
+            return 0, str(e)
@@ -14,6 +14,8 @@ class SpotifyAuth(BaseModel):
     refresh_token = db.Column(db.Text, nullable=True)
     token_expires_at = db.Column(db.DateTime, nullable=True)
     scope = db.Column(db.Text, nullable=True)
+    # Set while one worker is refreshing the token; others wait instead of refreshing too
+    refresh_started_at = db.Column(db.DateTime, nullable=True)
     
     # Relationship to User
     user = db.relationship('User', backref=db.backref('spotify_auth', lazy='dynamic', cascade='all, delete-orphan'))
@@ -62,11 +64,21 @@ class SpotifyAuth(BaseModel):
             return self.token_expires_at.replace(tzinfo=timezone.utc)
         return self.token_expires_at
     
+    @staticmethod
+    def get_current():
+        """Get the most recent Spotify auth row, valid or not (shared account approach)"""
+        try:
+            return SpotifyAuth.query.order_by(SpotifyAuth.id.desc()).first()
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Error getting current Spotify auth: {str(e)}")
+            return None
+    
     @staticmethod
     def get_active_auth():
         """Get the most recent active Spotify auth token (shared account approach)"""
         try:
-            auth = SpotifyAuth.query.order_by(SpotifyAuth.created_at.desc()).first()
+            auth = SpotifyAuth.query.order_by(SpotifyAuth.id.desc()).first()
             if auth and auth.is_valid():
                 return auth
             return None
@@ -89,21 +101,25 @@ class SpotifyAuth(BaseModel):
     def create_or_update(user_id, access_token, refresh_token=None, expires_in=None, scope=None):
         """Create or update Spotify auth token"""
         try:
-            # For shared account, we'll just create a new entry each time
-            # Optionally, we could update the most recent one
-            auth = SpotifyAuth(
-                user_id=user_id,
-                access_token=access_token,
-                refresh_token=refresh_token,
-                scope=scope
-            )
+            # Shared account: reuse the current row so the table stays a single row
+            auth = SpotifyAuth.query.order_by(SpotifyAuth.id.desc()).first()
+            if auth is None:
+                auth = SpotifyAuth()
+                db.session.add(auth)
+            
+            auth.user_id = user_id
+            auth.access_token = access_token
+            auth.refresh_token = refresh_token
+            auth.scope = scope
+            auth.refresh_started_at = None
+            auth.token_expires_at = None
             
             if expires_in:
                 auth.token_expires_at = datetime.now(timezone.utc).replace(microsecond=0) + \
                     timedelta(seconds=expires_in - 60)  # Subtract 60 seconds as buffer
             
-            db.session.add(auth)
             db.session.commit()
+            SpotifyAuth.compact(keep_id=auth.id)
             return auth, None
         except Exception as e:
             db.session.rollback()
@@ -130,4 +146,101 @@ class SpotifyAuth(BaseModel):
             from flask import current_app
             current_app.logger.error(f"Error updating Spotify auth token: {str(e)}")
             return False, str(e)
-
+    
+    def claim_refresh(self, lease_seconds=30):
+        """
+        Try to become the only worker refreshing this token.
+        
+        Compare-and-set on the row: succeeds only if the access token is still the
+        one this worker saw and no other refresh started within lease_seconds
+        (a stale claim from a crashed worker can be taken over).
+        
+        Returns:
+            True if this caller should refresh, False if another worker is already on it
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            table = SpotifyAuth.__table__
+            result = db.session.execute(
+                table.update()
+                .where(
+                    table.c.id == self.id,
+                    table.c.access_token == self.access_token,
+                    db.or_(
+                        table.c.refresh_started_at.is_(None),
+                        table.c.refresh_started_at < now - timedelta(seconds=lease_seconds)
+                    )
+                )
+                .values(refresh_started_at=now)
+            )
+            db.session.commit()
+            return result.rowcount == 1
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error claiming Spotify token refresh: {str(e)}")
+            return False
+    
+    def complete_refresh(self, previous_access_token, access_token, refresh_token=None, expires_in=None):
+        """Store a refreshed token and release the refresh claim (only if nobody replaced the token meanwhile)"""
+        try:
+            values = {
+                'access_token': access_token,
+                'refresh_started_at': None,
+                'updated_at': datetime.now(timezone.utc)
+            }
+            if refresh_token:
+                values['refresh_token'] = refresh_token
+            if expires_in:
+                values['token_expires_at'] = datetime.now(timezone.utc).replace(microsecond=0) + \
+                    timedelta(seconds=expires_in - 60)  # Subtract 60 seconds as buffer
+            
+            table = SpotifyAuth.__table__
+            result = db.session.execute(
+                table.update()
+                .where(table.c.id == self.id, table.c.access_token == previous_access_token)
+                .values(**values)
+            )
+            db.session.commit()
+            db.session.refresh(self)
+            if result.rowcount != 1:
+                return False, "Spotify token was replaced during refresh"
+            return True, None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error storing refreshed Spotify token: {str(e)}")
+            return False, str(e)
+    
+    def release_refresh(self):
+        """Give up a refresh claim after a failed refresh so another worker can retry"""
+        try:
+            table = SpotifyAuth.__table__
+            db.session.execute(table.update().where(table.c.id == self.id).values(refresh_started_at=None))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error releasing Spotify token refresh: {str(e)}")
+    
+    @staticmethod
+    def compact(keep_id=None):
+        """
+        Delete all Spotify auth rows except the newest (or keep_id).
+        
+        Returns:
+            Tuple of (deleted_count, error_message)
+        """
+        try:
+            if keep_id is None:
+                keep_id = db.session.query(db.func.max(SpotifyAuth.id)).scalar()
+                if keep_id is None:
+                    return 0, None
+            deleted = SpotifyAuth.query.filter(SpotifyAuth.id != keep_id).delete(synchronize_session=False)
+            db.session.commit()
+            return deleted, None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error compacting Spotify auth rows: {str(e)}")
+            return 0, str(e)
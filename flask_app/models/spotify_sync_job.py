@@ -0,0 +1,256 @@
+# flask_app/models/spotify_sync_job.py
+
+from .base import db, BaseModel
+from datetime import datetime, timezone, timedelta
+import json
+import uuid
+
+class JobClaimLost(Exception):
+    """Raised when a runner's claim on a job was released or taken over by another runner"""
+
+
+class SpotifySyncJob(BaseModel):
+    """Model for tracking background Spotify jobs (playlist export/import, audio-feature enrichment) with progress"""
+    __tablename__ = 'spotify_sync_jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    direction = db.Column(db.String(10), nullable=False)  # export, import, enrich
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+
+    # Playlists involved (local playlist is set once created for imports)
+    playlist_id = db.Column(db.Integer, db.ForeignKey('playlists.id', ondelete='SET NULL'), nullable=True)
+    spotify_playlist_id = db.Column(db.String(255), nullable=True)
+
+    # Request options and the resumable work plan (JSON)
+    options = db.Column(db.Text, nullable=True)
+    plan = db.Column(db.Text, nullable=True)
+
+    # Progress tracking: a batch is one Spotify API write (export), one page of tracks (import)
+    # or one audio-features call (enrich); enrich counts updated songs in added_count
+    total_batches = db.Column(db.Integer, nullable=False, default=0)
+    completed_batches = db.Column(db.Integer, nullable=False, default=0)
+    total_tracks = db.Column(db.Integer, nullable=False, default=0)
+    processed_tracks = db.Column(db.Integer, nullable=False, default=0)
+    added_count = db.Column(db.Integer, nullable=False, default=0)
+    skipped_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Timestamps
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Outcome
+    result = db.Column(db.Text, nullable=True)
+    error_message = db.Column(db.Text, nullable=True)
+
+    # Set by claim() for the runner working on the job; progress commits check it
+    claim_token = db.Column(db.String(36), nullable=True)
+
+    def __repr__(self):
+        return f'<SpotifySyncJob {self.id}: {self.direction} {self.status}>'
+
+    def get_options(self):
+        """Get the job options as a dict"""
+        return json.loads(self.options) if self.options else {}
+
+    def get_plan(self):
+        """Get the stored work plan, or None if the job has not been planned yet"""
+        return json.loads(self.plan) if self.plan else None
+
+    def set_plan(self, plan):
+        """Store the work plan (not committed)"""
+        self.plan = json.dumps(plan) if plan is not None else None
+
+    def can_resume(self):
+        """Check if a failed job can continue from its last completed batch"""
+        return self.status == 'failed'
+
+    def to_dict(self):
+        """Convert job to dictionary for JSON serialization"""
+        progress_percent = 0
+        if self.status == 'completed':
+            progress_percent = 100
+        elif self.total_batches > 0:
+            progress_percent = int((self.completed_batches / self.total_batches) * 100)
+
+        return {
+            'id': self.id,
+            'direction': self.direction,
+            'status': self.status,
+            'playlist_id': self.playlist_id,
+            'spotify_playlist_id': self.spotify_playlist_id,
+            'total_batches': self.total_batches,
+            'completed_batches': self.completed_batches,
+            'total_tracks': self.total_tracks,
+            'processed_tracks': self.processed_tracks,
+            'added_count': self.added_count,
+            'skipped_count': self.skipped_count,
+            'progress_percent': progress_percent,
+            'can_resume': self.can_resume(),
+            'result': json.loads(self.result) if self.result else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'error_message': self.error_message,
+        }
+
+    @staticmethod
+    def fail_stale(lease_seconds=None):
+        """
+        Mark queued/running jobs that made no progress within the lease as failed.
+        
+        Jobs run in in-process threads, so a restart or crash leaves their rows
+        queued or running with nothing working on them. Every progress commit
+        bumps updated_at, which serves as the job's heartbeat; once it is older
+        than the lease the job is failed with its plan and progress intact and
+        can be resumed like any other failed job. The lease defaults to
+        SPOTIFY_JOB_LEASE_SECONDS.
+        
+        Returns:
+            Tuple of (failed_count, error_message)
+        """
+        from flask import current_app
+        if lease_seconds is None:
+            lease_seconds = current_app.config.get('SPOTIFY_JOB_LEASE_SECONDS', 300)
+        try:
+            now = datetime.now(timezone.utc)
+            table = SpotifySyncJob.__table__
+            result = db.session.execute(
+                table.update()
+                .where(
+                    table.c.status.in_(['queued', 'running']),
+                    table.c.updated_at < now - timedelta(seconds=lease_seconds)
+                )
+                .values(
+                    status='failed',
+                    finished_at=now,
+                    updated_at=now,
+                    claim_token=None,
+                    error_message=f'Interrupted: no progress for {lease_seconds} seconds (the server may have restarted); resume to continue'
+                )
+            )
+            db.session.commit()
+            if result.rowcount:
+                current_app.logger.warning(f"Marked {result.rowcount} interrupted Spotify sync job(s) as failed")
+            return result.rowcount, None
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error failing stale Spotify sync jobs: {str(e)}")
+            return 0, str(e)
+
+    @staticmethod
+    def claim(job_id):
+        """
+        Move a queued or failed job to running, unless another worker already has.
+        
+        Compare-and-set on the status, so two resumes of the same job start
+        one runner. The new claim token replaces any earlier runner's, so a
+        runner still holding the job from before it was failed as stale can
+        no longer commit progress (see commit_progress).
+        
+        Returns:
+            The claim token for the runner, or None if the job cannot be claimed
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            token = str(uuid.uuid4())
+            table = SpotifySyncJob.__table__
+            result = db.session.execute(
+                table.update()
+                .where(table.c.id == job_id, table.c.status.in_(['queued', 'failed']))
+                .values(
+                    status='running',
+                    started_at=db.func.coalesce(table.c.started_at, now),
+                    finished_at=None,
+                    error_message=None,
+                    updated_at=now,
+                    claim_token=token
+                )
+            )
+            db.session.commit()
+            return token if result.rowcount == 1 else None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Database error claiming Spotify sync job {job_id}: {str(e)}")
+            return None
+
+    def commit_progress(self, claim_token):
+        """
+        Commit the job's changes if the runner still holds its claim.
+        
+        The token check is an UPDATE in the same transaction as the changes,
+        so a job failed as stale or claimed by another runner is never
+        written by this one.
+        
+        Raises:
+            JobClaimLost: The claim was released or taken over; nothing was committed
+        """
+        table = SpotifySyncJob.__table__
+        with db.session.no_autoflush:
+            # Checked before the pending changes (which may release the claim) are flushed
+            result = db.session.execute(
+                table.update()
+                .where(table.c.id == self.id, table.c.claim_token == claim_token)
+                .values(updated_at=datetime.now(timezone.utc))
+            )
+        if result.rowcount != 1:
+            db.session.rollback()
+            raise JobClaimLost(f"Spotify sync job {self.id} is no longer claimed by this runner")
+        db.session.commit()
+
+    @staticmethod
+    def find_active(direction, playlist_id=None):
+        """
+        Find a queued or running job of this direction (and playlist), failing stale ones first.
+        
+        Returns:
+            The active job, or None
+        """
+        SpotifySyncJob.fail_stale()
+        query = SpotifySyncJob.query.filter(
+            SpotifySyncJob.direction == direction,
+            SpotifySyncJob.status.in_(['queued', 'running'])
+        )
+        if playlist_id is not None:
+            query = query.filter(SpotifySyncJob.playlist_id == playlist_id)
+        return query.first()
+
+    @staticmethod
+    def create(user_id, direction, playlist_id=None, spotify_playlist_id=None, options=None):
+        """Create a queued job"""
+        try:
+            job = SpotifySyncJob(
+                user_id=user_id,
+                direction=direction,
+                playlist_id=playlist_id,
+                spotify_playlist_id=spotify_playlist_id,
+                options=json.dumps(options or {})
+            )
+            db.session.add(job)
+            db.session.commit()
+            return job, None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Database error creating Spotify {direction} job: {str(e)}")
+            return None, str(e)
+
+    @staticmethod
+    def find_by_id(job_id):
+        """Find a job by ID"""
+        try:
+            return SpotifySyncJob.query.filter_by(id=job_id).first()
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Database error finding Spotify sync job {job_id}: {str(e)}")
+            return None
+
+    @staticmethod
+    def find_by_id_and_user(job_id, user_id):
+        """Find a job by ID ensuring it belongs to the user"""
+        try:
+            return SpotifySyncJob.query.filter_by(id=job_id, user_id=user_id).first()
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Database error finding Spotify sync job {job_id} for user {user_id}: {str(e)}")
+            return None
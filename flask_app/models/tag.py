@@ -40,6 +40,10 @@ class Tag(BaseModel):
             tag, error = Tag.safe_create(name=normalized_name)
             
             if error:
+                # Another request (or import job) may have created it in the meantime
+                tag = Tag.query.filter_by(name=normalized_name).first()
+                if tag:
+                    return tag, None
                 from flask import current_app
                 current_app.logger.error(f"Error creating tag '{normalized_name}': {error}")
                 return None, error
@@ -73,6 +77,32 @@ class Tag(BaseModel):
             current_app.logger.error(f"Error getting tags with counts: {str(e)}")
             return [], str(e)
     
+    @staticmethod
+    def get_user_tags_with_counts(user_id):
+        """
+        Get the tags a user has used, with the number of their briefs carrying each.
+        
+        Read from user_tag_counts, which ResearchBrief.add_tag, remove_tag and
+        safe_delete keep up to date, so this is one indexed lookup on user_id
+        however many briefs exist in total.
+        
+        Returns:
+            Tuple of (list of (Tag, count) ordered by tag name, error_message)
+        """
+        try:
+            from .user_tag_count import UserTagCount
+            rows = db.session.query(Tag, UserTagCount.brief_count)\
+                .join(UserTagCount, UserTagCount.tag_id == Tag.id)\
+                .filter(UserTagCount.user_id == user_id, UserTagCount.brief_count > 0)\
+                .order_by(Tag.name)\
+                .all()
+            return [(tag, count) for tag, count in rows], None
+            
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Error getting tag counts for user {user_id}: {str(e)}")
+            return [], str(e)
+    
     @staticmethod
     def get_all_tags():
         """Get all tags ordered by name"""
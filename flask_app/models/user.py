@@ -39,6 +39,30 @@ class User(BaseModel, UserMixin):
             current_app.logger.error(f"Error updating last login for user {self.id}: {str(e)}")
             return False
     
+    def safe_delete(self):
+        """
+        Delete the user and everything that cascades from them, dropping their
+        research briefs' references to stored PDFs (removed once nothing else
+        uses them)
+        """
+        from .pdf_blob import PdfBlob
+        from .research_brief import ResearchBrief
+        try:
+            refs = db.session.query(ResearchBrief.pdf_sha256, db.func.count())\
+                .filter(ResearchBrief.user_id == self.id, ResearchBrief.pdf_sha256.isnot(None))\
+                .group_by(ResearchBrief.pdf_sha256).all()
+            for digest, count in refs:
+                PdfBlob.release(digest, count)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error releasing PDFs of user {self.id}: {str(e)}")
+            return False, str(e)
+        
+        success, error = super().safe_delete()
+        if success:
+            PdfBlob.purge([digest for digest, _ in refs])
+        return success, error
+    
     @staticmethod
     def find_by_username(username):
         """Find user by username with error handling"""
@@ -0,0 +1,90 @@
+# flask_app/models/user_tag_count.py
+
+from .base import db, BaseModel
+from datetime import datetime, timezone
+
+class UserTagCount(BaseModel):
+    """Number of a user's research briefs carrying each tag (denormalized from research_brief_tags)"""
+    __tablename__ = 'user_tag_counts'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    brief_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Rows go with their user (tags are global and never deleted)
+    user = db.relationship('User', backref=db.backref('tag_counts', lazy='dynamic', cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<UserTagCount user={self.user_id} tag={self.tag_id}: {self.brief_count}>'
+
+    @staticmethod
+    def adjust(user_id, tag_ids, delta):
+        """
+        Add delta to the user's count for each tag, as part of the current transaction.
+
+        Increments are upserts (INSERT ... ON CONFLICT DO UPDATE), so concurrent
+        requests tagging briefs with the same new tag cannot collide on the
+        primary key. Rows that drop to zero are deleted.
+        """
+        counts = UserTagCount.__table__
+        now = datetime.now(timezone.utc)
+
+        for tag_id in tag_ids:
+            if delta > 0:
+                UserTagCount.upsert(
+                    {'user_id': user_id, 'tag_id': tag_id, 'brief_count': delta},
+                    ['user_id', 'tag_id'],
+                    {'brief_count': counts.c.brief_count + delta}
+                )
+            else:
+                key = (counts.c.user_id == user_id) & (counts.c.tag_id == tag_id)
+                db.session.execute(
+                    counts.update().where(key).values(brief_count=counts.c.brief_count + delta, updated_at=now)
+                )
+                db.session.execute(counts.delete().where(key, counts.c.brief_count <= 0))
+
+    @staticmethod
+    def rebuild(user_id=None):
+        """
+        Recompute counts from research_brief_tags.
+
+        Repairs drift from changes made outside ResearchBrief.add_tag,
+        remove_tag and safe_delete (bulk edits, manual SQL).
+
+        Args:
+            user_id: Optional user to rebuild (all users if None)
+
+        Returns:
+            Tuple of (row_count, error_message)
+        """
+        try:
+            from .research_brief import ResearchBrief, research_brief_tags
+            counts = UserTagCount.__table__
+            now = datetime.now(timezone.utc)
+
+            grouped = db.select(
+                ResearchBrief.user_id,
+                research_brief_tags.c.tag_id,
+                db.func.count(),
+                db.literal(now),
+                db.literal(now),
+            ).select_from(
+                research_brief_tags.join(ResearchBrief, ResearchBrief.id == research_brief_tags.c.research_brief_id)
+            ).group_by(ResearchBrief.user_id, research_brief_tags.c.tag_id)
+
+            delete = counts.delete()
+            if user_id is not None:
+                grouped = grouped.where(ResearchBrief.user_id == user_id)
+                delete = delete.where(counts.c.user_id == user_id)
+
+            db.session.execute(delete)
+            result = db.session.execute(counts.insert().from_select(
+                ['user_id', 'tag_id', 'brief_count', 'created_at', 'updated_at'], grouped
+            ))
+            db.session.commit()
+            return result.rowcount, None
+        except Exception as e:
+            db.session.rollback()
+            from flask import current_app
+            current_app.logger.error(f"Error rebuilding tag counts: {str(e)}")
+            return 0, str(e)
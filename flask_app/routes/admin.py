@@ -4,7 +4,7 @@ from flask import flash, redirect, render_template, url_for, request, current_ap
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
 from sqlalchemy import func, desc
-from flask_app.models import User, AdminLog, SystemMetrics, db
+from flask_app.models import User, AdminLog, SystemMetrics, LlmResponseCache, db
 from flask_app.forms import CreateUserForm, UpdateUserForm, ChangePasswordForm, BulkUserActionForm
 from datetime import datetime, timezone, timedelta
 
@@ -303,7 +303,8 @@ def register_admin_routes(app):
                 'total_users': SystemMetrics.get_metric('total_users'),
                 'active_users': SystemMetrics.get_metric('active_users'),
                 'admin_users': SystemMetrics.get_metric('admin_users'),
-                'recent_logins': User.query.filter(User.last_login >= datetime.now(timezone.utc) - timedelta(days=7)).count()
+                'recent_logins': User.query.filter(User.last_login >= datetime.now(timezone.utc) - timedelta(days=7)).count(),
+                'llm_cache': LlmResponseCache.get_stats()
             }
             
             return jsonify(stats)
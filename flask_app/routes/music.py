@@ -3,8 +3,13 @@
 from flask import flash, redirect, render_template, url_for, request, current_app, jsonify
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-from flask_app.models import Song, MusicImportJob, Playlist, SpotifyAuth, db
+from flask_app.models import Song, MusicImportJob, Playlist, SpotifyAuth, SpotifySyncJob, db
 from flask_app.utils.spotify_service import SpotifyService
+from flask_app.utils.spotify_client import spotify_client_manager
+from flask_app.utils.spotify_jobs import start_spotify_sync_job
+from flask_app.utils.smart_playlists import compile_rules, create_smart_playlist, materialize_playlist
+from flask_app.utils.playlist_sets import SET_OPERATIONS, create_playlist_from_set
+from flask_app.utils.dj_sequencer import sequence_playlist
 import os
 import threading
 from datetime import datetime, timezone
@@ -189,15 +194,37 @@ def register_music_routes(app):
                 flash('Playlist not found.', 'danger')
                 return redirect(url_for('playlists_list'))
             
-            # Get songs in order
-            songs = playlist.get_songs_ordered()
+            # Songs are fetched page by page from playlist_songs_page by the virtualized table
             current_app.logger.info(f"Playlist {playlist_id} viewed by {current_user.username}")
-            return render_template('music/playlist_view.html', playlist=playlist, songs=songs)
+            return render_template('music/playlist_view.html', playlist=playlist)
         except Exception as e:
             current_app.logger.error(f"Error loading playlist: {str(e)}")
             flash('An error occurred while loading the playlist.', 'danger')
             return redirect(url_for('playlists_list'))
     
+    @app.route('/music/playlists/<int:playlist_id>/songs')
+    @login_required
+    def playlist_songs_page(playlist_id):
+        """Get one page of playlist songs (keyset paginated on position)"""
+        try:
+            playlist = Playlist.find_by_id_and_user(playlist_id, current_user.id)
+            if not playlist:
+                return jsonify({'error': 'Playlist not found'}), 404
+            
+            after = request.args.get('after', type=int)
+            after_uri = request.args.get('after_uri')
+            limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+            
+            songs, next_cursor = playlist.get_songs_page(after_position=after, after_uri=after_uri, limit=limit)
+            return jsonify({
+                'songs': songs,
+                'next': next_cursor,
+                'total': playlist.song_count
+            })
+        except Exception as e:
+            current_app.logger.error(f"Error getting playlist songs: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/music/playlists/create', methods=['POST'])
     @login_required
     def playlist_create():
@@ -224,6 +251,113 @@ def register_music_routes(app):
             current_app.logger.error(f"Error creating playlist: {str(e)}")
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/music/playlists/smart/create', methods=['POST'])
+    @login_required
+    def playlist_create_smart():
+        """Create a rule-based smart playlist and materialize its songs"""
+        try:
+            data = request.get_json() or {}
+            name = (data.get('name') or '').strip()
+            description = data.get('description')
+            if description:
+                description = description.strip() or None
+            else:
+                description = None
+            
+            if not name:
+                return jsonify({'error': 'Playlist name is required'}), 400
+            
+            rule_set, error = compile_rules(data.get('rules'), match=data.get('match', 'all'))
+            if error:
+                return jsonify({'error': error}), 400
+            
+            playlist, error = create_smart_playlist(current_user.id, name, rule_set, description)
+            if error:
+                return jsonify({'error': error}), 500
+            
+            current_app.logger.info(f"Smart playlist {playlist.id} created with {playlist.song_count} songs by {current_user.username}")
+            return jsonify(playlist.to_dict()), 201
+        except Exception as e:
+            current_app.logger.error(f"Error creating smart playlist: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/music/playlists/combine', methods=['POST'])
+    @login_required
+    def playlist_combine():
+        """Create a playlist from a union, intersection or difference of playlists"""
+        try:
+            data = request.get_json() or {}
+            name = (data.get('name') or '').strip()
+            description = data.get('description')
+            if description:
+                description = description.strip() or None
+            else:
+                description = None
+            operation = data.get('operation')
+            
+            if not name:
+                return jsonify({'error': 'Playlist name is required'}), 400
+            
+            if operation not in SET_OPERATIONS:
+                return jsonify({'error': f"operation must be one of: {', '.join(SET_OPERATIONS)}"}), 400
+            
+            try:
+                playlist_ids = list(dict.fromkeys(int(pid) for pid in data.get('playlist_ids') or []))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'playlist_ids must be a list of playlist IDs'}), 400
+            
+            if len(playlist_ids) < 2:
+                return jsonify({'error': 'At least two playlists are required'}), 400
+            
+            owned = Playlist.query.filter(
+                Playlist.id.in_(playlist_ids),
+                Playlist.user_id == current_user.id
+            ).count()
+            if owned != len(playlist_ids):
+                return jsonify({'error': 'Playlist not found'}), 404
+            
+            playlist, error = create_playlist_from_set(
+                current_user.id, name, operation, playlist_ids, description
+            )
+            if error:
+                return jsonify({'error': error}), 500
+            
+            current_app.logger.info(
+                f"Playlist {playlist.id} created from {operation} of {playlist_ids} by {current_user.username}"
+            )
+            return jsonify(playlist.to_dict()), 201
+        except Exception as e:
+            current_app.logger.error(f"Error combining playlists: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/music/playlists/<int:playlist_id>/rules', methods=['POST'])
+    @login_required
+    def playlist_update_rules(playlist_id):
+        """Replace a smart playlist's rules and rebuild its songs"""
+        try:
+            playlist = Playlist.find_by_id_and_user(playlist_id, current_user.id)
+            if not playlist:
+                return jsonify({'error': 'Playlist not found'}), 404
+            
+            # Rules would replace a regular playlist's hand-picked songs
+            if not playlist.is_smart():
+                return jsonify({'error': 'Only smart playlists have rules'}), 400
+            
+            data = request.get_json() or {}
+            rule_set, error = compile_rules(data.get('rules'), match=data.get('match', 'all'))
+            if error:
+                return jsonify({'error': error}), 400
+            
+            song_count, error = materialize_playlist(playlist, rule_set)
+            if error:
+                return jsonify({'error': error}), 500
+            
+            current_app.logger.info(f"Smart playlist {playlist_id} rules updated ({song_count} songs) by {current_user.username}")
+            return jsonify(playlist.to_dict())
+        except Exception as e:
+            current_app.logger.error(f"Error updating smart playlist rules: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/music/playlists/<int:playlist_id>/update', methods=['POST'])
     @login_required
     def playlist_update(playlist_id):
@@ -288,14 +422,7 @@ def register_music_routes(app):
             if not track_uris or not isinstance(track_uris, list):
                 return jsonify({'error': 'track_uris must be a non-empty list'}), 400
             
-            added = []
-            errors = []
-            for track_uri in track_uris:
-                success, error = playlist.add_song(track_uri)
-                if success:
-                    added.append(track_uri)
-                else:
-                    errors.append({'track_uri': track_uri, 'error': error})
+            added, errors = playlist.add_songs(track_uris)
             
             current_app.logger.info(f"Added {len(added)} songs to playlist {playlist_id} by {current_user.username}")
             return jsonify({
@@ -356,6 +483,60 @@ def register_music_routes(app):
             current_app.logger.error(f"Error reordering playlist: {str(e)}")
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/music/playlists/<int:playlist_id>/move', methods=['POST'])
+    @login_required
+    def playlist_move_song(playlist_id):
+        """Move a single song before or after another song"""
+        try:
+            playlist = Playlist.find_by_id_and_user(playlist_id, current_user.id)
+            if not playlist:
+                return jsonify({'error': 'Playlist not found'}), 404
+            
+            data = request.get_json() or {}
+            track_uri = data.get('track_uri')
+            before = data.get('before')
+            after = data.get('after')
+            
+            if not track_uri:
+                return jsonify({'error': 'track_uri is required'}), 400
+            if (before is None) == (after is None):
+                return jsonify({'error': 'Exactly one of before or after is required'}), 400
+            
+            success, error = playlist.move_song(track_uri, before=before, after=after)
+            if not success:
+                return jsonify({'error': error}), 400
+            
+            current_app.logger.info(f"Song {track_uri} moved in playlist {playlist_id} by {current_user.username}")
+            return jsonify({'success': True})
+        except Exception as e:
+            current_app.logger.error(f"Error moving song in playlist: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/music/playlists/<int:playlist_id>/sequence', methods=['POST'])
+    @login_required
+    def playlist_sequence(playlist_id):
+        """Reorder playlist for smooth harmonic DJ transitions"""
+        try:
+            playlist = Playlist.find_by_id_and_user(playlist_id, current_user.id)
+            if not playlist:
+                return jsonify({'error': 'Playlist not found'}), 404
+            
+            data = request.get_json(silent=True) or {}
+            dry_run = bool(data.get('dry_run', False))
+            
+            result, error = sequence_playlist(playlist, apply=not dry_run)
+            if error:
+                return jsonify({'error': error}), 500
+            
+            current_app.logger.info(
+                f"Playlist {playlist_id} sequenced in {result['elapsed_ms']}ms "
+                f"(cost {result['cost_before']} -> {result['cost_after']}) by {current_user.username}"
+            )
+            return jsonify(result)
+        except Exception as e:
+            current_app.logger.error(f"Error sequencing playlist: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/music/playlists/user-playlists')
     @login_required
     def user_playlists_json():
@@ -447,6 +628,7 @@ def register_music_routes(app):
             # Delete all Spotify auth records (for shared account)
             deleted_count = SpotifyAuth.query.delete()
             db.session.commit()
+            spotify_client_manager.invalidate()
             
             current_app.logger.info(f"Spotify disconnected by {current_user.username}, removed {deleted_count} auth record(s)")
             return jsonify({'success': True, 'message': 'Disconnected from Spotify'})
@@ -455,6 +637,45 @@ def register_music_routes(app):
             current_app.logger.error(f"Error disconnecting Spotify: {str(e)}")
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/music/spotify/metrics')
+    @login_required
+    @admin_required
+    def spotify_metrics():
+        """Get shared Spotify client token cache, connection pool and rate limit metrics (admin-only)"""
+        try:
+            return jsonify(spotify_client_manager.get_metrics())
+        except Exception as e:
+            current_app.logger.error(f"Error getting Spotify metrics: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/music/spotify/enrich-features', methods=['POST'])
+    @login_required
+    @admin_required
+    def spotify_enrich_features():
+        """Start a background job fetching audio features for songs missing them (admin-only)"""
+        try:
+            active = SpotifySyncJob.find_active('enrich')
+            if active:
+                return jsonify({'error': 'Audio feature enrichment is already running', 'job_id': active.id}), 409
+            
+            missing = Song.count_missing_audio_features()
+            if missing == 0:
+                return jsonify({'error': 'No songs are missing audio features'}), 400
+            
+            job, error = SpotifySyncJob.create(current_user.id, 'enrich')
+            if error:
+                return jsonify({'error': error}), 500
+            
+            # Start background enrichment thread
+            start_spotify_sync_job(job, current_app._get_current_object())
+            
+            current_app.logger.info(f"Audio feature enrichment job {job.id} for {missing} songs started by {current_user.username}")
+            return jsonify({'job_id': job.id, 'status': 'queued', 'missing_count': missing})
+            
+        except Exception as e:
+            current_app.logger.error(f"Error starting audio feature enrichment: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
     # ========== SPOTIFY PLAYLIST SYNC ROUTES ==========
     
     @app.route('/music/playlists/<int:playlist_id>/export-to-spotify', methods=['POST'])
@@ -470,39 +691,82 @@ def register_music_routes(app):
             data = request.get_json() or {}
             public = data.get('public', False)
             force_resync = data.get('force', False)
+            recreate = data.get('recreate', False)
             
-            if playlist.is_synced_to_spotify() and not force_resync:
+            if playlist.is_synced_to_spotify() and not (force_resync or recreate):
                 return jsonify({
                     'error': 'Playlist already synced to Spotify. Use force=true to re-sync.',
                     'spotify_playlist_id': playlist.spotify_playlist_id
                 }), 400
             
-            spotify_service = SpotifyService()
-            spotify_playlist, error = spotify_service.sync_local_to_spotify(playlist, public=public)
+            active = SpotifySyncJob.find_active('export', playlist_id=playlist.id)
+            if active:
+                return jsonify({'error': 'An export of this playlist is already running', 'job_id': active.id}), 409
             
+            # Re-syncs update the existing Spotify playlist in place unless recreate is requested
+            job, error = SpotifySyncJob.create(
+                current_user.id, 'export', playlist_id=playlist.id,
+                options={'public': public, 'recreate': recreate}
+            )
             if error:
                 return jsonify({'error': error}), 500
             
-            # Update playlist with Spotify info
-            success, error = playlist.safe_update(
-                spotify_playlist_id=spotify_playlist['id'],
-                spotify_synced_at=datetime.now(timezone.utc)
-            )
+            # Start background export thread
+            start_spotify_sync_job(job, current_app._get_current_object())
             
-            if not success:
-                current_app.logger.error(f"Error updating playlist with Spotify ID: {error}")
-            
-            current_app.logger.info(f"Playlist {playlist_id} exported to Spotify by {current_user.username}")
-            return jsonify({
-                'success': True,
-                'spotify_playlist': spotify_playlist,
-                'playlist': playlist.to_dict()
-            })
+            current_app.logger.info(f"Spotify export job {job.id} for playlist {playlist_id} started by {current_user.username}")
+            return jsonify({'job_id': job.id, 'status': 'queued'})
             
         except Exception as e:
             current_app.logger.error(f"Error exporting playlist to Spotify: {str(e)}")
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/music/spotify/jobs/status')
+    @login_required
+    def spotify_job_status():
+        """Get Spotify export/import job status"""
+        try:
+            job_id = request.args.get('job_id')
+            if not job_id:
+                return jsonify({'error': 'job_id parameter required'}), 400
+            
+            job = SpotifySyncJob.find_by_id_and_user(job_id, current_user.id)
+            if not job:
+                return jsonify({'error': 'Spotify job not found'}), 404
+            
+            return jsonify(job.to_dict())
+            
+        except Exception as e:
+            current_app.logger.error(f"Error getting Spotify job status: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/music/spotify/jobs/<job_id>/resume', methods=['POST'])
+    @login_required
+    def spotify_job_resume(job_id):
+        """Resume a failed Spotify export/import job from its last completed batch"""
+        try:
+            SpotifySyncJob.fail_stale()
+            job = SpotifySyncJob.find_by_id_and_user(job_id, current_user.id)
+            if not job:
+                return jsonify({'error': 'Spotify job not found'}), 404
+            
+            if not job.can_resume():
+                return jsonify({'error': f'Only failed jobs can be resumed (job is {job.status})'}), 400
+            
+            # Claims the job first, so a second resume of the same job is refused
+            if not start_spotify_sync_job(job, current_app._get_current_object()):
+                return jsonify({'error': 'Job is already being resumed'}), 409
+            
+            current_app.logger.info(
+                f"Spotify {job.direction} job {job.id} resumed at batch {job.completed_batches} by {current_user.username}"
+            )
+            return jsonify({'job_id': job.id, 'status': 'running'})
+            
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error resuming Spotify job: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/music/spotify/playlists')
     @login_required
     def spotify_playlists():
@@ -536,23 +800,18 @@ def register_music_routes(app):
             data = request.get_json() or {}
             playlist_name = data.get('name')  # Optional override
             
-            spotify_service = SpotifyService()
-            result, error = spotify_service.sync_spotify_to_local(
-                spotify_playlist_id=spotify_playlist_id,
-                local_user_id=current_user.id,
-                playlist_name=playlist_name
+            job, error = SpotifySyncJob.create(
+                current_user.id, 'import', spotify_playlist_id=spotify_playlist_id,
+                options={'name': playlist_name}
             )
-            
             if error:
                 return jsonify({'error': error}), 500
             
-            current_app.logger.info(f"Imported Spotify playlist {spotify_playlist_id} by {current_user.username}")
-            return jsonify({
-                'success': True,
-                'playlist': result['playlist'].to_dict(),
-                'added_count': result['added_count'],
-                'skipped_count': result['skipped_count']
-            }), 201
+            # Start background import thread
+            start_spotify_sync_job(job, current_app._get_current_object())
+            
+            current_app.logger.info(f"Spotify import job {job.id} for {spotify_playlist_id} started by {current_user.username}")
+            return jsonify({'job_id': job.id, 'status': 'queued'})
             
         except Exception as e:
             current_app.logger.error(f"Error importing Spotify playlist: {str(e)}")
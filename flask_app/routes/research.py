@@ -3,12 +3,15 @@
 from flask import flash, redirect, render_template, url_for, request, current_app, send_file, jsonify
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-from flask_app.models import ResearchBrief, Tag, db
+from flask_app.models import ResearchBrief, ResearchImportJob, Tag, db
 from flask_app.forms import ResearchBriefForm, EditBriefForm
 from flask_app.utils.openai_service import process_research_brief, calculate_pdf_hash
 from flask_app.utils.html_sanitizer import sanitize_html
+from flask_app.utils.pdf_store import blob_path
+from flask_app.utils.research_jobs import enqueue_research_jobs
 from io import BytesIO
 import os
+import uuid
 
 def register_research_routes(app):
     """Register research brief routes"""
@@ -46,31 +49,38 @@ def register_research_routes(app):
             
             if briefs is None:
                 flash('An error occurred while loading your research briefs.', 'danger')
-                briefs = ResearchBrief.query.filter_by(user_id=current_user.id).paginate(
-                    page=page, per_page=per_page, error_out=False
-                )
+                briefs = ResearchBrief.query.filter_by(user_id=current_user.id)\
+                    .options(ResearchBrief.listing_options())\
+                    .paginate(page=page, per_page=per_page, error_out=False)
             
-            # Get all available tags with counts for filter UI
-            tags_with_counts, error = Tag.get_all_tags_with_counts()
+            # Tags the current user has used, with their brief counts, for the filter UI
+            tags_with_counts, error = Tag.get_user_tags_with_counts(current_user.id)
             if error:
                 current_app.logger.warning(f"Error getting tags with counts: {error}")
                 tags_with_counts = []
             
-            # Get selected tag if filtering
+            # Get selected tag if filtering (normally already loaded with the counts)
             selected_tag = None
             if tag_id:
-                selected_tag = Tag.query.get(tag_id)
+                selected_tag = next((tag for tag, _ in tags_with_counts if tag.id == tag_id), None)\
+                    or db.session.get(Tag, tag_id)
+            
+            # Tags for every brief on the page in one query
+            tags_by_brief, error = ResearchBrief.get_tags_for_briefs(brief.id for brief in briefs.items)
+            if error:
+                current_app.logger.warning(f"Error getting tags for briefs: {error}")
             
             current_app.logger.info(f"Research briefs list accessed by {current_user.username}" + (f" (filtered by tag {tag_id})" if tag_id else ""))
             return render_template('research/list.html', 
                                  briefs=briefs, 
                                  tags_with_counts=tags_with_counts,
+                                 tags_by_brief=tags_by_brief,
                                  selected_tag=selected_tag)
             
         except Exception as e:
             current_app.logger.error(f"Error in research list: {str(e)}")
             flash('An error occurred while loading your research briefs.', 'danger')
-            return render_template('research/list.html', briefs=None, tags_with_counts=[], selected_tag=None)
+            return render_template('research/list.html', briefs=None, tags_with_counts=[], tags_by_brief={}, selected_tag=None)
     
     @app.route('/research/create', methods=['GET', 'POST'])
     @login_required
@@ -196,144 +206,60 @@ def register_research_routes(app):
                         flash(f'Total size of all files exceeds 100MB limit. Current total: {total_size / (1024*1024):.2f} MB', 'danger')
                         return render_template('research/create.html', form=form)
                     
-                    # Process each PDF file
-                    results = []
-                    success_count = 0
-                    duplicate_count = 0
-                    error_count = 0
+                    # Store each PDF and queue one job per file; the worker pool does the slow part
+                    upload_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'research')
+                    os.makedirs(upload_dir, exist_ok=True)
+                    batch_id = str(uuid.uuid4())
+                    jobs = []
+                    batch_hashes = {}
                     
                     for pdf_file in pdf_files:
-                        if not pdf_file:
-                            continue
-                        
                         pdf_filename = secure_filename(pdf_file.filename)
                         pdf_data = pdf_file.read()
+                        job = ResearchImportJob(
+                            batch_id=batch_id,
+                            user_id=current_user.id,
+                            original_filename=pdf_filename,
+                            file_size=len(pdf_data),
+                            tags=form.tags.data or None
+                        )
+                        jobs.append(job)
                         
                         if len(pdf_data) == 0:
-                            results.append({
-                                'filename': pdf_filename,
-                                'status': 'error',
-                                'message': 'The uploaded PDF file is empty.',
-                                'brief_id': None
-                            })
-                            error_count += 1
+                            job.status, job.stage = 'failed', 'done'
+                            job.error_message = 'The uploaded PDF file is empty.'
                             continue
                         
-                        # Check for duplicates
+                        job.content_hash = calculate_pdf_hash(pdf_data)
+                        
+                        # Duplicates are cheap to detect, so report them without queueing
                         is_duplicate, duplicate_brief, duplicate_reason = ResearchBrief.check_duplicate(
                             pdf_filename, pdf_data
                         )
+                        if not is_duplicate and job.content_hash in batch_hashes:
+                            is_duplicate, duplicate_reason = True, f"Same content as '{batch_hashes[job.content_hash]}' in this upload"
                         
                         if is_duplicate:
-                            results.append({
-                                'filename': pdf_filename,
-                                'status': 'duplicate',
-                                'message': f'Duplicate detected: {duplicate_reason}',
-                                'brief_id': duplicate_brief.id if duplicate_brief else None
-                            })
-                            duplicate_count += 1
+                            job.status, job.stage = 'duplicate', 'done'
+                            job.error_message = f'Duplicate detected: {duplicate_reason}'
+                            job.brief_id = duplicate_brief.id if duplicate_brief else None
                             current_app.logger.info(f"Duplicate PDF detected: {pdf_filename} by {current_user.username}")
                             continue
                         
-                        # Process the brief
-                        brief_data, error = process_research_brief(
-                            source_text=None,
-                            pdf_data=pdf_data,
-                            pdf_filename=pdf_filename
-                        )
-                        
-                        if error:
-                            results.append({
-                                'filename': pdf_filename,
-                                'status': 'error',
-                                'message': error,
-                                'brief_id': None
-                            })
-                            error_count += 1
-                            current_app.logger.error(f"Error generating research brief for {pdf_filename}: {error}")
-                            continue
-                        
-                        # Validate brief_data exists and has required fields
-                        if not brief_data:
-                            results.append({
-                                'filename': pdf_filename,
-                                'status': 'error',
-                                'message': 'No data returned from AI service.',
-                                'brief_id': None
-                            })
-                            error_count += 1
-                            current_app.logger.error(f"process_research_brief returned None for {pdf_filename}")
-                            continue
-                        
-                        # Validate required fields exist
-                        required_fields = ['title', 'citation', 'summary', 'source_text']
-                        missing_fields = [field for field in required_fields if field not in brief_data]
-                        if missing_fields:
-                            results.append({
-                                'filename': pdf_filename,
-                                'status': 'error',
-                                'message': f'Missing required fields: {", ".join(missing_fields)}',
-                                'brief_id': None
-                            })
-                            error_count += 1
-                            current_app.logger.error(f"Missing required fields in brief_data for {pdf_filename}: {missing_fields}")
-                            continue
-                        
-                        # Calculate content hash for storage
-                        content_hash = calculate_pdf_hash(pdf_data)
-                        
-                        # Create the research brief record
-                        new_brief, db_error = ResearchBrief.safe_create(
-                            user_id=current_user.id,
-                            title=brief_data['title'],
-                            citation=brief_data['citation'],
-                            summary=brief_data['summary'],
-                            source_text=brief_data['source_text'],
-                            pdf_filename=pdf_filename,
-                            pdf_data=pdf_data,
-                            content_hash=content_hash,
-                            source_type='pdf',
-                            model_name=brief_data.get('model_name')
-                        )
-                        
-                        if db_error:
-                            results.append({
-                                'filename': pdf_filename,
-                                'status': 'error',
-                                'message': f'Error saving brief: {db_error}',
-                                'brief_id': None
-                            })
-                            error_count += 1
-                            current_app.logger.error(f"Error saving brief for {pdf_filename}: {db_error}")
-                            continue
-                        
-                        # Add tags if provided
-                        if form.tags.data:
-                            add_tags_to_brief(new_brief, form.tags.data)
-                        
-                        results.append({
-                            'filename': pdf_filename,
-                            'status': 'success',
-                            'message': 'Research brief created successfully!',
-                            'brief_id': new_brief.id
-                        })
-                        success_count += 1
-                        current_app.logger.info(f"Research brief {new_brief.id} created from {pdf_filename} by {current_user.username}")
+                        batch_hashes[job.content_hash] = pdf_filename
+                        job.stored_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}_{pdf_filename}")
+                        with open(job.stored_path, 'wb') as f:
+                            f.write(pdf_data)
                     
-                    # Prepare flash messages and results for template
-                    if success_count > 0:
-                        flash(f'Successfully processed {success_count} PDF(s)!', 'success')
-                    if duplicate_count > 0:
-                        flash(f'Found {duplicate_count} duplicate PDF(s) that were skipped.', 'warning')
-                    if error_count > 0:
-                        flash(f'Failed to process {error_count} PDF(s).', 'danger')
+                    db.session.add_all(jobs)
+                    db.session.commit()
                     
-                    # If only one file and it succeeded, redirect to view page
-                    if len(results) == 1 and results[0]['status'] == 'success':
-                        return redirect(url_for('research_view', id=results[0]['brief_id']))
+                    queued = [job.id for job in jobs if job.status == 'queued']
+                    if queued:
+                        enqueue_research_jobs(queued, current_app._get_current_object())
                     
-                    # Otherwise, show results page
-                    return render_template('research/create.html', form=form, batch_results=results)
+                    current_app.logger.info(f"Research upload batch {batch_id}: {len(queued)} of {len(jobs)} PDF(s) queued by {current_user.username}")
+                    return redirect(url_for('research_upload_progress', batch_id=batch_id))
             
             return render_template('research/create.html', form=form)
             
@@ -344,12 +270,42 @@ def register_research_routes(app):
             flash(f'An unexpected error occurred while creating the research brief: {str(e)}', 'danger')
             return render_template('research/create.html', form=form)
     
+    @app.route('/research/uploads/<batch_id>')
+    @login_required
+    def research_upload_progress(batch_id):
+        """Per-file progress of a PDF upload batch"""
+        jobs = ResearchImportJob.find_by_batch(batch_id, current_user.id)
+        if not jobs:
+            flash('Upload not found or you do not have permission to view it.', 'danger')
+            return redirect(url_for('research_list'))
+        
+        return render_template('research/upload_progress.html', batch_id=batch_id, jobs=jobs)
+    
+    @app.route('/research/uploads/<batch_id>/status')
+    @login_required
+    def research_upload_status(batch_id):
+        """Get the status of every job in a PDF upload batch"""
+        try:
+            jobs = ResearchImportJob.find_by_batch(batch_id, current_user.id)
+            if not jobs:
+                return jsonify({'error': 'Upload not found'}), 404
+            
+            return jsonify({
+                'batch_id': batch_id,
+                'finished': all(job.is_finished() for job in jobs),
+                'jobs': [job.to_dict() for job in jobs]
+            })
+            
+        except Exception as e:
+            current_app.logger.error(f"Error getting research upload status: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/research/<int:id>')
     @login_required
     def research_view(id):
         """View an individual research brief"""
         try:
-            brief = ResearchBrief.find_by_id_and_user(id, current_user.id)
+            brief = ResearchBrief.find_by_id_and_user(id, current_user.id, with_source_text=True)
             
             if not brief:
                 flash('Research brief not found or you do not have permission to view it.', 'danger')
@@ -474,23 +430,35 @@ def register_research_routes(app):
             flash('Research brief not found or you do not have permission to access it.', 'danger')
             return redirect(url_for('research_list'))
         
-        if not brief.pdf_data or brief.source_type != 'pdf':
+        if not brief.has_pdf():
             flash('No PDF file available for this brief.', 'danger')
             return redirect(url_for('research_view', id=id))
         
         try:
-            # Create a file-like object from the binary data
-            pdf_file = BytesIO(brief.pdf_data)
-            
             # Determine filename
             filename = brief.pdf_filename or f'research_brief_{brief.id}.pdf'
             
+            if brief.pdf_sha256:
+                # Served from the file itself: the server can use sendfile, and Range/If-None-Match
+                # requests get partial or 304 responses
+                path = blob_path(brief.pdf_sha256)
+                if not os.path.exists(path):
+                    current_app.logger.error(f"Stored PDF {brief.pdf_sha256} for research brief {id} is missing")
+                    flash('The PDF file for this brief could not be found.', 'danger')
+                    return redirect(url_for('research_view', id=id))
+                pdf_file = path
+            else:
+                # Not yet moved to the PDF store (see migrations/move_pdfs_to_blob_store.py);
+                # pdf_data is deferred, so it is only read here
+                pdf_file = BytesIO(brief.pdf_data)
+            
             current_app.logger.info(f"PDF downloaded for research brief {id} by {current_user.username}")
             return send_file(
                 pdf_file,
                 mimetype='application/pdf',
                 as_attachment=True,
-                download_name=filename
+                download_name=filename,
+                conditional=True
             )
             
         except Exception as e:
@@ -507,41 +475,22 @@ def register_research_routes(app):
             tag_id = request.args.get('tag', type=int)
             selected_tag = None
             
-            # Get all tags with counts for filter UI
-            tags_with_counts, error = Tag.get_all_tags_with_counts()
+            # Tags the current user has used, with their brief counts, for the filter UI
+            user_tags_with_counts, error = Tag.get_user_tags_with_counts(current_user.id)
             if error:
                 current_app.logger.warning(f"Error getting tags with counts: {error}")
-                tags_with_counts = []
-            
-            # Filter tags_with_counts to only include those with briefs for current user
-            # We need to count briefs per tag for the current user only
-            user_tags_with_counts = []
-            for tag, count in tags_with_counts:
-                # Count briefs for this user with this tag
-                user_brief_count = ResearchBrief.query.filter_by(user_id=current_user.id)\
-                    .join(ResearchBrief.tags)\
-                    .filter(Tag.id == tag.id)\
-                    .count()
-                
-                if user_brief_count > 0:
-                    user_tags_with_counts.append((tag, user_brief_count))
             
             # If filtering by a specific tag
             if tag_id:
-                selected_tag = Tag.query.get(tag_id)
+                selected_tag = db.session.get(Tag, tag_id)
                 if not selected_tag:
                     flash('Tag not found.', 'warning')
                     return redirect(url_for('research_by_tags'))
                 
                 # Get all briefs for this user with this tag
-                briefs = ResearchBrief.query.filter_by(user_id=current_user.id)\
-                    .join(ResearchBrief.tags)\
-                    .filter(Tag.id == tag_id)\
-                    .order_by(ResearchBrief.created_at.desc())\
-                    .all()
-                
-                # Return single tag view
-                tags_with_briefs = [(selected_tag, briefs)] if briefs else []
+                tags_with_briefs, error = ResearchBrief.find_by_user_grouped_by_tag(current_user.id, tag_id=tag_id)
+                if error:
+                    flash('An error occurred while loading briefs by tags.', 'danger')
                 briefs_without_tags = []
                 
                 current_app.logger.info(f"Research briefs by tags viewed by {current_user.username} (filtered by tag {tag_id})")
@@ -551,41 +500,11 @@ def register_research_routes(app):
                                      tags_with_counts=user_tags_with_counts,
                                      selected_tag=selected_tag)
             
-            # No filter - show all tags
-            # Get all tags that have at least one brief
-            all_tags = Tag.get_all_tags()
-            
-            # Group briefs by tag for the current user
-            tags_with_briefs = []
-            for tag in all_tags:
-                # Get all briefs for this user that have this tag
-                briefs = ResearchBrief.query.filter_by(user_id=current_user.id)\
-                    .join(ResearchBrief.tags)\
-                    .filter(Tag.id == tag.id)\
-                    .order_by(ResearchBrief.created_at.desc())\
-                    .all()
-                
-                if briefs:  # Only include tags that have briefs for this user
-                    tags_with_briefs.append((tag, briefs))
-            
-            # Sort by tag name
-            tags_with_briefs.sort(key=lambda x: x[0].name)
-            
-            # Also get briefs with no tags
-            # Get all brief IDs that have tags
-            from sqlalchemy import distinct
-            from flask_app.models.research_brief import research_brief_tags
-            
-            # Get all brief IDs that have at least one tag
-            brief_ids_with_tags = db.session.query(distinct(research_brief_tags.c.research_brief_id)).all()
-            brief_ids_with_tags_set = {row[0] for row in brief_ids_with_tags}
-            
-            # Get all user's briefs
-            all_user_briefs = ResearchBrief.query.filter_by(user_id=current_user.id).all()
-            
-            # Filter to get only those without tags
-            briefs_without_tags = [brief for brief in all_user_briefs if brief.id not in brief_ids_with_tags_set]
-            briefs_without_tags.sort(key=lambda x: x.created_at, reverse=True)
+            # Group the user's briefs by tag (ordered by tag name), then the ones without tags
+            tags_with_briefs, error = ResearchBrief.find_by_user_grouped_by_tag(current_user.id)
+            if error:
+                flash('An error occurred while loading briefs by tags.', 'danger')
+            briefs_without_tags = ResearchBrief.find_untagged_by_user(current_user.id)
             
             current_app.logger.info(f"Research briefs by tags viewed by {current_user.username}")
             return render_template('research/by_tags.html', 
@@ -0,0 +1,223 @@
+# flask_app/utils/dj_sequencer.py
+
+import time
+import numpy as np
+from flask import current_app
+from flask_app.models import db, Song, playlist_songs
+
+# Relative weights of the three transition costs
+KEY_WEIGHT = 1.0
+TEMPO_WEIGHT = 1.0
+ENERGY_WEIGHT = 1.0
+
+# Costs used when a feature is missing on either side of a transition
+UNKNOWN_KEY_COST = 0.5
+UNKNOWN_TEMPO_COST = 0.5
+UNKNOWN_ENERGY_COST = 0.25
+
+# BPM difference that costs as much as one step around the Camelot wheel
+TEMPO_SCALE = 10.0
+
+# Wall-clock budget for the whole optimisation, keeps 1,000-track playlists under a second
+DEFAULT_TIME_BUDGET = 0.8
+
+
+def camelot_number(key, mode):
+    """
+    Map a Spotify pitch class and mode to its Camelot wheel number (1-12).
+
+    Returns None if the key or mode is unknown.
+    """
+    if key is None or mode is None or key < 0 or key > 11:
+        return None
+    offset = 8 if mode == 1 else 5
+    return (7 * int(key) + offset) % 12 or 12
+
+
+def camelot_code(key, mode):
+    """Get the Camelot notation for a key/mode pair (e.g. '8B'), or None"""
+    number = camelot_number(key, mode)
+    if number is None:
+        return None
+    return f"{number}{'B' if mode == 1 else 'A'}"
+
+
+def build_distance_matrix(keys, modes, tempos, energies):
+    """
+    Build a symmetric transition cost matrix from audio features.
+
+    Args:
+        keys, modes: Sequences of Spotify pitch classes (0-11) and modes (0/1), None if unknown
+        tempos, energies: Sequences of BPM and energy values, None if unknown
+
+    Returns:
+        (n, n) float NumPy array of transition costs
+    """
+    numbers = np.array([
+        np.nan if camelot_number(k, m) is None else camelot_number(k, m)
+        for k, m in zip(keys, modes)
+    ], dtype=float)
+    letters = np.array([np.nan if m is None else m for m in modes], dtype=float)
+    tempos = np.array([np.nan if t is None or t <= 0 else t for t in tempos], dtype=float)
+    energies = np.array([np.nan if e is None else e for e in energies], dtype=float)
+
+    # Key: adjacent wheel numbers and relative major/minor mix cleanly
+    steps = np.abs(numbers[:, None] - numbers[None, :])
+    steps = np.minimum(steps, 12 - steps)
+    same_letter = letters[:, None] == letters[None, :]
+    key_cost = np.where(
+        same_letter,
+        np.where(steps <= 1, steps, steps + 1),
+        np.where(steps == 0, 1, steps + 2)
+    ) / 6.0
+    key_cost = np.where(np.isnan(key_cost), UNKNOWN_KEY_COST, key_cost)
+
+    # Tempo: allow half/double-time mixing
+    a, b = tempos[:, None], tempos[None, :]
+    tempo_delta = np.minimum(np.abs(a - b), np.minimum(np.abs(a - 2 * b), np.abs(2 * a - b)))
+    tempo_cost = np.where(np.isnan(tempo_delta), UNKNOWN_TEMPO_COST, tempo_delta / TEMPO_SCALE)
+
+    # Energy: penalise jumps in either direction
+    energy_delta = np.abs(energies[:, None] - energies[None, :]) * 2
+    energy_cost = np.where(np.isnan(energy_delta), UNKNOWN_ENERGY_COST, energy_delta)
+
+    distances = KEY_WEIGHT * key_cost + TEMPO_WEIGHT * tempo_cost + ENERGY_WEIGHT * energy_cost
+    np.fill_diagonal(distances, 0.0)
+    return distances
+
+
+def path_cost(distances, order):
+    """Total transition cost of visiting tracks in the given order"""
+    order = np.asarray(order)
+    if len(order) < 2:
+        return 0.0
+    return float(distances[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbour_path(distances, start):
+    """Greedy path: always move to the cheapest unvisited track"""
+    n = len(distances)
+    visited = np.zeros(n, dtype=bool)
+    order = [start]
+    visited[start] = True
+    current = start
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, distances[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        order.append(current)
+    return order
+
+
+def two_opt(distances, order, deadline):
+    """
+    Improve an open path with 2-opt segment reversals until no move helps or time runs out.
+
+    The open path is closed through a zero-cost dummy node so the ends can move too.
+    For each edge, the gain of every possible reversal is computed in one vectorized step.
+    """
+    n = len(order)
+    if n < 4:
+        return list(order)
+
+    padded = np.zeros((n + 1, n + 1))
+    padded[:n, :n] = distances
+    tour = np.array([n] + list(order))
+    size = n + 1
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(size - 2):
+            a, b = tour[i], tour[i + 1]
+            c = tour[i + 2:]
+            d = np.append(tour[i + 3:], tour[0])
+            gains = padded[a, b] + padded[c, d] - padded[a, c] - padded[b, d]
+            if i == 0:
+                gains = gains[:-1]  # Reversing everything after the dummy is a no-op
+            if not len(gains):
+                continue
+            best = int(np.argmax(gains))
+            if gains[best] > 1e-9:
+                j = i + 2 + best
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+
+    return [int(node) for node in tour[1:]]
+
+
+def sequence_tracks(tracks, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Order tracks for smooth DJ transitions.
+
+    Starts from the lowest-energy track, builds a nearest-neighbour path and
+    improves it with 2-opt within the time budget.
+
+    Args:
+        tracks: List of dicts with track_uri, key, mode, tempo and energy
+        time_budget: Maximum seconds to spend optimising
+
+    Returns:
+        Tuple of (ordered_track_uris, stats_dict)
+    """
+    deadline = time.perf_counter() + time_budget
+    if len(tracks) < 3:
+        return [t['track_uri'] for t in tracks], {'cost_before': 0.0, 'cost_after': 0.0}
+
+    distances = build_distance_matrix(
+        [t['key'] for t in tracks],
+        [t['mode'] for t in tracks],
+        [t['tempo'] for t in tracks],
+        [t['energy'] for t in tracks],
+    )
+    energies = np.array([np.inf if t['energy'] is None else t['energy'] for t in tracks])
+    start = int(np.argmin(energies))
+
+    order = nearest_neighbour_path(distances, start)
+    order = two_opt(distances, order, deadline)
+
+    stats = {
+        'cost_before': round(path_cost(distances, range(len(tracks))), 4),
+        'cost_after': round(path_cost(distances, order), 4),
+    }
+    return [tracks[index]['track_uri'] for index in order], stats
+
+
+def sequence_playlist(playlist, apply=True, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Compute a harmonic ordering for a playlist and optionally save it.
+
+    Returns:
+        Tuple of (result_dict, error_message)
+    """
+    try:
+        rows = db.session.query(
+            Song.track_uri, Song.key, Song.mode, Song.tempo, Song.energy
+        ).join(playlist_songs, Song.track_uri == playlist_songs.c.track_uri)\
+            .filter(playlist_songs.c.playlist_id == playlist.id)\
+            .order_by(playlist_songs.c.position)\
+            .all()
+        tracks = [row._asdict() for row in rows]
+
+        started = time.perf_counter()
+        track_uris, stats = sequence_tracks(tracks, time_budget=time_budget)
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        if apply:
+            success, error = playlist.reorder_songs(track_uris)
+            if not success:
+                return None, error
+
+        by_uri = {t['track_uri']: t for t in tracks}
+        return {
+            'track_uris': track_uris,
+            'camelot': [camelot_code(by_uri[uri]['key'], by_uri[uri]['mode']) for uri in track_uris],
+            'applied': apply,
+            'elapsed_ms': elapsed_ms,
+            **stats,
+        }, None
+    except Exception as e:
+        current_app.logger.error(f"Error sequencing playlist {playlist.id}: {str(e)}")
+        return None, str(e)
@@ -5,6 +5,7 @@ import os
 from datetime import datetime, timezone
 from flask import current_app
 from flask_app.models import db, Song, MusicImportJob
+from flask_app.utils.smart_playlists import materialize_new_songs
 
 def safe_int(value, default=None):
     """Safely convert value to int"""
@@ -69,6 +70,7 @@ def import_csv_file(job_id, file_path, app):
                 
                 batch = []
                 batch_size = 50  # Commit every 50 rows
+                inserted_uris = []
                 
                 for row_num, row in enumerate(reader, start=2):  # Start at 2 because row 1 is header
                     try:
@@ -120,6 +122,7 @@ def import_csv_file(job_id, file_path, app):
                         )
                         
                         batch.append(song)
+                        inserted_uris.append(track_uri)
                         job.inserted_count += 1
                         
                         # Commit in batches
@@ -144,6 +147,13 @@ def import_csv_file(job_id, file_path, app):
                     db.session.add_all(batch)
                     db.session.commit()
                 
+                # Evaluate only the newly inserted songs against smart playlist rules
+                added, error = materialize_new_songs(inserted_uris)
+                if error:
+                    current_app.logger.warning(f"Import job {job_id}: smart playlist update failed: {error}")
+                elif added:
+                    current_app.logger.info(f"Import job {job_id}: added {added} song(s) to smart playlists")
+                
                 # Final update
                 job.processed_rows = job.total_rows
                 job.status = 'completed'
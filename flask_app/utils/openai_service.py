@@ -4,10 +4,11 @@ import os
 import json
 import re
 import hashlib
-import pdfplumber
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app
 from openai import OpenAI
 from typing import Dict, Optional, Tuple
+from flask_app.models import LlmResponseCache
 
 # Try to import OpenAI exception classes (structure varies by version)
 try:
@@ -25,6 +26,21 @@ except ImportError:
         APITimeoutError = Exception
         APIStatusError = Exception
 
+# Version of the research brief prompt and its post-processing, part of the
+# response cache key. Bump it whenever either changes so cached briefs are
+# regenerated instead of served in the old format.
+BRIEF_PROMPT_VERSION = 1
+
+# Longest text sent in one request (~150k chars leaves room for the prompt and
+# response); longer documents are summarized in chunks
+MAX_PROMPT_CHARS = 150000
+
+BRIEF_JSON_STRUCTURE = """{
+    "title": "A concise, descriptive title for this research (max 200 characters)",
+    "citation": "A properly formatted citation for this source (author, title, publication, date if available, or general format)",
+    "summary": "A well-structured bullet-point summary organized into clear sections. The summary field MUST be a plain text string (NOT a JSON object or array). Format it exactly like this example:\\n\\nKey Findings:\\n• First finding here\\n• Second finding here\\n• Third finding here\\n\\nMain Points:\\n• First main point\\n• Second main point\\n• Third main point\\n\\nMethodology/Approach:\\n• Method description if applicable\\n\\nConclusions/Recommendations:\\n• First recommendation\\n• Second recommendation\\n\\nCRITICAL: The summary must be a single plain text string with section headers ending in colons, followed by bullet points (•) on separate lines. Do NOT use JSON objects, arrays, or nested structures for the summary. Do NOT use quotes around section headers or bullet points. Each bullet point must be on its own line starting with •. If a section is not applicable, omit it entirely."
+}"""
+
 def calculate_pdf_hash(pdf_data: bytes) -> str:
     """
     Calculate MD5 hash of PDF content for duplicate detection.
@@ -46,6 +62,13 @@ def extract_text_from_pdf(pdf_data: bytes) -> Tuple[Optional[str], Optional[str]
     """
     Extract text from PDF file data.
     
+    The extraction library is PDF_EXTRACT_BACKEND ('auto' picks PDFium for
+    ordinary text and pdfplumber for tables and similar layouts). Long
+    documents are split across a process pool (see pdf_extraction.py).
+    Pages that cannot be read, or are not reached within
+    PDF_EXTRACT_TIME_BUDGET, are left out rather than failing the whole
+    document.
+    
     Args:
         pdf_data: Binary PDF data
         
@@ -53,22 +76,28 @@ def extract_text_from_pdf(pdf_data: bytes) -> Tuple[Optional[str], Optional[str]
         Tuple of (extracted_text, error_message)
     """
     try:
-        import io
-        
-        # Create a file-like object from bytes
-        pdf_file = io.BytesIO(pdf_data)
+        from flask_app.utils.pdf_extraction import extract_pdf_pages
+        
+        config = current_app.config
+        result = extract_pdf_pages(
+            pdf_data,
+            workers=config.get('PDF_EXTRACT_WORKERS', 1),
+            pages_per_task=config.get('PDF_EXTRACT_PAGES_PER_TASK', 8),
+            time_budget=config.get('PDF_EXTRACT_TIME_BUDGET'),
+            min_parallel_pages=config.get('PDF_EXTRACT_MIN_PARALLEL_PAGES', 16),
+            backend=config.get('PDF_EXTRACT_BACKEND', 'auto')
+        )
         
-        # Extract text from all pages
-        text_parts = []
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
+        for error in result['errors']:
+            current_app.logger.warning(f"PDF extraction: {error}")
         
+        # Join page text in page order, skipping empty and missing pages
+        text_parts = [page_text for page_text in result['pages'] if page_text]
         extracted_text = '\n\n'.join(text_parts)
         
         if not extracted_text or len(extracted_text.strip()) < 10:
+            if result['timed_out']:
+                return None, "PDF text extraction took too long. Please try a smaller document."
             return None, "PDF appears to be empty or contains no extractable text."
         
         return extracted_text, None
@@ -104,6 +133,7 @@ def chunk_text(text: str, max_chunk_size: int = 100000) -> list:
         else:
             if current_chunk:
                 chunks.append(current_chunk.strip())
+                current_chunk = ""
             # If a single paragraph is too large, split it by sentences
             if len(paragraph) > max_chunk_size:
                 sentences = paragraph.split('. ')
@@ -113,6 +143,10 @@ def chunk_text(text: str, max_chunk_size: int = 100000) -> list:
                     else:
                         if current_chunk:
                             chunks.append(current_chunk.strip())
+                        # A sentence longer than a chunk (e.g. text without punctuation) is cut at the limit
+                        while len(sentence) + 2 > max_chunk_size:
+                            chunks.append(sentence[:max_chunk_size])
+                            sentence = sentence[max_chunk_size:]
                         current_chunk = sentence + '. '
             else:
                 current_chunk = paragraph + '\n\n'
@@ -123,10 +157,287 @@ def chunk_text(text: str, max_chunk_size: int = 100000) -> list:
     return chunks
 
 
+def _request_json(client, model: str, prompt: str) -> Tuple[Optional[Dict], Tuple[int, int], Optional[str]]:
+    """
+    Send one prompt and parse the JSON object the model answers with.
+    
+    OpenAI exceptions are left to the caller, which turns them into user-facing messages.
+    
+    Returns:
+        Tuple of (parsed_dict, (prompt_tokens, completion_tokens), error_message)
+    """
+    # Determine if model supports JSON mode
+    # Models that support response_format json_object:
+    # GPT-5 models: gpt-5.1, gpt-5, gpt-5-mini, gpt-5-nano, gpt-5-pro, gpt-5-codex variants
+    # GPT-4.1 models: gpt-4.1, gpt-4.1-mini, gpt-4.1-nano
+    # GPT-4o models: gpt-4o, gpt-4o-mini
+    # GPT-4 turbo models: gpt-4-turbo-preview, gpt-4-0125-preview, dated versions
+    # GPT-3.5: gpt-3.5-turbo-0125
+    # Note: Older models like gpt-4-turbo (without date) may not support it
+    model_lower = model.lower()
+    json_mode_models = [
+        # GPT-5 models
+        'gpt-5.1', 'gpt-5', 'gpt-5-mini', 'gpt-5-nano', 'gpt-5-pro',
+        'gpt-5.1-codex-max', 'gpt-5.1-codex', 'gpt-5-codex', 'gpt-5.1-codex-mini',
+        'gpt-5.1-chat-latest', 'gpt-5-chat-latest',
+        # GPT-4.1 models
+        'gpt-4.1', 'gpt-4.1-mini', 'gpt-4.1-nano',
+        # GPT-4o models
+        'gpt-4o', 'gpt-4o-mini',
+        # GPT-4 turbo models
+        'gpt-4-turbo-preview', 'gpt-4-0125-preview', 
+        'gpt-4-turbo-2024-04-09', 'gpt-4-turbo-2024-08-06', 'gpt-4-turbo-2024-11-20',
+        # GPT-3.5 models
+        'gpt-3.5-turbo-0125'
+    ]
+    supports_json_mode = (
+        any(model_lower.startswith(m.lower()) for m in json_mode_models) or
+        'gpt-5' in model_lower or  # All GPT-5 models support JSON mode
+        'gpt-4.1' in model_lower or  # All GPT-4.1 models support JSON mode
+        'gpt-4o' in model_lower or
+        ('gpt-4-turbo' in model_lower and '-' in model)  # Date-suffixed versions
+    )
+    
+    # Determine if this is a GPT-5 model (uses max_completion_tokens instead of max_tokens)
+    is_gpt5_model = 'gpt-5' in model_lower
+    
+    # Build API call parameters
+    api_params = {
+        "model": model,
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a research assistant that creates structured research briefs from academic and professional texts. Always respond with valid JSON only."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": 0.3
+    }
+    
+    # GPT-5 models use max_completion_tokens, others use max_tokens
+    # Increase limit for GPT-5 models as they may need more tokens for complex responses
+    if is_gpt5_model:
+        api_params["max_completion_tokens"] = 4000  # Increased for GPT-5 models
+    else:
+        api_params["max_tokens"] = 2000
+    
+    # Only add response_format if model supports it
+    if supports_json_mode:
+        api_params["response_format"] = {"type": "json_object"}
+    
+    # Call OpenAI API with structured output
+    # Handle parameter compatibility issues with automatic retry
+    try:
+        response = client.chat.completions.create(**api_params)
+    except Exception as e:
+        error_str = str(e)
+        retry_needed = False
+        
+        # Check if error is about response_format not being supported
+        if "response_format" in error_str.lower() and "not supported" in error_str.lower() and "response_format" in api_params:
+            current_app.logger.warning(f"Model {model} does not support response_format, retrying without it")
+            api_params.pop("response_format", None)
+            retry_needed = True
+        
+        # Check if error is about max_tokens not being supported (GPT-5 models need max_completion_tokens)
+        elif "max_tokens" in error_str.lower() and "not supported" in error_str.lower() and "max_completion_tokens" in error_str.lower():
+            current_app.logger.warning(f"Model {model} requires max_completion_tokens instead of max_tokens, retrying with correct parameter")
+            max_tokens_value = api_params.pop("max_tokens", 2000)
+            api_params["max_completion_tokens"] = max_tokens_value
+            retry_needed = True
+        
+        # Check if error is about max_completion_tokens not being supported (older models need max_tokens)
+        elif "max_completion_tokens" in error_str.lower() and "not supported" in error_str.lower():
+            current_app.logger.warning(f"Model {model} requires max_tokens instead of max_completion_tokens, retrying with correct parameter")
+            max_completion_value = api_params.pop("max_completion_tokens", 2000)
+            api_params["max_tokens"] = max_completion_value
+            retry_needed = True
+        
+        if retry_needed:
+            response = client.chat.completions.create(**api_params)
+        else:
+            # Re-raise if it's a different error
+            raise
+    
+    # Parse the response
+    if not response.choices or len(response.choices) == 0:
+        current_app.logger.error(f"OpenAI API returned no choices. Model: {model}, Response: {response}")
+        return None, (0, 0), "OpenAI API returned no response choices"
+    
+    choice = response.choices[0]
+    message = choice.message
+    finish_reason = getattr(choice, 'finish_reason', None)
+    
+    # Log finish reason for debugging
+    if finish_reason:
+        current_app.logger.info(f"OpenAI API finish_reason: {finish_reason} for model {model}")
+    
+    # Check if response was cut off
+    if finish_reason == 'length':
+        current_app.logger.warning(f"OpenAI API response was cut off due to token limit. Model: {model}")
+        return None, (0, 0), "OpenAI API response was cut off due to token limit. The response may be incomplete. Try reducing the input text size or increasing max_completion_tokens."
+    
+    if finish_reason == 'content_filter':
+        current_app.logger.warning(f"OpenAI API response was filtered. Model: {model}")
+        return None, (0, 0), "OpenAI API response was filtered. Please try again with different content."
+    
+    if not message:
+        current_app.logger.error(f"OpenAI API returned no message. Model: {model}, Choice: {choice}")
+        return None, (0, 0), "OpenAI API returned no message in response"
+    
+    if not message.content:
+        # Log more details about what we got
+        current_app.logger.error(
+            f"OpenAI API returned empty content. Model: {model}, "
+            f"Finish reason: {finish_reason}, "
+            f"Message object: {message}, "
+            f"Response object keys: {dir(response)}"
+        )
+        return None, (0, 0), f"OpenAI API returned empty response content (finish_reason: {finish_reason}). This may indicate the model stopped generating. Please try again."
+    
+    response_text = message.content.strip()
+    if not response_text:
+        current_app.logger.error(f"OpenAI API returned empty response text after strip. Model: {model}, Original content: {repr(message.content)}")
+        return None, (0, 0), "OpenAI API returned empty response text"
+    
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        # Log the full response for debugging (truncated to avoid log spam)
+        current_app.logger.error(
+            f"Failed to parse OpenAI response as JSON. "
+            f"Model: {model}, Response length: {len(response_text)}, "
+            f"First 500 chars: {response_text[:500]}, Error: {str(e)}"
+        )
+        return None, (0, 0), f"OpenAI API returned invalid JSON. The model may not have returned properly formatted JSON. Please try again or use a different model."
+    
+    usage = getattr(response, 'usage', None)
+    return data, (getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0), None
+
+
+def _brief_prompt(text: str, from_notes: bool = False) -> str:
+    """Prompt asking for a research brief of text (or of notes taken from the parts of a long document)"""
+    if from_notes:
+        intro = ("The following notes summarize consecutive parts of one long document, in order. "
+                 "Analyze them as a whole and generate a research brief of the entire document")
+        label = "Notes to analyze"
+    else:
+        intro = "Analyze the following text and generate a research brief"
+        label = "Text to analyze"
+    return f"""{intro} in JSON format with the following structure:
+{BRIEF_JSON_STRUCTURE}
+
+{label}:
+{text}"""
+
+
+def _chunk_notes_prompt(chunk: str, part: int, parts: int) -> str:
+    """Prompt asking for notes on one part of a long document (the map step)"""
+    return f"""The following text is part {part} of {parts} of a longer document. Take notes on it in JSON format with the following structure:
+{{
+    "notes": "A plain text string of concise bullet points (•) covering the findings, main points, methodology and conclusions in this part, keeping key numbers and terminology. Also record any bibliographic details that appear (authors, title, publication, date) so the document can be cited."
+}}
+
+Text to analyze:
+{chunk}"""
+
+
+def _summarize_chunks(client, model: str, chunks: list, workers: int) -> Tuple[Optional[list], Tuple[int, int], Optional[str]]:
+    """
+    Take notes on each chunk, up to workers requests at a time.
+    
+    Requests run on a thread pool, so the wall time is about
+    ceil(len(chunks) / workers) request round trips rather than one per
+    chunk. The first failure cancels the chunks not yet started.
+    
+    Returns:
+        Tuple of (notes_in_chunk_order, (prompt_tokens, completion_tokens), error_message)
+    """
+    app = current_app._get_current_object()
+    
+    def summarize(part, chunk):
+        with app.app_context():
+            return _request_json(client, model, _chunk_notes_prompt(chunk, part, len(chunks)))
+    
+    notes = []
+    prompt_tokens = completion_tokens = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks))), thread_name_prefix='research-summary') as executor:
+        futures = [executor.submit(summarize, part, chunk) for part, chunk in enumerate(chunks, 1)]
+        try:
+            for part, future in enumerate(futures, 1):
+                data, usage, error = future.result()
+                if error:
+                    return None, (prompt_tokens, completion_tokens), f"Error summarizing part {part} of {len(chunks)}: {error}"
+                if 'notes' not in data:
+                    return None, (prompt_tokens, completion_tokens), f"OpenAI response missing required field: notes (part {part} of {len(chunks)})"
+                part_notes = data['notes']
+                if isinstance(part_notes, list):
+                    part_notes = '\n'.join(str(note) for note in part_notes)
+                notes.append(str(part_notes).strip())
+                prompt_tokens += usage[0]
+                completion_tokens += usage[1]
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    return notes, (prompt_tokens, completion_tokens), None
+
+
+def _map_reduce_brief(client, model: str, text: str) -> Tuple[Optional[Dict], Tuple[int, int], Optional[str]]:
+    """
+    Generate a brief of text too long for one request.
+    
+    Map: the text is split into RESEARCH_CHUNK_SIZE chunks and notes are
+    taken on each concurrently. If the joined notes are still longer than
+    MAX_PROMPT_CHARS (a very long document), they are mapped again. Reduce:
+    one request writes the title, citation and summary from the notes.
+    
+    Returns:
+        Tuple of (brief_dict, (prompt_tokens, completion_tokens), error_message)
+    """
+    config = current_app.config
+    chunk_size = config.get('RESEARCH_CHUNK_SIZE', 100000)
+    workers = config.get('RESEARCH_SUMMARY_WORKERS', 4)
+    prompt_tokens = completion_tokens = 0
+    
+    notes_text = text
+    while len(notes_text) > MAX_PROMPT_CHARS:
+        chunks = chunk_text(notes_text, chunk_size)
+        current_app.logger.info(f"Summarizing {len(notes_text)} characters in {len(chunks)} parts with model {model}")
+        notes, usage, error = _summarize_chunks(client, model, chunks, workers)
+        prompt_tokens += usage[0]
+        completion_tokens += usage[1]
+        if error:
+            return None, (prompt_tokens, completion_tokens), error
+        
+        condensed = '\n\n'.join(f"Part {part} of {len(notes)}:\n{part_notes}" for part, part_notes in enumerate(notes, 1))
+        if len(condensed) >= len(notes_text):
+            # Notes no longer shrink (RESEARCH_CHUNK_SIZE too small); keep what fits
+            current_app.logger.warning(f"Research notes did not shrink below {len(notes_text)} characters; truncating")
+            condensed = condensed[:MAX_PROMPT_CHARS]
+        notes_text = condensed
+    
+    brief_data, usage, error = _request_json(client, model, _brief_prompt(notes_text, from_notes=True))
+    return brief_data, (prompt_tokens + usage[0], completion_tokens + usage[1]), error
+
+
 def generate_research_brief(text: str, model: str = None) -> Tuple[Optional[Dict], Optional[str]]:
     """
     Generate a research brief from text using OpenAI API.
     
+    Text longer than MAX_PROMPT_CHARS is summarized map-reduce style: it is
+    split with chunk_text, the chunks are condensed into notes by up to
+    RESEARCH_SUMMARY_WORKERS concurrent requests, and a final request writes
+    the brief from the notes (see _map_reduce_brief).
+    
+    Briefs are cached by model, BRIEF_PROMPT_VERSION and a hash of the
+    whitespace-normalized text (see LlmResponseCache), so text that was
+    already summarized is answered without an API call while
+    LLM_CACHE_ENABLED is set.
+    
     Args:
         text: Source text to generate brief from
         model: OpenAI model to use (defaults to config)
@@ -136,173 +447,29 @@ def generate_research_brief(text: str, model: str = None) -> Tuple[Optional[Dict
         brief_data_dict contains: title, citation, summary (bullet points)
     """
     try:
+        if not model:
+            model = os.environ.get('OPENAI_MODEL', 'gpt-4-turbo')
+        
+        use_cache = current_app.config.get('LLM_CACHE_ENABLED', False)
+        if use_cache:
+            cached_brief = LlmResponseCache.lookup(model, BRIEF_PROMPT_VERSION, text)
+            if cached_brief is not None:
+                current_app.logger.info(f"Research brief served from cache for model {model}")
+                cached_brief['model_name'] = model
+                return cached_brief, None
+        
         api_key = os.environ.get('OPENAI_API_KEY')
         if not api_key:
             return None, "OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
         
-        if not model:
-            model = os.environ.get('OPENAI_MODEL', 'gpt-4-turbo')
-        
         client = OpenAI(api_key=api_key)
         
-        # Prepare the prompt
-        prompt = f"""Analyze the following text and generate a research brief in JSON format with the following structure:
-{{
-    "title": "A concise, descriptive title for this research (max 200 characters)",
-    "citation": "A properly formatted citation for this source (author, title, publication, date if available, or general format)",
-    "summary": "A well-structured bullet-point summary organized into clear sections. The summary field MUST be a plain text string (NOT a JSON object or array). Format it exactly like this example:\\n\\nKey Findings:\\n• First finding here\\n• Second finding here\\n• Third finding here\\n\\nMain Points:\\n• First main point\\n• Second main point\\n• Third main point\\n\\nMethodology/Approach:\\n• Method description if applicable\\n\\nConclusions/Recommendations:\\n• First recommendation\\n• Second recommendation\\n\\nCRITICAL: The summary must be a single plain text string with section headers ending in colons, followed by bullet points (•) on separate lines. Do NOT use JSON objects, arrays, or nested structures for the summary. Do NOT use quotes around section headers or bullet points. Each bullet point must be on its own line starting with •. If a section is not applicable, omit it entirely."
-}}
-
-Text to analyze:
-{text[:150000]}"""  # Limit to ~150k chars to leave room for prompt and response
-        
-        # Determine if model supports JSON mode
-        # Models that support response_format json_object:
-        # GPT-5 models: gpt-5.1, gpt-5, gpt-5-mini, gpt-5-nano, gpt-5-pro, gpt-5-codex variants
-        # GPT-4.1 models: gpt-4.1, gpt-4.1-mini, gpt-4.1-nano
-        # GPT-4o models: gpt-4o, gpt-4o-mini
-        # GPT-4 turbo models: gpt-4-turbo-preview, gpt-4-0125-preview, dated versions
-        # GPT-3.5: gpt-3.5-turbo-0125
-        # Note: Older models like gpt-4-turbo (without date) may not support it
-        model_lower = model.lower()
-        json_mode_models = [
-            # GPT-5 models
-            'gpt-5.1', 'gpt-5', 'gpt-5-mini', 'gpt-5-nano', 'gpt-5-pro',
-            'gpt-5.1-codex-max', 'gpt-5.1-codex', 'gpt-5-codex', 'gpt-5.1-codex-mini',
-            'gpt-5.1-chat-latest', 'gpt-5-chat-latest',
-            # GPT-4.1 models
-            'gpt-4.1', 'gpt-4.1-mini', 'gpt-4.1-nano',
-            # GPT-4o models
-            'gpt-4o', 'gpt-4o-mini',
-            # GPT-4 turbo models
-            'gpt-4-turbo-preview', 'gpt-4-0125-preview', 
-            'gpt-4-turbo-2024-04-09', 'gpt-4-turbo-2024-08-06', 'gpt-4-turbo-2024-11-20',
-            # GPT-3.5 models
-            'gpt-3.5-turbo-0125'
-        ]
-        supports_json_mode = (
-            any(model_lower.startswith(m.lower()) for m in json_mode_models) or
-            'gpt-5' in model_lower or  # All GPT-5 models support JSON mode
-            'gpt-4.1' in model_lower or  # All GPT-4.1 models support JSON mode
-            'gpt-4o' in model_lower or
-            ('gpt-4-turbo' in model_lower and '-' in model)  # Date-suffixed versions
-        )
-        
-        # Determine if this is a GPT-5 model (uses max_completion_tokens instead of max_tokens)
-        is_gpt5_model = 'gpt-5' in model_lower
-        
-        # Build API call parameters
-        api_params = {
-            "model": model,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a research assistant that creates structured research briefs from academic and professional texts. Always respond with valid JSON only."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.3
-        }
-        
-        # GPT-5 models use max_completion_tokens, others use max_tokens
-        # Increase limit for GPT-5 models as they may need more tokens for complex responses
-        if is_gpt5_model:
-            api_params["max_completion_tokens"] = 4000  # Increased for GPT-5 models
+        if len(text) <= MAX_PROMPT_CHARS:
+            brief_data, usage, error = _request_json(client, model, _brief_prompt(text))
         else:
-            api_params["max_tokens"] = 2000
-        
-        # Only add response_format if model supports it
-        if supports_json_mode:
-            api_params["response_format"] = {"type": "json_object"}
-        
-        # Call OpenAI API with structured output
-        # Handle parameter compatibility issues with automatic retry
-        try:
-            response = client.chat.completions.create(**api_params)
-        except Exception as e:
-            error_str = str(e)
-            retry_needed = False
-            
-            # Check if error is about response_format not being supported
-            if "response_format" in error_str.lower() and "not supported" in error_str.lower() and "response_format" in api_params:
-                current_app.logger.warning(f"Model {model} does not support response_format, retrying without it")
-                api_params.pop("response_format", None)
-                retry_needed = True
-            
-            # Check if error is about max_tokens not being supported (GPT-5 models need max_completion_tokens)
-            elif "max_tokens" in error_str.lower() and "not supported" in error_str.lower() and "max_completion_tokens" in error_str.lower():
-                current_app.logger.warning(f"Model {model} requires max_completion_tokens instead of max_tokens, retrying with correct parameter")
-                max_tokens_value = api_params.pop("max_tokens", 2000)
-                api_params["max_completion_tokens"] = max_tokens_value
-                retry_needed = True
-            
-            # Check if error is about max_completion_tokens not being supported (older models need max_tokens)
-            elif "max_completion_tokens" in error_str.lower() and "not supported" in error_str.lower():
-                current_app.logger.warning(f"Model {model} requires max_tokens instead of max_completion_tokens, retrying with correct parameter")
-                max_completion_value = api_params.pop("max_completion_tokens", 2000)
-                api_params["max_tokens"] = max_completion_value
-                retry_needed = True
-            
-            if retry_needed:
-                response = client.chat.completions.create(**api_params)
-            else:
-                # Re-raise if it's a different error
-                raise
-        
-        # Parse the response
-        if not response.choices or len(response.choices) == 0:
-            current_app.logger.error(f"OpenAI API returned no choices. Model: {model}, Response: {response}")
-            return None, "OpenAI API returned no response choices"
-        
-        choice = response.choices[0]
-        message = choice.message
-        finish_reason = getattr(choice, 'finish_reason', None)
-        
-        # Log finish reason for debugging
-        if finish_reason:
-            current_app.logger.info(f"OpenAI API finish_reason: {finish_reason} for model {model}")
-        
-        # Check if response was cut off
-        if finish_reason == 'length':
-            current_app.logger.warning(f"OpenAI API response was cut off due to token limit. Model: {model}")
-            return None, "OpenAI API response was cut off due to token limit. The response may be incomplete. Try reducing the input text size or increasing max_completion_tokens."
-        
-        if finish_reason == 'content_filter':
-            current_app.logger.warning(f"OpenAI API response was filtered. Model: {model}")
-            return None, "OpenAI API response was filtered. Please try again with different content."
-        
-        if not message:
-            current_app.logger.error(f"OpenAI API returned no message. Model: {model}, Choice: {choice}")
-            return None, "OpenAI API returned no message in response"
-        
-        if not message.content:
-            # Log more details about what we got
-            current_app.logger.error(
-                f"OpenAI API returned empty content. Model: {model}, "
-                f"Finish reason: {finish_reason}, "
-                f"Message object: {message}, "
-                f"Response object keys: {dir(response)}"
-            )
-            return None, f"OpenAI API returned empty response content (finish_reason: {finish_reason}). This may indicate the model stopped generating. Please try again."
-        
-        response_text = message.content.strip()
-        if not response_text:
-            current_app.logger.error(f"OpenAI API returned empty response text after strip. Model: {model}, Original content: {repr(message.content)}")
-            return None, "OpenAI API returned empty response text"
-        
-        try:
-            brief_data = json.loads(response_text)
-        except json.JSONDecodeError as e:
-            # Log the full response for debugging (truncated to avoid log spam)
-            current_app.logger.error(
-                f"Failed to parse OpenAI response as JSON. "
-                f"Model: {model}, Response length: {len(response_text)}, "
-                f"First 500 chars: {response_text[:500]}, Error: {str(e)}"
-            )
-            return None, f"OpenAI API returned invalid JSON. The model may not have returned properly formatted JSON. Please try again or use a different model."
+            brief_data, usage, error = _map_reduce_brief(client, model, text)
+        if error:
+            return None, error
         
         # Validate required fields
         required_fields = ['title', 'citation', 'summary']
@@ -438,6 +605,14 @@ Text to analyze:
             else:
                 brief_data['summary'] = summary_text
         
+        if use_cache:
+            LlmResponseCache.store(
+                model, BRIEF_PROMPT_VERSION, text, brief_data,
+                prompt_tokens=usage[0],
+                completion_tokens=usage[1],
+                max_bytes=current_app.config.get('LLM_CACHE_MAX_BYTES')
+            )
+        
         # Add model name to the response
         brief_data['model_name'] = model
         
@@ -0,0 +1,380 @@
+# flask_app/utils/pdf_extraction.py
+
+import io
+import logging
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+# Runs in worker processes too, so nothing here may depend on the Flask app
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# PDFium is not thread-safe; in-process callers (web and job threads) take turns
+_pdfium_lock = threading.RLock()
+
+
+def _open_source(source):
+    """File object for PDF bytes, or the path itself (worker processes get a path, not a copy of the data)"""
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def _fallback_page_text(source, index):
+    """Extract one page with pdfminer directly, for pages pdfplumber cannot handle"""
+    from pdfminer.high_level import extract_text
+    return extract_text(_open_source(source), page_numbers=[index]).strip()
+
+
+class PdfBackend(ABC):
+    """
+    A library used to pull plain text out of PDF pages.
+
+    A document is opened once per page range and its pages are then
+    extracted one at a time; fallback_text is tried for pages that raise.
+    """
+    name = None
+
+    @abstractmethod
+    def open(self, source):
+        """Context manager yielding the open document for PDF bytes or a path"""
+
+    @abstractmethod
+    def page_count(self, document):
+        """Number of pages in an open document"""
+
+    @abstractmethod
+    def page_text(self, document, index):
+        """Text of one page of an open document"""
+
+    @abstractmethod
+    def fallback_text(self, source, index):
+        """Text of one page with another library, for pages page_text raises on"""
+
+    def page_text_from_source(self, source, index):
+        """Open the document just to extract one page"""
+        with self.open(source) as document:
+            return self.page_text(document, index)
+
+
+class PdfplumberBackend(PdfBackend):
+    """
+    Layout-aware extraction with pdfplumber.
+
+    Characters are ordered by their position on the page, so tables and text
+    written out of order come out in reading order. Pure Python and slow.
+    """
+    name = 'pdfplumber'
+
+    @contextmanager
+    def open(self, source):
+        with pdfplumber.open(_open_source(source)) as pdf:
+            yield pdf
+
+    def page_count(self, document):
+        return len(document.pages)
+
+    def page_text(self, document, index):
+        page = document.pages[index]
+        try:
+            return page.extract_text() or ''
+        finally:
+            page.close()  # Drop the page's cached layout objects
+
+    def fallback_text(self, source, index):
+        return _fallback_page_text(source, index)
+
+
+class PdfiumBackend(PdfBackend):
+    """
+    Fast plain-text extraction with PDFium.
+
+    Text comes out in content stream order, which for ordinary prose
+    (including multi-column pages) is reading order. Dozens of times faster
+    than pdfplumber. Pages it fails on are retried with pdfplumber.
+    """
+    name = 'pdfium'
+
+    @contextmanager
+    def open(self, source):
+        import pypdfium2
+        with _pdfium_lock:
+            document = pypdfium2.PdfDocument(source)
+            try:
+                yield document
+            finally:
+                document.close()
+
+    def page_count(self, document):
+        return len(document)
+
+    def page_text(self, document, index):
+        page = document[index]
+        try:
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range()
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+        return '\n'.join(line.rstrip() for line in text.replace('\r\n', '\n').split('\n')).strip()
+
+    def fallback_text(self, source, index):
+        return BACKENDS['pdfplumber'].page_text_from_source(source, index)
+
+
+BACKENDS = {backend.name: backend for backend in (PdfplumberBackend(), PdfiumBackend())}
+
+
+def get_backend(name):
+    """Look up a backend by name"""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown PDF extraction backend '{name}' (expected one of: auto, {', '.join(BACKENDS)})")
+
+
+def choose_backend(pdf_data, sample_pages=3):
+    """
+    Pick a backend from the layout of the first few pages.
+
+    PDFium reads text in the order it was written, pdfplumber in the order it
+    appears on the page. They only disagree when those orders differ, which
+    shows up in PDFium's text segments as:
+      - tables: several separate segments on one line, written cell by cell
+      - scrambled content: segments that keep jumping back up the page
+    Those documents go to pdfplumber; everything else to PDFium.
+    """
+    segments_per_line = []
+    upward_jumps = 0
+    steps = 0
+
+    with BACKENDS['pdfium'].open(pdf_data) as document:
+        for index in range(min(sample_pages, len(document))):
+            page = document[index]
+            textpage = page.get_textpage()
+            try:
+                rects = [textpage.get_rect(i) for i in range(textpage.count_rects())]
+            finally:
+                textpage.close()
+                page.close()
+
+            lines = {}
+            for _, bottom, _, _ in rects:
+                baseline = round(bottom / 4)  # Segments within a few points share a line
+                lines[baseline] = lines.get(baseline, 0) + 1
+            segments_per_line.extend(lines.values())
+
+            for (_, previous_bottom, _, previous_top), (_, bottom, _, _) in zip(rects, rects[1:]):
+                steps += 1
+                if bottom > previous_top + (previous_top - previous_bottom):
+                    upward_jumps += 1
+
+    if not segments_per_line:
+        return 'pdfium'  # No text layer; neither library will find more
+    if statistics.median(segments_per_line) >= 3:
+        return 'pdfplumber'
+    if steps and upward_jumps / steps > 0.25:
+        return 'pdfplumber'
+    return 'pdfium'
+
+
+def extract_page_range(source, start, stop, deadline=None, backend='pdfplumber'):
+    """
+    Extract the text of pages [start, stop).
+
+    A page the backend fails on is retried with its fallback (pdfminer for
+    pdfplumber, pdfplumber for PDFium); if that fails too its text is None
+    and the error is reported instead. With a deadline (a time.monotonic()
+    value) extraction stops early once it has passed.
+
+    Args:
+        source: PDF bytes or the path of a PDF file
+        backend: Name of the backend to use
+
+    Returns:
+        List of (page_text, error_message) tuples, one per extracted page
+    """
+    engine = get_backend(backend)
+    results = []
+    with engine.open(source) as document:
+        for index in range(start, stop):
+            if deadline and time.monotonic() >= deadline:
+                break
+            try:
+                results.append((engine.page_text(document, index), None))
+            except Exception as e:
+                try:
+                    results.append((engine.fallback_text(source, index), None))
+                except Exception:
+                    results.append((None, f'Page {index + 1}: {str(e)}'))
+    return results
+
+
+def count_pdf_pages(pdf_data, backend='pdfplumber'):
+    """Number of pages in a PDF"""
+    engine = get_backend(backend)
+    with engine.open(pdf_data) as document:
+        return engine.page_count(document)
+
+
+def _mp_context():
+    """
+    Start workers from a fork server with this module preloaded.
+
+    Forking the web process itself is unsafe because it runs threads; the
+    fork server gives workers a clean process that already has pdfplumber
+    imported. Where it is unavailable workers are spawned.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def get_pdf_pool(workers):
+    """Process-wide pool for page extraction"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pdf_pool(wait=True):
+    """Stop the pool's worker processes (a new pool is started on next use)"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        pool, _pool, _pool_workers = _pool, None, 0
+    if pool:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _discard_pool(pool):
+    """Forget a pool whose worker died so the next call starts a fresh one"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is pool:
+            _pool, _pool_workers = None, 0
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_in_pool(path, ranges, workers, deadline, store, errors, backend):
+    """Run page ranges on the pool, splitting up ranges whose worker died; returns True if the deadline passed"""
+    tasks = {}
+
+    def submit(start, stop):
+        pool = get_pdf_pool(workers)
+        try:
+            future = pool.submit(extract_page_range, path, start, stop, None, backend)
+        except BrokenProcessPool:
+            # A worker died after this pool was handed out; start a fresh one
+            _discard_pool(pool)
+            pool = get_pdf_pool(workers)
+            future = pool.submit(extract_page_range, path, start, stop, None, backend)
+        tasks[future] = (start, stop, pool)
+
+    for start, stop in ranges:
+        submit(start, stop)
+
+    while tasks:
+        remaining = deadline - time.monotonic() if deadline else None
+        if remaining is not None and remaining <= 0:
+            break
+        done, _ = wait(list(tasks), timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            start, stop, pool = tasks.pop(future)
+            try:
+                store(start, future.result())
+            except Exception as e:
+                logger.warning(f"PDF extraction worker failed on pages {start + 1}-{stop}: {str(e)}")
+                _discard_pool(pool)
+                if stop - start > 1:
+                    for index in range(start, stop):
+                        submit(index, index + 1)
+                else:
+                    errors.append(f'Page {start + 1}: {str(e) or type(e).__name__}')
+
+    # Queued tasks are dropped; ones already running finish in the background
+    for future in tasks:
+        future.cancel()
+    return bool(tasks)
+
+
+def extract_pdf_pages(pdf_data, workers=1, pages_per_task=8, time_budget=None, min_parallel_pages=16,
+                      backend='pdfplumber'):
+    """
+    Extract text page by page, spreading pages across a process pool.
+
+    Documents shorter than min_parallel_pages (or workers <= 1) are extracted
+    in this process. Otherwise pages are split into tasks of pages_per_task
+    and the text is reassembled in page order. If a worker dies, its pages
+    are retried one per task in a fresh pool so a single bad page only loses
+    itself. Once time_budget seconds have passed, pages not yet extracted are
+    given up on and the text extracted so far is returned.
+
+    Args:
+        backend: Backend name, or 'auto' to choose one with choose_backend
+
+    Returns:
+        Dict with 'pages' (text per page, None where extraction failed or
+        ran out of time), 'errors' (messages for failed pages), 'timed_out',
+        'parallel', 'backend' and 'seconds'
+    """
+    started = time.monotonic()
+    deadline = started + time_budget if time_budget else None
+    if backend == 'auto':
+        backend = choose_backend(pdf_data)
+    page_count = count_pdf_pages(pdf_data, backend)
+    pages = [None] * page_count
+    errors = []
+
+    def store(start, results):
+        for offset, (text, error) in enumerate(results):
+            pages[start + offset] = text
+            if error:
+                errors.append(error)
+
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    parallel = workers > 1 and page_count >= min_parallel_pages and len(ranges) > 1
+
+    if parallel:
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            f.write(pdf_data)
+        try:
+            timed_out = _extract_in_pool(f.name, ranges, workers, deadline, store, errors, backend)
+        finally:
+            os.remove(f.name)
+    else:
+        results = extract_page_range(pdf_data, 0, page_count, deadline, backend)
+        store(0, results)
+        timed_out = len(results) < page_count
+
+    if timed_out:
+        missing = sum(1 for text in pages if text is None)
+        errors.append(f'Time budget of {time_budget}s exceeded; {missing} of {page_count} pages not extracted')
+
+    return {
+        'pages': pages,
+        'errors': errors,
+        'timed_out': timed_out,
+        'parallel': parallel,
+        'backend': backend,
+        'seconds': round(time.monotonic() - started, 3),
+    }
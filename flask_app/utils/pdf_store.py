@@ -0,0 +1,83 @@
+# flask_app/utils/pdf_store.py
+
+import hashlib
+import os
+import tempfile
+import threading
+
+# Files are immutable once written and named by the SHA-256 of their content,
+# so identical uploads share one file and a path can be served as-is.
+# Which files are still in use is tracked in the database (PdfBlob).
+
+_store_lock = threading.Lock()
+
+
+def hash_pdf(pdf_data):
+    """SHA-256 of the PDF content, the key it is stored under"""
+    return hashlib.sha256(pdf_data).hexdigest()
+
+
+def get_store_root(app=None):
+    """Absolute path of the store directory (PDF_STORE_FOLDER)"""
+    if app is None:
+        from flask import current_app
+        app = current_app
+    folder = app.config.get('PDF_STORE_FOLDER') or os.path.join(app.config.get('UPLOAD_FOLDER', 'uploads'), 'pdf_store')
+    return os.path.abspath(folder)
+
+
+def blob_path(digest, root=None):
+    """
+    Path of a stored PDF.
+
+    Files are sharded two levels deep by the leading hex digits of their hash
+    (ab/cd/abcd....pdf) so no directory grows past a few thousand entries.
+    """
+    return os.path.join(root or get_store_root(), digest[:2], digest[2:4], f'{digest}.pdf')
+
+
+def write_blob(pdf_data, digest=None, root=None):
+    """
+    Store PDF bytes under their hash, unless that file already exists.
+
+    The file is written to a temporary name in the same directory and then
+    renamed, so readers never see a partly written PDF.
+
+    Returns:
+        Tuple of (digest, path)
+    """
+    digest = digest or hash_pdf(pdf_data)
+    path = blob_path(digest, root)
+    with _store_lock:
+        if os.path.exists(path):
+            return digest, path
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf_data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return digest, path
+
+
+def remove_blob(digest, root=None):
+    """Delete a stored PDF; returns True if a file was removed"""
+    path = blob_path(digest, root)
+    with _store_lock:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        for directory in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+            try:
+                os.rmdir(directory)  # Only succeeds once the shard is empty
+            except OSError:
+                break
+    return True
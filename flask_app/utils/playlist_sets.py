@@ -0,0 +1,102 @@
+# flask_app/utils/playlist_sets.py
+
+from flask import current_app
+from flask_app.models import db, Playlist, playlist_songs
+from flask_app.models.playlist import POSITION_GAP
+
+SET_OPERATIONS = ('union', 'intersect', 'difference')
+
+
+def build_set_source(operation, playlist_ids):
+    """
+    Build a subquery of (track_uri, source, position) rows for a set operation.
+
+    - union: songs in any playlist, placed where they first appear (earlier playlists first)
+    - intersect: songs in every playlist, in the order of the first playlist
+    - difference: songs in the first playlist that are in none of the others
+
+    Args:
+        operation: One of SET_OPERATIONS
+        playlist_ids: Ordered list of playlist IDs, the first is the base playlist
+
+    Returns:
+        SQLAlchemy subquery with track_uri, source and position columns
+    """
+    base_id, other_ids = playlist_ids[0], playlist_ids[1:]
+
+    if operation == 'union':
+        source = db.case({playlist_id: index for index, playlist_id in enumerate(playlist_ids)},
+                         value=playlist_songs.c.playlist_id)
+        ranked = db.select(
+            playlist_songs.c.track_uri,
+            source.label('source'),
+            playlist_songs.c.position,
+            db.func.row_number().over(
+                partition_by=playlist_songs.c.track_uri,
+                order_by=(source, playlist_songs.c.position)
+            ).label('occurrence')
+        ).where(playlist_songs.c.playlist_id.in_(playlist_ids)).subquery()
+        return db.select(ranked.c.track_uri, ranked.c.source, ranked.c.position)\
+            .where(ranked.c.occurrence == 1)\
+            .subquery()
+
+    others = db.select(playlist_songs.c.track_uri).where(playlist_songs.c.playlist_id.in_(other_ids))
+    if operation == 'intersect':
+        others = others.group_by(playlist_songs.c.track_uri)\
+            .having(db.func.count(db.distinct(playlist_songs.c.playlist_id)) == len(other_ids))
+        membership = playlist_songs.c.track_uri.in_(others)
+    else:
+        membership = playlist_songs.c.track_uri.notin_(others)
+
+    return db.select(
+        playlist_songs.c.track_uri,
+        db.literal(0).label('source'),
+        playlist_songs.c.position
+    ).where(playlist_songs.c.playlist_id == base_id, membership).subquery()
+
+
+def create_playlist_from_set(user_id, name, operation, playlist_ids, description=None):
+    """
+    Create a playlist from a set operation over existing playlists.
+
+    The new playlist and its songs are written in one transaction with a single
+    INSERT ... SELECT; positions are assigned POSITION_GAP apart in SQL, so no
+    song rows are loaded into Python.
+
+    Args:
+        user_id: Owner of the new playlist
+        name: Name of the new playlist
+        operation: 'union', 'intersect' or 'difference'
+        playlist_ids: Ordered list of at least two source playlist IDs
+        description: Optional description
+
+    Returns:
+        Tuple of (playlist, error_message)
+    """
+    try:
+        playlist = Playlist(user_id=user_id, name=name, description=description)
+        db.session.add(playlist)
+        db.session.flush()
+
+        source = build_set_source(operation, playlist_ids)
+        position = (db.func.row_number().over(
+            order_by=(source.c.source, source.c.position, source.c.track_uri)
+        ) - 1) * POSITION_GAP
+        db.session.execute(
+            playlist_songs.insert().from_select(
+                ['playlist_id', 'track_uri', 'position'],
+                db.select(db.literal(playlist.id), source.c.track_uri, position)
+            )
+        )
+
+        # Commits the playlist, its songs and the counters together
+        _, error = Playlist.recompute_counters([playlist.id])
+        if error:
+            return None, error
+
+        db.session.refresh(playlist)
+        return playlist, None
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error creating playlist from {operation} for user {user_id}: {str(e)}")
+        return None, str(e)
@@ -0,0 +1,198 @@
+# flask_app/utils/research_jobs.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from flask import current_app
+from flask_app.models import db, PdfBlob, ResearchBrief, ResearchImportJob
+from flask_app.utils.openai_service import extract_text_from_pdf, process_research_brief
+
+REQUIRED_BRIEF_FIELDS = ['title', 'citation', 'summary', 'source_text']
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_research_executor(app):
+    """
+    Process-wide pool that runs research import jobs.
+
+    Its size (RESEARCH_CONCURRENCY) bounds how many PDFs are extracted and
+    summarized at once, however many files are uploaded.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = max(1, app.config.get('RESEARCH_CONCURRENCY', 4))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='research-import')
+        return _executor
+
+
+def shutdown_research_executor(wait=True):
+    """Stop the pool (it is recreated on the next enqueue, picking up config changes)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor:
+        executor.shutdown(wait=wait)
+
+
+def enqueue_research_jobs(job_ids, app):
+    """Queue jobs on the shared pool; returns one future per job"""
+    executor = get_research_executor(app)
+    return [executor.submit(run_research_job, job_id, app) for job_id in job_ids]
+
+
+def _set_stage(job, stage):
+    job.stage = stage
+    db.session.commit()
+
+
+def _finish(job, status, error_message=None, brief_id=None):
+    job.status = status
+    job.stage = 'done'
+    job.error_message = error_message
+    job.brief_id = brief_id
+    job.finished_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def run_research_job(job_id, app):
+    """
+    Generate a research brief from one uploaded PDF.
+
+    Runs text extraction, the OpenAI call and the insert for a single file,
+    recording the stage as it goes so the progress page can show it. The
+    stored upload is removed once the job finishes, whatever the outcome.
+    Jobs that are no longer queued (e.g. queued twice) are skipped.
+    """
+    with app.app_context():
+        job = ResearchImportJob.find_by_id(job_id)
+        if not job:
+            current_app.logger.error(f"Research import job {job_id} not found")
+            return
+
+        if not ResearchImportJob.claim(job_id):
+            current_app.logger.info(f"Research import job {job_id} is no longer queued, skipping")
+            return
+        db.session.refresh(job)
+
+        try:
+            with open(job.stored_path, 'rb') as f:
+                pdf_data = f.read()
+
+            _set_stage(job, 'extracting')
+            source_text, error = extract_text_from_pdf(pdf_data)
+            if error:
+                _finish(job, 'failed', error)
+                return
+
+            _set_stage(job, 'summarizing')
+            brief_data, error = process_research_brief(source_text=source_text)
+            if error:
+                _finish(job, 'failed', error)
+                return
+            if not brief_data:
+                _finish(job, 'failed', 'No data returned from AI service.')
+                return
+
+            missing_fields = [field for field in REQUIRED_BRIEF_FIELDS if field not in brief_data]
+            if missing_fields:
+                _finish(job, 'failed', f'Missing required fields: {", ".join(missing_fields)}')
+                return
+
+            _set_stage(job, 'saving')
+
+            # Another upload of the same file may have finished while this one was summarizing
+            existing = ResearchBrief.find_duplicate_by_hash(job.content_hash)
+            if existing:
+                _finish(job, 'duplicate', 'Duplicate detected: Duplicate content (hash match)', existing.id)
+                return
+
+            # Counted in the same commit as the brief; the file itself is shared by identical uploads
+            pdf_sha256, store_error = PdfBlob.acquire(pdf_data)
+            if store_error:
+                _finish(job, 'failed', f'Error storing PDF: {store_error}')
+                return
+
+            new_brief, db_error = ResearchBrief.safe_create(
+                user_id=job.user_id,
+                title=brief_data['title'],
+                citation=brief_data['citation'],
+                summary=brief_data['summary'],
+                source_text=brief_data['source_text'],
+                pdf_filename=job.original_filename,
+                pdf_sha256=pdf_sha256,
+                content_hash=job.content_hash,
+                source_type='pdf',
+                model_name=brief_data.get('model_name')
+            )
+            if db_error:
+                _finish(job, 'failed', f'Error saving brief: {db_error}')
+                return
+
+            if job.tags:
+                for tag_name in [tag.strip().lower() for tag in job.tags.split(',') if tag.strip()]:
+                    new_brief.add_tag(tag_name)
+
+            _finish(job, 'completed', brief_id=new_brief.id)
+            current_app.logger.info(f"Research brief {new_brief.id} created from {job.original_filename} (job {job_id})")
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Research import job {job_id} failed: {str(e)}")
+            _finish(job, 'failed', str(e))
+
+        finally:
+            _remove_upload(job.stored_path)
+
+
+def _remove_upload(path):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            current_app.logger.warning(f"Could not remove upload {path}: {str(e)}")
+
+
+def recover_research_jobs(app):
+    """
+    Pick up research import jobs a previous process left unfinished.
+
+    Jobs run on an in-process pool, so a restart or crash drops its queue
+    and leaves the rows queued or running. Queued jobs whose upload is still
+    on disk are queued again (claiming makes a job another process also
+    queued run once); those whose upload is gone are failed. Running jobs
+    with no stage change for RESEARCH_JOB_LEASE_SECONDS are failed and their
+    uploads removed.
+
+    Returns:
+        Tuple of (requeued_count, failed_count)
+    """
+    with app.app_context():
+        lease_seconds = app.config.get('RESEARCH_JOB_LEASE_SECONDS', 900)
+        stale, _ = ResearchImportJob.fail_stale(
+            lease_seconds, 'Processing was interrupted (the server may have restarted). Please upload the PDF again.'
+        )
+        for job in stale:
+            _remove_upload(job.stored_path)
+
+        requeue = []
+        missing = 0
+        for job in ResearchImportJob.find_unfinished():
+            if job.status != 'queued':
+                continue
+            if job.stored_path and os.path.exists(job.stored_path):
+                requeue.append(job.id)
+            else:
+                _finish(job, 'failed', 'The uploaded file was lost before processing. Please upload the PDF again.')
+                missing += 1
+
+        if requeue:
+            enqueue_research_jobs(requeue, app)
+        if requeue or stale or missing:
+            current_app.logger.warning(
+                f"Recovered research import jobs: {len(requeue)} requeued, {len(stale) + missing} failed"
+            )
+        return len(requeue), len(stale) + missing
@@ -0,0 +1,416 @@
+# flask_app/utils/smart_playlists.py
+
+import json
+import numpy as np
+from flask import current_app
+from flask_app.models import db, Song, Playlist, playlist_songs
+from flask_app.models.playlist import POSITION_GAP
+
+RULES_VERSION = 1
+
+# Songs evaluated per round when applying rules to specific songs, keeping each
+# IN list well under SQLite's bind variable limit
+RULE_MATCH_CHUNK = 500
+
+# Song fields that smart playlist rules may reference, by kind
+NUMERIC_FIELDS = {
+    'tempo', 'energy', 'danceability', 'valence', 'acousticness', 'instrumentalness',
+    'liveness', 'speechiness', 'loudness', 'popularity', 'duration_ms', 'key', 'mode',
+    'time_signature'
+}
+TEXT_FIELDS = {'genres', 'artist_names', 'album_name', 'track_name', 'record_label'}
+BOOLEAN_FIELDS = {'explicit'}
+
+OPERATORS = {
+    'number': {'gt', 'gte', 'lt', 'lte', 'eq', 'between'},
+    'text': {'contains', 'not_contains'},
+    'bool': {'is'},
+}
+
+
+def field_kind(field):
+    """Return 'number', 'text' or 'bool' for a rule field, or None if unsupported"""
+    if field in NUMERIC_FIELDS:
+        return 'number'
+    if field in TEXT_FIELDS:
+        return 'text'
+    if field in BOOLEAN_FIELDS:
+        return 'bool'
+    return None
+
+
+def compile_rules(rules, match='all'):
+    """
+    Validate and normalize smart playlist rules into a compiled rule set.
+
+    Args:
+        rules: List of dicts like {'field': 'tempo', 'op': 'between', 'value': [120, 130]}
+        match: 'all' (every rule must match) or 'any'
+
+    Returns:
+        Tuple of (compiled_rule_set, error_message)
+    """
+    if match not in ('all', 'any'):
+        return None, "match must be 'all' or 'any'"
+    if not rules or not isinstance(rules, list):
+        return None, "rules must be a non-empty list"
+
+    compiled = []
+    for rule in rules:
+        if not isinstance(rule, dict):
+            return None, "Each rule must be an object"
+        field = rule.get('field')
+        op = rule.get('op')
+        value = rule.get('value')
+        kind = field_kind(field)
+
+        if not kind:
+            return None, f"Unsupported rule field: {field}"
+        if op not in OPERATORS[kind]:
+            return None, f"Unsupported operator '{op}' for field {field}"
+
+        try:
+            if op == 'between':
+                low, high = (float(v) for v in value)
+                value = [min(low, high), max(low, high)]
+            elif kind == 'number':
+                value = float(value)
+            elif kind == 'text':
+                value = str(value).strip().lower()
+                if not value:
+                    return None, f"Rule value for {field} cannot be empty"
+            else:
+                if not isinstance(value, bool):
+                    return None, f"Rule value for {field} must be true or false"
+        except (TypeError, ValueError):
+            return None, f"Invalid rule value for {field}"
+
+        compiled.append({'field': field, 'op': op, 'value': value})
+
+    return {'version': RULES_VERSION, 'match': match, 'rules': compiled}, None
+
+
+def build_filter(rule_set):
+    """Build a SQLAlchemy filter clause over Song from a compiled rule set"""
+    clauses = []
+    for rule in rule_set['rules']:
+        column = getattr(Song, rule['field'])
+        op, value = rule['op'], rule['value']
+
+        if op == 'between':
+            clauses.append(column.between(value[0], value[1]))
+        elif op == 'gt':
+            clauses.append(column > value)
+        elif op == 'gte':
+            clauses.append(column >= value)
+        elif op == 'lt':
+            clauses.append(column < value)
+        elif op == 'lte':
+            clauses.append(column <= value)
+        elif op == 'eq':
+            clauses.append(column == value)
+        elif op == 'contains':
+            clauses.append(db.func.lower(column).contains(value, autoescape=True))
+        elif op == 'not_contains':
+            # Songs with no value for the field do not contain the term
+            clauses.append(db.or_(column.is_(None), ~db.func.lower(column).contains(value, autoescape=True)))
+        elif op == 'is':
+            # Unknown explicit flags are treated as not explicit
+            clauses.append(column.is_(True) if value else db.or_(column.is_(None), column.is_(False)))
+
+    return db.and_(*clauses) if rule_set['match'] == 'all' else db.or_(*clauses)
+
+
+def build_columns(songs, fields):
+    """Build NumPy column arrays for the given fields from a list of Song rows"""
+    columns = {}
+    for field in fields:
+        values = [getattr(song, field) for song in songs]
+        kind = field_kind(field)
+        if kind == 'number':
+            columns[field] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        elif kind == 'text':
+            columns[field] = np.array([(v or '').lower() for v in values], dtype=str)
+        else:
+            columns[field] = np.array([bool(v) for v in values], dtype=bool)
+    return columns
+
+
+def evaluate_rules(rule_set, columns, size):
+    """
+    Evaluate a compiled rule set against column arrays in one vectorized pass.
+
+    Missing numeric values (NaN) never match, mirroring SQL NULL comparisons.
+
+    Returns:
+        Boolean NumPy mask of length size
+    """
+    combine = np.logical_and if rule_set['match'] == 'all' else np.logical_or
+    mask = np.full(size, rule_set['match'] == 'all', dtype=bool)
+
+    for rule in rule_set['rules']:
+        column = columns[rule['field']]
+        op, value = rule['op'], rule['value']
+
+        with np.errstate(invalid='ignore'):
+            if op == 'between':
+                matched = (column >= value[0]) & (column <= value[1])
+            elif op == 'gt':
+                matched = column > value
+            elif op == 'gte':
+                matched = column >= value
+            elif op == 'lt':
+                matched = column < value
+            elif op == 'lte':
+                matched = column <= value
+            elif op == 'eq':
+                matched = column == value
+            elif op == 'contains':
+                matched = np.char.find(column, value) >= 0
+            elif op == 'not_contains':
+                matched = np.char.find(column, value) < 0
+            else:
+                matched = column == value
+
+        mask = combine(mask, matched)
+
+    return mask
+
+
+def load_rule_set(playlist):
+    """Load the compiled rule set stored on a playlist, or None"""
+    if not playlist.smart_rules:
+        return None
+    try:
+        return json.loads(playlist.smart_rules)
+    except (TypeError, ValueError):
+        current_app.logger.error(f"Invalid smart rules stored on playlist {playlist.id}")
+        return None
+
+
+def _write_smart_songs(playlist, rule_set):
+    """Replace the playlist's rows with the songs matching rule_set and update its counters (no commit)"""
+    position = (db.func.row_number().over(
+        order_by=(Song.artist_names, Song.track_name, Song.track_uri)
+    ) - 1) * POSITION_GAP
+    matching = db.select(
+        db.literal(playlist.id),
+        Song.track_uri,
+        position
+    ).where(build_filter(rule_set))
+
+    db.session.execute(playlist_songs.delete().where(playlist_songs.c.playlist_id == playlist.id))
+    db.session.execute(
+        playlist_songs.insert().from_select(['playlist_id', 'track_uri', 'position'], matching)
+    )
+    # Counters are written in the same transaction, so they always match the rows
+    Playlist._write_counters([playlist.id])
+
+
+def create_smart_playlist(user_id, name, rule_set, description=None):
+    """
+    Create a smart playlist with its rules and matching songs in one transaction.
+
+    Nothing is left behind if materializing fails.
+
+    Args:
+        user_id: Owner of the new playlist
+        name: Name of the new playlist
+        rule_set: Compiled rules (see compile_rules)
+        description: Optional description
+
+    Returns:
+        Tuple of (playlist, error_message)
+    """
+    try:
+        playlist = Playlist(user_id=user_id, name=name, description=description, smart_rules=json.dumps(rule_set))
+        db.session.add(playlist)
+        db.session.flush()
+
+        _write_smart_songs(playlist, rule_set)
+        db.session.commit()
+
+        db.session.refresh(playlist)
+        return playlist, None
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error creating smart playlist for user {user_id}: {str(e)}")
+        return None, str(e)
+
+
+def materialize_playlist(playlist, rule_set=None):
+    """
+    Rebuild a smart playlist's songs from its rules with a single INSERT ... SELECT.
+
+    Matching songs are ordered by artist then track name and spaced POSITION_GAP
+    apart, so later manual moves stay single-row updates. The rows and the
+    playlist's counters are committed together, along with new rules when
+    rule_set is given (a failure keeps the old rules and songs).
+
+    Returns:
+        Tuple of (song_count, error_message)
+    """
+    try:
+        if rule_set is not None:
+            playlist.smart_rules = json.dumps(rule_set)
+        else:
+            rule_set = load_rule_set(playlist)
+        if not rule_set:
+            return 0, "Playlist has no smart rules"
+
+        _write_smart_songs(playlist, rule_set)
+        db.session.commit()
+
+        db.session.refresh(playlist)
+        return playlist.song_count, None
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error materializing smart playlist {playlist.id}: {str(e)}")
+        return 0, str(e)
+
+
+def materialize_new_songs(track_uris):
+    """
+    Add newly inserted songs to every smart playlist whose rules they match.
+
+    Existing members are left in place.
+
+    Args:
+        track_uris: URIs of songs that were just inserted into the library
+
+    Returns:
+        Tuple of (memberships_added, error_message)
+    """
+    added, _, error = apply_rules_to_songs(track_uris)
+    return added, error
+
+
+def rematch_songs(track_uris):
+    """
+    Re-check changed songs (e.g. newly enriched audio features) against every smart playlist.
+
+    Songs that now match a playlist are appended to it and songs that no
+    longer match are removed, so rules on tempo, energy and the like follow
+    feature updates without rebuilding the playlists.
+
+    Args:
+        track_uris: URIs of songs whose rule fields changed
+
+    Returns:
+        Tuple of (memberships_added, memberships_removed, error_message)
+    """
+    return apply_rules_to_songs(track_uris, remove_unmatched=True)
+
+
+def apply_rules_to_songs(track_uris, remove_unmatched=False):
+    """
+    Evaluate the given songs against every smart playlist and update memberships.
+
+    Loads all smart playlists once, then works through the songs
+    RULE_MATCH_CHUNK at a time: each round loads its songs, evaluates every
+    rule set against the same column arrays and writes the memberships with
+    one executemany INSERT (and one executemany DELETE when remove_unmatched).
+    Counters are adjusted and everything is committed in one transaction.
+
+    Returns:
+        Tuple of (memberships_added, memberships_removed, error_message)
+    """
+    try:
+        if not track_uris:
+            return 0, 0, None
+
+        rule_sets = []
+        for playlist in Playlist.query.filter(Playlist.smart_rules.isnot(None)).all():
+            rule_set = load_rule_set(playlist)
+            if rule_set:
+                rule_sets.append((playlist, rule_set))
+        if not rule_sets:
+            return 0, 0, None
+
+        track_uris = list(dict.fromkeys(track_uris))
+        added = 0
+        removed = 0
+        for start in range(0, len(track_uris), RULE_MATCH_CHUNK):
+            chunk_added, chunk_removed = _apply_rules_to_chunk(
+                rule_sets, track_uris[start:start + RULE_MATCH_CHUNK], remove_unmatched
+            )
+            added += chunk_added
+            removed += chunk_removed
+        db.session.commit()
+        return added, removed, None
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error applying smart playlist rules to songs: {str(e)}")
+        return 0, 0, str(e)
+
+
+def _apply_rules_to_chunk(rule_sets, track_uris, remove_unmatched):
+    """Update memberships for one chunk of songs (no commit); returns (added, removed)"""
+    songs = Song.query.filter(Song.track_uri.in_(track_uris)).all()
+    if not songs:
+        return 0, 0
+
+    fields = {rule['field'] for _, rule_set in rule_sets for rule in rule_set['rules']}
+    columns = build_columns(songs, fields)
+
+    song_index = {song.track_uri: index for index, song in enumerate(songs)}
+    playlist_ids = [playlist.id for playlist, _ in rule_sets]
+    existing = set(
+        db.session.query(playlist_songs.c.playlist_id, playlist_songs.c.track_uri)
+        .filter(
+            playlist_songs.c.playlist_id.in_(playlist_ids),
+            playlist_songs.c.track_uri.in_([song.track_uri for song in songs])
+        )
+        .all()
+    )
+    max_positions = dict(
+        db.session.query(playlist_songs.c.playlist_id, db.func.max(playlist_songs.c.position))
+        .filter(playlist_songs.c.playlist_id.in_(playlist_ids))
+        .group_by(playlist_songs.c.playlist_id)
+        .all()
+    )
+
+    rows = []
+    removed_rows = []
+    for playlist, rule_set in rule_sets:
+        mask = evaluate_rules(rule_set, columns, len(songs))
+        max_position = max_positions.get(playlist.id)
+        next_position = 0 if max_position is None else max_position + POSITION_GAP
+        song_delta = 0
+        duration_delta = 0
+        for index in np.flatnonzero(mask):
+            song = songs[index]
+            if (playlist.id, song.track_uri) in existing:
+                continue
+            rows.append({
+                'playlist_id': playlist.id,
+                'track_uri': song.track_uri,
+                'position': next_position
+            })
+            next_position += POSITION_GAP
+            song_delta += 1
+            duration_delta += song.duration_ms or 0
+        if remove_unmatched:
+            for member_playlist_id, track_uri in existing:
+                index = song_index[track_uri]
+                if member_playlist_id != playlist.id or mask[index]:
+                    continue
+                removed_rows.append({'member_playlist_id': playlist.id, 'member_track_uri': track_uri})
+                song_delta -= 1
+                duration_delta -= songs[index].duration_ms or 0
+        if song_delta or duration_delta:
+            playlist._adjust_counters(song_delta, duration_delta)
+
+    if rows:
+        db.session.execute(playlist_songs.insert(), rows)
+    if removed_rows:
+        db.session.execute(
+            playlist_songs.delete().where(
+                playlist_songs.c.playlist_id == db.bindparam('member_playlist_id'),
+                playlist_songs.c.track_uri == db.bindparam('member_track_uri')
+            ),
+            removed_rows
+        )
+    # Flush so the next chunk's counter adjustments build on this one's
+    db.session.flush()
+    return len(rows), len(removed_rows)
@@ -0,0 +1,210 @@
+# flask_app/utils/spotify_client.py
+
+import threading
+import time
+import logging
+import spotipy
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask_app.utils.spotify_scheduler import ScheduledSession, SpotifyRequestScheduler
+
+logger = logging.getLogger(__name__)
+
+# Treat cached tokens as expired this many seconds early so in-flight requests don't race expiry
+TOKEN_EXPIRY_MARGIN = 30
+
+
+class SpotifyClientManager:
+    """
+    Process-wide Spotify client with a pooled keep-alive HTTP session and an
+    in-memory access token cache.
+
+    A single spotipy client is shared by every SpotifyService. It asks this
+    manager for a token on each request (spotipy's auth_manager protocol), so
+    the database is only read when the cached token is missing or about to
+    expire. The HTTP session is created lazily, after any worker fork.
+    Requests go through a SpotifyRequestScheduler, which paces them to
+    Spotify's rate limit and retries 429 and 5xx responses.
+    """
+
+    def __init__(self, pool_size=10, timeout=10, retries=3, api_url=None):
+        self.pool_size = pool_size
+        self.api_url = api_url  # None keeps spotipy's https://api.spotify.com/v1/
+        self.timeout = timeout
+        self.retries = retries
+        self.scheduler = SpotifyRequestScheduler(max_retries=retries)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # Single-flight: one token load at a time per process
+        self._session = None
+        self._adapter = None
+        self._client = None
+        self._token = None
+        self._expires_at = None
+        self._token_loader = None
+        self._stats = {
+            'token_hits': 0,
+            'token_misses': 0,
+            'token_loads': 0,
+            'token_waits': 0,
+            'sessions_created': 0,
+        }
+
+    def init_app(self, app):
+        """Read pool settings from the Flask config (applies to sessions created afterwards)"""
+        self.pool_size = app.config.get('SPOTIFY_POOL_SIZE', self.pool_size)
+        self.timeout = app.config.get('SPOTIFY_REQUEST_TIMEOUT', self.timeout)
+        self.retries = app.config.get('SPOTIFY_REQUEST_RETRIES', self.retries)
+        self.api_url = app.config.get('SPOTIFY_API_URL', self.api_url)
+        self.scheduler.configure(
+            rate=app.config.get('SPOTIFY_RATE_LIMIT', 10),
+            burst=app.config.get('SPOTIFY_RATE_BURST', 20),
+            background_reserve=app.config.get('SPOTIFY_BACKGROUND_RESERVE', 5),
+            max_retries=self.retries,
+            max_retry_after=app.config.get('SPOTIFY_MAX_RETRY_AFTER', 60)
+        )
+
+    def _build_session(self):
+        """Create the shared session with a sized connection pool"""
+        session = ScheduledSession(self.scheduler)
+        # urllib3 only retries failed connections; the scheduler handles 429 and 5xx responses
+        retry = Retry(
+            total=self.retries,
+            connect=None,
+            read=False,
+            status=0,
+            backoff_factor=0.3,
+            respect_retry_after_header=False
+        )
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session.mount('https://', self._adapter)
+        session.mount('http://', self._adapter)
+        self._stats['sessions_created'] += 1
+        return session
+
+    def get_client(self, token_loader):
+        """
+        Get the shared spotipy client, making sure a token is available.
+
+        Args:
+            token_loader: Callable returning a token_info dict with 'access_token'
+                and 'expires_at' (epoch seconds); called when the cache is empty or stale
+
+        Raises:
+            Whatever token_loader raises when no token can be obtained
+        """
+        with self._lock:
+            self._token_loader = token_loader
+            if self._client is None:
+                self._session = self._build_session()
+                self._client = spotipy.Spotify(
+                    auth_manager=self,
+                    requests_session=self._session,
+                    requests_timeout=self.timeout
+                )
+                if self.api_url:
+                    self._client.prefix = self.api_url
+        # Fail early, as the per-request client did, when there is no usable token
+        self.get_access_token()
+        return self._client
+
+    def _cached_token(self):
+        if self._token and self._expires_at and time.time() < self._expires_at - TOKEN_EXPIRY_MARGIN:
+            return self._token
+        return None
+
+    def get_access_token(self, as_dict=False):
+        """
+        Return the cached access token, loading a fresh one when it is about to expire.
+
+        Loads are single-flight: when many threads find the token stale at once,
+        one of them runs the loader while the rest wait on the refresh lock and
+        then pick up the token it stored.
+        """
+        token = self._cached_token()
+        if token:
+            with self._lock:
+                self._stats['token_hits'] += 1
+        else:
+            with self._refresh_lock:
+                token = self._cached_token()
+                with self._lock:
+                    self._stats['token_misses' if token is None else 'token_waits'] += 1
+                if token is None:
+                    if not self._token_loader:
+                        raise ValueError("No Spotify token loader configured")
+                    token_info = self._token_loader()
+                    with self._lock:
+                        self._store(token_info)
+                        self._stats['token_loads'] += 1
+                        token = self._token
+        return {'access_token': token} if as_dict else token
+
+    def _store(self, token_info):
+        self._token = token_info['access_token']
+        self._expires_at = token_info.get('expires_at') or (time.time() + token_info.get('expires_in', 3600))
+
+    def set_token(self, token_info):
+        """Put a token that was just obtained (e.g. from the OAuth callback) into the cache"""
+        with self._lock:
+            self._store(token_info)
+
+    def invalidate(self):
+        """Drop the cached token, e.g. after disconnecting Spotify"""
+        with self._lock:
+            self._token = None
+            self._expires_at = None
+
+    def reset(self):
+        """Close the shared session and forget all state"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._adapter = None
+            self._client = None
+            self._token = None
+            self._expires_at = None
+            self._token_loader = None
+            for key in self._stats:
+                self._stats[key] = 0
+        self.scheduler.reset()
+
+    def get_metrics(self):
+        """Get token cache, connection pool and request scheduler metrics"""
+        with self._lock:
+            lookups = self._stats['token_hits'] + self._stats['token_misses']
+            pools = []
+            if self._adapter is not None:
+                for key in list(self._adapter.poolmanager.pools.keys()):
+                    pool = self._adapter.poolmanager.pools.get(key)
+                    if pool is None:
+                        continue
+                    pools.append({
+                        'host': pool.host,
+                        'connections_opened': pool.num_connections,
+                        'requests': pool.num_requests,
+                        'idle_connections': pool.pool.qsize() if pool.pool else 0,
+                    })
+
+            return {
+                'token_cache': {
+                    'hits': self._stats['token_hits'],
+                    'misses': self._stats['token_misses'],
+                    'loads': self._stats['token_loads'],
+                    'waits': self._stats['token_waits'],
+                    'hit_rate': round(self._stats['token_hits'] / lookups, 3) if lookups else 0,
+                    'cached': self._token is not None,
+                    'expires_in': round(self._expires_at - time.time()) if self._expires_at else None,
+                },
+                'pool': {
+                    'max_size': self.pool_size,
+                    'timeout': self.timeout,
+                    'sessions_created': self._stats['sessions_created'],
+                    'hosts': pools,
+                },
+                'scheduler': self.scheduler.get_metrics(),
+            }
+
+
+# Global instance shared by every SpotifyService in this process
+spotify_client_manager = SpotifyClientManager()
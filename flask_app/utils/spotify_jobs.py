@@ -0,0 +1,271 @@
+# flask_app/utils/spotify_jobs.py
+
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from flask import current_app
+from flask_app.models import db, Playlist, Song, SpotifySyncJob
+from flask_app.models.spotify_sync_job import JobClaimLost
+from flask_app.utils.smart_playlists import rematch_songs
+from flask_app.utils.spotify_scheduler import BACKGROUND, current_priority, request_priority
+from flask_app.utils.spotify_service import SPOTIFY_BATCH_SIZE, SpotifyService
+
+
+def start_spotify_sync_job(job, app):
+    """
+    Claim a queued or failed job and run it in a background thread.
+
+    Returns:
+        The thread, or None if the job is already running or finished
+    """
+    claim_token = SpotifySyncJob.claim(job.id)
+    if not claim_token:
+        return None
+
+    thread = threading.Thread(
+        target=run_spotify_sync_job,
+        args=(job.id, app, claim_token),
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def run_spotify_sync_job(job_id, app, claim_token=None):
+    """
+    Run a Spotify export/import job in background thread.
+
+    Progress is committed after every batch. If a batch fails the job is marked
+    failed with its plan and progress intact, and running it again continues
+    from the first batch that did not complete.
+
+    Every commit checks the runner's claim token (claimed here unless one is
+    passed). A job failed as stale and claimed by another runner is never
+    written by this one: it stops at its next commit.
+    """
+    with app.app_context():
+        job = SpotifySyncJob.find_by_id(job_id)
+        if not job:
+            current_app.logger.error(f"Spotify sync job {job_id} not found")
+            return
+
+        claim_token = claim_token or SpotifySyncJob.claim(job_id)
+        if not claim_token:
+            current_app.logger.warning(f"Spotify sync job {job_id} is already running or finished")
+            return
+        db.session.refresh(job)
+
+        try:
+            current_app.logger.info(f"Starting Spotify {job.direction} job {job_id}")
+
+            # Yield to Spotify calls made by users while the job runs
+            with request_priority(BACKGROUND):
+                if job.direction == 'export':
+                    result = run_export(job, claim_token)
+                elif job.direction == 'enrich':
+                    result = run_enrich(job, claim_token)
+                else:
+                    result = run_import(job, claim_token)
+
+            job.result = json.dumps(result)
+            job.status = 'completed'
+            job.finished_at = datetime.now(timezone.utc)
+            job.claim_token = None
+            job.commit_progress(claim_token)
+
+            current_app.logger.info(
+                f"Spotify {job.direction} job {job_id} completed: "
+                f"{job.completed_batches}/{job.total_batches} batches"
+            )
+
+        except JobClaimLost:
+            current_app.logger.warning(f"Spotify {job.direction} job {job_id} was failed as stale or taken over; stopping")
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Spotify {job.direction} job {job_id} failed: {str(e)}")
+            try:
+                job.status = 'failed'
+                job.finished_at = datetime.now(timezone.utc)
+                job.error_message = str(e)
+                job.claim_token = None
+                job.commit_progress(claim_token)
+            except JobClaimLost:
+                current_app.logger.warning(f"Spotify {job.direction} job {job_id} was taken over; not marking it failed")
+
+
+def run_export(job, claim_token):
+    """Export a local playlist to Spotify, one API write per batch"""
+    playlist = Playlist.find_by_id_and_user(job.playlist_id, job.user_id)
+    if not playlist:
+        raise ValueError("Playlist not found")
+
+    options = job.get_options()
+    service = SpotifyService()
+
+    plan = job.get_plan()
+    if plan is None:
+        plan, error = service.prepare_export(
+            playlist,
+            public=options.get('public', False),
+            incremental=not options.get('recreate', False)
+        )
+        if error:
+            raise RuntimeError(error)
+
+        job.set_plan(plan)
+        job.spotify_playlist_id = plan['spotify_playlist']['id']
+        job.total_batches = len(plan['batches'])
+        job.total_tracks = len(plan['track_uris'])
+        job.commit_progress(claim_token)
+
+    start = job.completed_batches
+    # A resumed plan's snapshot is stale; later batches only need the playlist ID
+    snapshot_id = plan['snapshot_id'] if start == 0 else None
+
+    def on_batch(index, new_snapshot_id):
+        batch = plan['batches'][start + index]
+        job.completed_batches = start + index + 1
+        job.processed_tracks += len(batch['uris'])
+        job.commit_progress(claim_token)
+
+    snapshot_id, _ = service.apply_batches(
+        job.spotify_playlist_id, plan['batches'][start:], snapshot_id, on_batch=on_batch
+    )
+
+    success, error = playlist.mark_spotify_synced(job.spotify_playlist_id, snapshot_id, plan['track_uris'])
+    if not success:
+        raise RuntimeError(error)
+
+    return {
+        'spotify_playlist': plan['spotify_playlist'],
+        'changes': plan['changes'],
+        'playlist': playlist.to_dict()
+    }
+
+
+def run_import(job, claim_token):
+    """Import a Spotify playlist into a local playlist; a batch is one fetched page of tracks"""
+    options = job.get_options()
+    service = SpotifyService()
+
+    local_playlist = None
+    if job.playlist_id:
+        local_playlist = Playlist.find_by_id_and_user(job.playlist_id, job.user_id)
+        if not local_playlist:
+            raise ValueError("Playlist not found")
+
+    def on_created(playlist):
+        # Recorded before any page so a resumed import fills the same playlist
+        job.playlist_id = playlist.id
+        job.commit_progress(claim_token)
+
+    # A resumed import only fetches the pages after processed_tracks
+    stored_batches = job.completed_batches
+
+    def on_fetch(pages_fetched, total_pages, total):
+        if pages_fetched == 1:
+            job.total_tracks = total
+            job.total_batches = stored_batches + total_pages
+            job.commit_progress(claim_token)
+
+    def on_page(playlist, next_offset, total, added, skipped):
+        # processed_tracks is the resume offset; it only moves once a page is stored
+        job.processed_tracks = next_offset
+        job.total_tracks = total
+        job.completed_batches += 1
+        job.added_count += added
+        job.skipped_count += skipped
+        job.commit_progress(claim_token)
+
+    result, error = service.sync_spotify_to_local(
+        spotify_playlist_id=job.spotify_playlist_id,
+        local_user_id=job.user_id,
+        playlist_name=options.get('name'),
+        local_playlist=local_playlist,
+        offset=job.processed_tracks,
+        on_created=on_created,
+        on_page=on_page,
+        on_fetch=on_fetch
+    )
+    if error:
+        raise RuntimeError(error)
+
+    return {
+        'playlist': result['playlist'].to_dict(),
+        'added_count': job.added_count,
+        'skipped_count': job.skipped_count
+    }
+
+
+def run_enrich(job, claim_token):
+    """
+    Fill in missing audio features for library songs, 100 songs per Spotify call.
+
+    Songs are read in track_uri order and the last URI of each stored batch is
+    kept in the job plan, so a resumed job continues after it. Each stored
+    batch is re-checked against smart playlist rules. Requests for the
+    next batches are in flight while the current batch is written; the shared
+    scheduler keeps them within the rate limit.
+    """
+    plan = job.get_plan() or {'after': None}
+    if job.total_tracks == 0:
+        job.total_tracks = Song.count_missing_audio_features(plan['after'])
+        job.total_batches = -(-job.total_tracks // SPOTIFY_BATCH_SIZE)
+        job.set_plan(plan)
+        job.commit_progress(claim_token)
+
+    service = SpotifyService()
+    app = current_app._get_current_object()
+    priority = current_priority()
+    workers = max(1, current_app.config.get('SPOTIFY_ENRICH_WORKERS', 2))
+
+    def fetch(track_uris):
+        with app.app_context(), request_priority(priority):
+            return service.get_audio_features(track_uris)
+
+    cursor = plan['after']
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            # Keep one more batch queued than there are workers
+            while len(pending) <= workers:
+                track_uris = Song.find_missing_audio_features(cursor, SPOTIFY_BATCH_SIZE)
+                if not track_uris:
+                    break
+                cursor = track_uris[-1]
+                pending.append((track_uris, executor.submit(fetch, track_uris)))
+
+            if not pending:
+                break
+
+            track_uris, future = pending.popleft()
+            features = future.result()
+            rows = [dict(features[uri], track_uri=uri) for uri in track_uris if uri in features]
+            updated, error = Song.bulk_update_audio_features(rows)
+            if error:
+                raise RuntimeError(error)
+
+            # New features can move songs into or out of smart playlists with feature rules
+            added, removed, error = rematch_songs([row['track_uri'] for row in rows])
+            if error:
+                current_app.logger.warning(f"Smart playlist update after audio-feature enrichment failed: {error}")
+            elif added or removed:
+                current_app.logger.info(f"Audio-feature enrichment added {added} and removed {removed} smart playlist song(s)")
+
+            plan['after'] = track_uris[-1]
+            job.set_plan(plan)
+            job.completed_batches += 1
+            job.processed_tracks += len(track_uris)
+            job.added_count += updated
+            job.skipped_count += len(track_uris) - updated
+            job.total_batches = max(job.total_batches, job.completed_batches)
+            job.total_tracks = max(job.total_tracks, job.processed_tracks)
+            job.commit_progress(claim_token)
+
+    return {
+        'updated_count': job.added_count,
+        'unavailable_count': job.skipped_count
+    }
@@ -0,0 +1,269 @@
+# flask_app/utils/spotify_scheduler.py
+
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import requests
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+# Responses worth retrying: rate limited, or a transient Spotify server error
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+# Path segments followed by an ID, collapsed so metrics group by endpoint
+ID_COLLECTIONS = frozenset([
+    'albums', 'artists', 'audio-analysis', 'audio-features', 'episodes',
+    'playlists', 'shows', 'tracks', 'users'
+])
+
+_priority = contextvars.ContextVar('spotify_request_priority', default=INTERACTIVE)
+
+
+def current_priority():
+    """Priority of Spotify calls made from the current context"""
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(priority):
+    """
+    Run Spotify calls in this block at the given priority.
+
+    Background sync jobs use BACKGROUND so requests from users browsing the
+    app are served first. Threads started inside the block do not inherit it;
+    pass current_priority() to them explicitly.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def endpoint_name(method, url):
+    """Collapse a request URL into an endpoint label, e.g. 'GET /v1/playlists/{id}/tracks'"""
+    segments = urlparse(url).path.split('/')
+    labels = []
+    for index, segment in enumerate(segments):
+        if index and segments[index - 1] in ID_COLLECTIONS and segment and segment != 'me':
+            labels.append('{id}')
+        else:
+            labels.append(segment)
+    return f"{method.upper()} {'/'.join(labels)}"
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every Spotify call in the process.
+
+    Interactive callers are always served before background callers, and
+    background callers cannot take the last `reserve` tokens, so a burst of
+    sync traffic leaves room for requests a user is waiting on. pause() stops
+    all callers, e.g. for the duration of a 429 Retry-After.
+    """
+
+    def __init__(self, rate, capacity, reserve=0):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.reserve = min(float(reserve), self.capacity - 1)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=INTERACTIVE):
+        """Take one token, blocking until one is available; returns the seconds spent waiting"""
+        started = time.monotonic()
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self._blocked_until:
+                        self._cond.wait(self._blocked_until - now)
+                        continue
+
+                    needed = 1.0
+                    if priority == BACKGROUND:
+                        if self._waiting[INTERACTIVE]:
+                            self._cond.wait(1.0 / self.rate)
+                            continue
+                        needed += self.reserve
+
+                    if self.tokens >= needed:
+                        self.tokens -= 1
+                        return time.monotonic() - started
+                    self._cond.wait((needed - self.tokens) / self.rate)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Stop handing out tokens for the given number of seconds"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self._cond.notify_all()
+
+
+class SpotifyRequestScheduler:
+    """
+    Paces Spotify API calls and retries the ones Spotify rejects.
+
+    Every request takes a token from a shared TokenBucket. A 429 pauses the
+    whole bucket for the Retry-After period (Spotify limits per app, not per
+    request) before retrying; 5xx responses are retried with exponential
+    backoff. Per-endpoint call counts, recent call rates and time spent
+    throttled are kept for the metrics endpoint.
+    """
+
+    def __init__(self, rate=10, burst=20, background_reserve=5, max_retries=3,
+                 max_retry_after=60, backoff_factor=0.5):
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.backoff_factor = backoff_factor
+        self.bucket = TokenBucket(rate, burst, background_reserve)
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def configure(self, rate, burst, background_reserve, max_retries, max_retry_after):
+        """Apply new limits (resets the bucket)"""
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.bucket = TokenBucket(rate, burst, background_reserve)
+
+    def _stats(self, endpoint):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = {
+                'calls': 0,
+                'rate_limited': 0,
+                'server_errors': 0,
+                'retries': 0,
+                'throttled_seconds': 0.0,
+                'recent': deque(),
+            }
+        return stats
+
+    def _record(self, endpoint, waited=0.0, status=None, retried=False):
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats['throttled_seconds'] += waited
+            if status is not None:
+                stats['calls'] += 1
+                stats['recent'].append(now)
+                while stats['recent'] and stats['recent'][0] < now - 60:
+                    stats['recent'].popleft()
+                if status == 429:
+                    stats['rate_limited'] += 1
+                elif status >= 500:
+                    stats['server_errors'] += 1
+            if retried:
+                stats['retries'] += 1
+
+    def retry_delay(self, response, attempt):
+        """Seconds to wait before retrying a rejected response"""
+        if response.status_code == 429:
+            try:
+                return max(0.0, float(response.headers.get('Retry-After', 1)))
+            except ValueError:
+                return 1.0
+        delay = self.backoff_factor * (2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def send(self, endpoint, do_request):
+        """
+        Send a request through the scheduler.
+
+        Args:
+            endpoint: Label from endpoint_name, used for metrics
+            do_request: Callable performing the HTTP request and returning a Response
+
+        Returns:
+            The first successful response, or the last rejected one once retries
+            run out or Spotify asks for a longer wait than max_retry_after
+        """
+        priority = current_priority()
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire(priority)
+            response = do_request()
+            self._record(endpoint, waited, response.status_code)
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+
+            delay = self.retry_delay(response, attempt)
+            if delay > self.max_retry_after:
+                logger.warning(f"Spotify asked to wait {delay:.0f}s on {endpoint}; giving up")
+                return response
+
+            logger.warning(
+                f"Spotify returned {response.status_code} on {endpoint}, retrying in {delay:.1f}s "
+                f"({attempt + 1}/{self.max_retries})"
+            )
+            response.close()
+            if response.status_code == 429:
+                self.bucket.pause(delay)
+            else:
+                time.sleep(delay)
+                self._record(endpoint, delay)
+            self._record(endpoint, retried=True)
+            attempt += 1
+
+    def reset(self):
+        """Forget all metrics"""
+        with self._lock:
+            self._endpoints = {}
+
+    def get_metrics(self):
+        """Per-endpoint call counts, calls in the last minute and time spent throttled"""
+        now = time.monotonic()
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in sorted(self._endpoints.items()):
+                recent = sum(1 for at in stats['recent'] if at >= now - 60)
+                endpoints[endpoint] = {
+                    'calls': stats['calls'],
+                    'calls_last_minute': recent,
+                    'rate_limited': stats['rate_limited'],
+                    'server_errors': stats['server_errors'],
+                    'retries': stats['retries'],
+                    'throttled_seconds': round(stats['throttled_seconds'], 3),
+                }
+            return {
+                'rate': self.bucket.rate,
+                'burst': self.bucket.capacity,
+                'background_reserve': self.bucket.reserve,
+                'available_tokens': round(self.bucket.tokens, 2),
+                'endpoints': endpoints,
+            }
+
+
+class ScheduledSession(requests.Session):
+    """requests.Session that sends every request through a SpotifyRequestScheduler"""
+
+    def __init__(self, scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    def request(self, method, url, *args, **kwargs):
+        return self.scheduler.send(
+            endpoint_name(method, url),
+            lambda: super(ScheduledSession, self).request(method, url, *args, **kwargs)
+        )
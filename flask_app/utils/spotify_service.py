@@ -1,14 +1,123 @@
 # flask_app/utils/spotify_service.py
 
 import spotipy
+from bisect import bisect_left
+from spotipy.cache_handler import MemoryCacheHandler
 from spotipy.oauth2 import SpotifyOAuth
 from flask import current_app, url_for
-from flask_app.models import SpotifyAuth
+from flask_app.models import SpotifyAuth, db
+from flask_app.utils.spotify_client import spotify_client_manager
+from flask_app.utils.spotify_scheduler import current_priority, request_priority
 from datetime import datetime, timezone, timedelta
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Spotify API limits playlist writes to 100 items per request
+SPOTIFY_BATCH_SIZE = 100
+
+# Token refresh coordination between workers (see SpotifyAuth.claim_refresh)
+REFRESH_LEASE_SECONDS = 30  # A claim older than this is considered abandoned
+REFRESH_WAIT_TIMEOUT = 15  # How long a worker waits for another worker's refresh
+REFRESH_POLL_INTERVAL = 0.2
+
+
+def _longest_increasing_subsequence(values):
+    """Return the indexes of one longest strictly increasing subsequence of values"""
+    tails = []
+    tail_indexes = []
+    previous = [None] * len(values)
+    for index, value in enumerate(values):
+        slot = bisect_left(tails, value)
+        if slot == len(tails):
+            tails.append(value)
+            tail_indexes.append(index)
+        else:
+            tails[slot] = value
+            tail_indexes[slot] = index
+        previous[index] = tail_indexes[slot - 1] if slot else None
+    
+    result = []
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        result.append(index)
+        index = previous[index]
+    return result[::-1]
+
+
+def compute_playlist_diff(base_uris, target_uris):
+    """
+    Compute the edits that turn a remote track list into the local one.
+    
+    Tracks that keep their relative order (a longest increasing subsequence of
+    their old positions) stay put. Everything else is removed and re-inserted at
+    its final index, grouped into contiguous runs so each run costs one call per
+    100 tracks.
+    
+    Args:
+        base_uris: Track URIs currently on Spotify, in order
+        target_uris: Track URIs the Spotify playlist should end up with, in order
+    
+    Returns:
+        Dict with 'remove' (URIs to remove), 'insert' (list of (position, uris)
+        runs, applied in order), and 'added', 'removed', 'moved' counts
+    """
+    target_uris = list(dict.fromkeys(target_uris))
+    target_set = set(target_uris)
+    
+    base_positions = {}
+    duplicated = set()
+    for position, uri in enumerate(base_uris):
+        if uri in base_positions:
+            duplicated.add(uri)
+        else:
+            base_positions[uri] = position
+    
+    # Tracks that exist on both sides exactly once are candidates to stay in place
+    shared = [uri for uri in target_uris if uri in base_positions and uri not in duplicated]
+    kept = {shared[i] for i in _longest_increasing_subsequence([base_positions[uri] for uri in shared])}
+    
+    removed = [uri for uri in base_positions if uri not in target_set]
+    moved = [uri for uri in shared if uri not in kept]
+    reinserted = [uri for uri in duplicated if uri in target_set]
+    
+    inserts = []
+    run_start = None
+    for position, uri in enumerate(target_uris + [None]):
+        if uri is not None and uri not in kept:
+            if run_start is None:
+                run_start = position
+        elif run_start is not None:
+            run = target_uris[run_start:position]
+            for offset in range(0, len(run), SPOTIFY_BATCH_SIZE):
+                inserts.append((run_start + offset, run[offset:offset + SPOTIFY_BATCH_SIZE]))
+            run_start = None
+    
+    return {
+        'remove': removed + moved + [uri for uri in duplicated if uri in target_set],
+        'insert': inserts,
+        'added': len([uri for uri in target_uris if uri not in base_positions]),
+        'removed': len(removed),
+        'moved': len(moved) + len(reinserted),
+    }
+
+
+def playlist_diff_batches(diff):
+    """
+    Split a diff from compute_playlist_diff into API-sized write batches.
+    
+    Removals come first, then inserts left to right; applying the batches in
+    order (and resuming from any batch after a failure) yields the target list.
+    """
+    batches = [
+        {'op': 'remove', 'uris': diff['remove'][i:i + SPOTIFY_BATCH_SIZE]}
+        for i in range(0, len(diff['remove']), SPOTIFY_BATCH_SIZE)
+    ]
+    batches.extend({'op': 'add', 'position': position, 'uris': uris} for position, uris in diff['insert'])
+    return batches
+
+
 class SpotifyService:
     """Service class for Spotify API operations"""
     
@@ -18,6 +127,7 @@ class SpotifyService:
         self.client_secret = current_app.config.get('SPOTIPY_CLIENT_SECRET')
         self.redirect_uri = current_app.config.get('SPOTIPY_REDIRECT_URI')
         self.scope = current_app.config.get('SPOTIPY_SCOPE', 'playlist-modify-public,playlist-modify-private,playlist-read-private,playlist-read-collaborative')
+        self.token_url = current_app.config.get('SPOTIFY_TOKEN_URL')
         self._client = None
         self._oauth_manager = None
     
@@ -27,59 +137,101 @@ class SpotifyService:
             if not all([self.client_id, self.client_secret, self.redirect_uri]):
                 raise ValueError("Spotify OAuth configuration missing. Please set SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET, and SPOTIPY_REDIRECT_URI")
             
-            # Use cache_path=None to prevent file-based caching, we'll handle tokens in DB
+            # Tokens live in the spotify_auth table; keep spotipy's own copy in memory
+            # (its default handler writes a .cache file in the working directory)
             self._oauth_manager = SpotifyOAuth(
                 client_id=self.client_id,
                 client_secret=self.client_secret,
                 redirect_uri=self.redirect_uri,
                 scope=self.scope,
-                cache_path=None  # We manage tokens in database
+                cache_handler=MemoryCacheHandler()
             )
+            if self.token_url:
+                # e.g. a local stand-in server (tests/fake_spotify.py)
+                self._oauth_manager.OAUTH_TOKEN_URL = self.token_url
         return self._oauth_manager
     
     def get_client(self, token_info=None):
-        """Get Spotify client with valid token"""
+        """
+        Get the shared Spotify client with a valid token.
+        
+        The client and its keep-alive connection pool are shared process-wide
+        (see spotify_client_manager); the database is only read when the cached
+        token is missing or about to expire.
+        """
         try:
-            # If token_info not provided, get from database
-            if not token_info:
-                auth = SpotifyAuth.get_active_auth()
-                if not auth:
-                    raise ValueError("No valid Spotify authentication found. Please connect to Spotify first.")
-                
-                if auth.is_expired():
-                    # Try to refresh token
-                    token_info = self.refresh_token(auth)
-                    if not token_info:
-                        raise ValueError("Spotify token expired and refresh failed. Please reconnect to Spotify.")
-                else:
-                    token_info = {
-                        'access_token': auth.access_token,
-                        'refresh_token': auth.refresh_token,
-                        'expires_at': int(auth.token_expires_at.timestamp()) if auth.token_expires_at else None,
-                        'scope': auth.scope
-                    }
-            
-            # Create client with token
-            self._client = spotipy.Spotify(auth=token_info['access_token'])
+            if token_info:
+                spotify_client_manager.set_token(token_info)
+            
+            self._client = spotify_client_manager.get_client(self.load_token_info)
             return self._client
             
         except Exception as e:
             logger.error(f"Error getting Spotify client: {str(e)}")
             raise
     
+    def load_token_info(self):
+        """Load the current token from the database, refreshing it if it has expired"""
+        auth = SpotifyAuth.get_current()
+        if not auth:
+            raise ValueError("No valid Spotify authentication found. Please connect to Spotify first.")
+        
+        if auth.is_expired():
+            # Try to refresh token
+            token_info = self.refresh_token(auth)
+            if not token_info:
+                raise ValueError("Spotify token expired and refresh failed. Please reconnect to Spotify.")
+            return token_info
+        
+        return self.token_info_from_auth(auth)
+    
+    @staticmethod
+    def token_info_from_auth(auth):
+        """Build a spotipy-style token_info dict from a SpotifyAuth row"""
+        return {
+            'access_token': auth.access_token,
+            'refresh_token': auth.refresh_token,
+            'expires_at': int(auth.get_expires_at().timestamp()) if auth.token_expires_at else None,
+            'scope': auth.scope
+        }
+    
     def refresh_token(self, auth):
-        """Refresh Spotify access token"""
+        """
+        Refresh Spotify access token.
+        
+        Only one worker refreshes at a time: the one that wins the compare-and-set
+        claim on the auth row calls Spotify, the others poll the row until the new
+        token is stored and use that.
+        """
         try:
             if not auth.refresh_token:
                 logger.error("No refresh token available")
                 return None
             
-            oauth_manager = self.get_oauth_manager()
-            token_info = oauth_manager.refresh_access_token(auth.refresh_token)
-            
-            # Update auth in database
+            previous_token = auth.access_token
+            deadline = time.monotonic() + REFRESH_WAIT_TIMEOUT
+            while not auth.claim_refresh(REFRESH_LEASE_SECONDS):
+                # Another worker is refreshing (or just did), wait for its result
+                db.session.refresh(auth)
+                if auth.access_token != previous_token and auth.is_valid():
+                    logger.info("Using Spotify token refreshed by another worker")
+                    return self.token_info_from_auth(auth)
+                if time.monotonic() >= deadline:
+                    logger.error("Timed out waiting for another worker to refresh the Spotify token")
+                    return None
+                time.sleep(REFRESH_POLL_INTERVAL)
+            
+            try:
+                oauth_manager = self.get_oauth_manager()
+                token_info = oauth_manager.refresh_access_token(auth.refresh_token)
+            except Exception:
+                auth.release_refresh()
+                raise
+            
+            # Update auth in database and release the claim
             expires_in = token_info.get('expires_in', 3600)
-            success, error = auth.update_token(
+            success, error = auth.complete_refresh(
+                previous_token,
                 access_token=token_info['access_token'],
                 refresh_token=token_info.get('refresh_token') or auth.refresh_token,
                 expires_in=expires_in
@@ -125,6 +277,7 @@ class SpotifyService:
                 logger.error(f"Error storing token: {error}")
                 return None, error
             
+            spotify_client_manager.set_token(token_info)
             return token_info, None
             
         except Exception as e:
@@ -199,16 +352,137 @@ class SpotifyService:
             logger.error(f"Error getting playlist tracks: {str(e)}")
             return None, str(e)
     
-    def sync_local_to_spotify(self, local_playlist, public=False):
-        """Export local playlist to Spotify"""
+    def get_audio_features(self, track_uris):
+        """
+        Fetch audio features for up to SPOTIFY_BATCH_SIZE tracks in one call.
+        
+        Returns:
+            Dict of track_uri -> {feature: value} for the tracks Spotify has
+            features for; tracks without features are left out
+        """
+        from flask_app.models.song import AUDIO_FEATURES
+        client = self.get_client()
+        features = {}
+        for item in client.audio_features(list(track_uris)) or []:
+            if item and item.get('uri'):
+                features[item['uri']] = {name: item.get(name) for name in AUDIO_FEATURES}
+        return features
+    
+    def get_playlist_track_uris(self, playlist_id):
+        """Fetch the ordered track URIs currently in a Spotify playlist"""
+        client = self.get_client()
+        track_uris = []
+        offset = 0
+        while True:
+            results = client.playlist_items(
+                playlist_id=playlist_id,
+                fields='items(track(uri)),next',
+                limit=100,
+                offset=offset
+            )
+            items = results.get('items', [])
+            track_uris.extend(item['track']['uri'] for item in items if item.get('track'))
+            if not items or not results.get('next'):
+                break
+            offset += len(items)
+        return track_uris
+    
+    def apply_batches(self, playlist_id, batches, snapshot_id=None, on_batch=None):
+        """
+        Apply write batches from playlist_diff_batches to a Spotify playlist, in order.
+        
+        Args:
+            playlist_id: Spotify playlist ID
+            batches: List of {'op': 'remove'|'add', 'uris': [...], 'position': int} dicts
+            snapshot_id: Snapshot the removals are relative to (optional)
+            on_batch: Optional callback(batch_index, snapshot_id) after each successful batch
+        
+        Returns:
+            Tuple of (snapshot_id, api_call_count)
+        """
+        client = self.get_client()
+        calls = 0
+        for index, batch in enumerate(batches):
+            if batch['op'] == 'remove':
+                result = client.playlist_remove_all_occurrences_of_items(
+                    playlist_id, batch['uris'], snapshot_id=snapshot_id
+                )
+            else:
+                result = client.playlist_add_items(
+                    playlist_id=playlist_id, items=batch['uris'], position=batch['position']
+                )
+            snapshot_id = result.get('snapshot_id', snapshot_id)
+            calls += 1
+            if on_batch:
+                on_batch(index, snapshot_id)
+        
+        return snapshot_id, calls
+    
+    def apply_playlist_diff(self, playlist_id, diff, snapshot_id=None):
+        """
+        Apply a diff from compute_playlist_diff to a Spotify playlist.
+        
+        Returns:
+            Tuple of (snapshot_id, api_call_count)
+        """
+        return self.apply_batches(playlist_id, playlist_diff_batches(diff), snapshot_id)
+    
+    def prepare_export(self, local_playlist, public=False, incremental=True):
+        """
+        Work out the Spotify writes needed to export a local playlist.
+        
+        If the playlist was synced before and incremental is True, the plan only
+        contains the difference since the last sync, applied to the existing
+        Spotify playlist. The remote track list is re-read only if its snapshot_id
+        no longer matches the one recorded at the last sync. Otherwise a new
+        Spotify playlist is created and the plan adds every track.
+        
+        Returns:
+            Tuple of (plan_dict, error_message). The plan has 'spotify_playlist',
+            'snapshot_id', 'track_uris', 'batches', 'changes' and 'api_calls'
+            (calls made while planning); it is JSON-serializable.
+        """
         try:
-            # Get ordered songs from local playlist
-            songs = local_playlist.get_songs_ordered()
-            if not songs:
-                return None, "Playlist is empty"
+            track_uris = local_playlist.get_track_uris()
+            
+            if incremental and local_playlist.is_synced_to_spotify():
+                client = self.get_client()
+                try:
+                    remote = client.playlist(
+                        playlist_id=local_playlist.spotify_playlist_id,
+                        fields='id,name,external_urls,uri,snapshot_id'
+                    )
+                except spotipy.SpotifyException as e:
+                    if e.http_status != 404:
+                        raise
+                    logger.warning(f"Spotify playlist {local_playlist.spotify_playlist_id} no longer exists, recreating")
+                    remote = None
+                
+                if remote:
+                    calls = 1
+                    if remote.get('snapshot_id') and remote['snapshot_id'] == local_playlist.spotify_snapshot_id:
+                        base_uris = local_playlist.get_spotify_synced_tracks()
+                    else:
+                        base_uris = self.get_playlist_track_uris(remote['id'])
+                        calls += max(1, -(-len(base_uris) // 100))
+                    
+                    diff = compute_playlist_diff(base_uris, track_uris)
+                    return {
+                        'spotify_playlist': {
+                            'id': remote['id'],
+                            'name': remote.get('name'),
+                            'external_urls': remote.get('external_urls', {}),
+                            'uri': remote.get('uri'),
+                        },
+                        'snapshot_id': remote.get('snapshot_id'),
+                        'track_uris': track_uris,
+                        'batches': playlist_diff_batches(diff),
+                        'changes': {'added': diff['added'], 'removed': diff['removed'], 'moved': diff['moved']},
+                        'api_calls': calls
+                    }, None
             
-            # Extract track URIs (format: spotify:track:...)
-            track_uris = [song.track_uri for song in songs]
+            if not track_uris:
+                return None, "Playlist is empty"
             
             # Create playlist on Spotify
             spotify_playlist, error = self.create_playlist_on_spotify(
@@ -220,85 +494,169 @@ class SpotifyService:
             if error:
                 return None, error
             
-            # Add tracks to Spotify playlist
-            success, error = self.add_tracks_to_playlist(spotify_playlist['id'], track_uris)
-            if not success:
-                # If adding tracks failed, we should handle cleanup (optional)
-                return None, error
-            
-            # Return playlist info
             return {
-                'id': spotify_playlist['id'],
-                'name': spotify_playlist['name'],
-                'external_urls': spotify_playlist.get('external_urls', {}),
-                'uri': spotify_playlist.get('uri')
+                'spotify_playlist': {
+                    'id': spotify_playlist['id'],
+                    'name': spotify_playlist['name'],
+                    'external_urls': spotify_playlist.get('external_urls', {}),
+                    'uri': spotify_playlist.get('uri'),
+                },
+                'snapshot_id': spotify_playlist.get('snapshot_id'),
+                'track_uris': track_uris,
+                'batches': playlist_diff_batches(compute_playlist_diff([], track_uris)),
+                'changes': {'added': len(track_uris), 'removed': 0, 'moved': 0},
+                'api_calls': 2
             }, None
             
         except Exception as e:
-            logger.error(f"Error syncing local playlist to Spotify: {str(e)}")
+            logger.error(f"Error preparing Spotify export: {str(e)}")
             return None, str(e)
     
-    def sync_spotify_to_local(self, spotify_playlist_id, local_user_id, playlist_name=None):
-        """Import Spotify playlist to local system"""
+    def sync_local_to_spotify(self, local_playlist, public=False, incremental=True):
+        """
+        Export local playlist to Spotify in one go (see prepare_export).
+        
+        Background export jobs run the same plan batch by batch instead, see
+        flask_app/utils/spotify_jobs.py.
+        """
         try:
-            from flask_app.models import Playlist, Song
-            
-            client = self.get_client()
+            plan, error = self.prepare_export(local_playlist, public=public, incremental=incremental)
+            if error:
+                return None, error
             
-            # Get playlist info
-            playlist_info = client.playlist(playlist_id=spotify_playlist_id, fields='id,name,description')
-            playlist_name = playlist_name or playlist_info.get('name', 'Imported Playlist')
-            playlist_description = playlist_info.get('description')
+            spotify_playlist = plan['spotify_playlist']
+            snapshot_id, calls = self.apply_batches(spotify_playlist['id'], plan['batches'], plan['snapshot_id'])
+            changes = dict(plan['changes'], api_calls=plan['api_calls'] + calls)
             
-            # Create local playlist
-            local_playlist, error = Playlist.create_for_user(
-                user_id=local_user_id,
-                name=playlist_name,
-                description=playlist_description
+            logger.info(
+                f"Synced Spotify playlist {spotify_playlist['id']}: "
+                f"+{changes['added']} -{changes['removed']} ~{changes['moved']} in {changes['api_calls']} calls"
             )
+            return dict(spotify_playlist, snapshot_id=snapshot_id, track_uris=plan['track_uris'], changes=changes), None
             
-            if error:
-                return None, error
+        except Exception as e:
+            logger.error(f"Error syncing local playlist to Spotify: {str(e)}")
+            return None, str(e)
+    
+    def _fetch_playlist_page(self, client, spotify_playlist_id, offset):
+        """Fetch one page of playlist items and return (track_uris, item_count, results)"""
+        results = client.playlist_items(
+            playlist_id=spotify_playlist_id,
+            fields='items(track(uri,type)),total,next',
+            limit=SPOTIFY_BATCH_SIZE,
+            offset=offset
+        )
+        items = results.get('items', [])
+        track_uris = [
+            item['track']['uri'] for item in items  # Format: spotify:track:...
+            if item.get('track') and item['track'].get('type') == 'track'
+        ]
+        return track_uris, len(items), results
+    
+    def sync_spotify_to_local(self, spotify_playlist_id, local_user_id, playlist_name=None,
+                              local_playlist=None, offset=0, on_created=None, on_page=None,
+                              on_fetch=None):
+        """
+        Import Spotify playlist to local system.
+        
+        The first page gives the playlist's total; the remaining pages are then
+        fetched concurrently (SPOTIFY_IMPORT_WORKERS at a time) on the shared
+        client. Pages are stored in playlist order as they arrive: each one's
+        library tracks are appended with one Playlist.add_songs call, then
+        on_page reports the offset after it. Only songs already in the library
+        are added, so smart playlists (matched against them when they were
+        inserted) are left alone. A failed import keeps every page stored
+        before the failure and can be resumed by passing the local playlist
+        created so far and the last reported offset.
+        
+        Args:
+            spotify_playlist_id: Spotify playlist to import
+            local_user_id: Owner of the local playlist
+            playlist_name: Name for the new local playlist (defaults to the Spotify name)
+            local_playlist: Existing local playlist to continue filling (resume)
+            offset: Index of the first Spotify track to import (resume)
+            on_created: Optional callback(local_playlist) once the local playlist is created
+            on_page: Optional callback(local_playlist, next_offset, total, added, skipped) after each stored page
+            on_fetch: Optional callback(pages_fetched, total_pages, total) as pages arrive
+        """
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+            from flask_app.models import Playlist, Song
             
-            # Get all tracks from Spotify playlist (handle pagination)
-            tracks = []
-            offset = 0
-            limit = 100
+            client = self.get_client()
             
-            while True:
-                results = client.playlist_items(
-                    playlist_id=spotify_playlist_id,
-                    limit=limit,
-                    offset=offset
+            if local_playlist is None:
+                # Get playlist info
+                playlist_info = client.playlist(playlist_id=spotify_playlist_id, fields='id,name,description')
+                playlist_name = playlist_name or playlist_info.get('name', 'Imported Playlist')
+                playlist_description = playlist_info.get('description')
+                
+                # Create local playlist
+                local_playlist, error = Playlist.create_for_user(
+                    user_id=local_user_id,
+                    name=playlist_name,
+                    description=playlist_description
                 )
-                tracks.extend(results['items'])
                 
-                # Check if there are more items
-                if len(results['items']) < limit or not results.get('next'):
-                    break
-                offset += limit
+                if error:
+                    return None, error
+                
+                if on_created:
+                    on_created(local_playlist)
+            
+            # The first page tells us how many pages are left
+            first_uris, first_count, results = self._fetch_playlist_page(client, spotify_playlist_id, offset)
+            total = results.get('total', offset + first_count)
+            offsets = []
+            if first_count and results.get('next'):
+                # Step by the page size the API actually returned
+                offsets = list(range(offset + first_count, total, first_count))
+            total_pages = 1 + len(offsets)
+            
+            app = current_app._get_current_object()
+            priority = current_priority()
+            
+            def fetch(page_offset):
+                # Worker threads need an app context in case the token has to be reloaded,
+                # and don't inherit the caller's request priority
+                with app.app_context(), request_priority(priority):
+                    return self._fetch_playlist_page(client, spotify_playlist_id, page_offset)
             
-            # Extract track URIs and add to local playlist
             added_count = 0
             skipped_count = 0
-            
-            for item in tracks:
-                track = item.get('track')
-                if not track or track['type'] != 'track':
-                    continue
+            next_offset = offset
+            
+            def store_page(track_uris, item_count):
+                nonlocal added_count, skipped_count, next_offset
+                # Only tracks already in the local library are added, appended after earlier pages
+                added, errors = local_playlist.add_songs(track_uris)
+                failures = [e['error'] for e in errors if e['error'] not in ('Song not found', 'Song already in playlist')]
+                if failures:
+                    # add_songs reports database errors per track; this page was not stored, so the import can resume here
+                    raise RuntimeError(failures[0])
                 
-                track_uri = track['uri']  # Format: spotify:track:...
-                
-                # Check if track exists in local library
-                song = Song.find_by_track_uri(track_uri)
-                if song:
-                    success, error = local_playlist.add_song(track_uri)
-                    if success:
-                        added_count += 1
-                    else:
-                        skipped_count += 1
-                else:
-                    skipped_count += 1
+                added_count += len(added)
+                skipped_count += len(track_uris) - len(added)
+                next_offset += item_count
+                if on_page:
+                    on_page(local_playlist, next_offset, total, len(added), len(track_uris) - len(added))
+            
+            if on_fetch:
+                on_fetch(1, total_pages, total)
+            store_page(first_uris, first_count)
+            
+            if offsets:
+                workers = max(1, min(current_app.config.get('SPOTIFY_IMPORT_WORKERS', 4), len(offsets)))
+                executor = ThreadPoolExecutor(max_workers=workers)
+                try:
+                    # map yields pages in playlist order while later pages are still in flight
+                    for index, (track_uris, item_count, _) in enumerate(executor.map(fetch, offsets), start=2):
+                        if on_fetch:
+                            on_fetch(index, total_pages, total)
+                        store_page(track_uris, item_count)
+                finally:
+                    # Don't fetch the rest of the playlist if a page failed to store
+                    executor.shutdown(cancel_futures=True)
             
             return {
                 'playlist': local_playlist,
@@ -0,0 +1,66 @@
+"""
+Migration script to add the LLM response cache.
+
+This migration creates the llm_response_cache table, which holds parsed
+research brief responses keyed by model, prompt template version and a hash
+of the normalized source text. Entries are written by
+generate_research_brief and evicted least recently used first once the
+cache exceeds LLM_CACHE_MAX_BYTES. The hit, miss and tokens-saved counters
+live in system_metrics (llm_cache_hits, llm_cache_misses,
+llm_cache_tokens_saved).
+
+The script is safe to re-run: the table is left alone if it exists.
+
+Usage:
+    python migrations/add_llm_response_cache.py
+
+Or manually run the SQL (SQLite):
+    CREATE TABLE IF NOT EXISTS llm_response_cache (
+        id INTEGER PRIMARY KEY,
+        model VARCHAR(100) NOT NULL,
+        prompt_version INTEGER NOT NULL,
+        text_sha256 VARCHAR(64) NOT NULL,
+        response TEXT NOT NULL,
+        size INTEGER NOT NULL DEFAULT 0,
+        prompt_tokens INTEGER NOT NULL DEFAULT 0,
+        completion_tokens INTEGER NOT NULL DEFAULT 0,
+        hit_count INTEGER NOT NULL DEFAULT 0,
+        last_used_at DATETIME NOT NULL,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        CONSTRAINT uq_llm_response_cache_key UNIQUE (model, prompt_version, text_sha256)
+    );
+    CREATE INDEX IF NOT EXISTS ix_llm_response_cache_last_used_at ON llm_response_cache(last_used_at);
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db, LlmResponseCache
+
+def migrate():
+    """Create the llm_response_cache table"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+
+            if 'llm_response_cache' not in inspector.get_table_names():
+                LlmResponseCache.__table__.create(db.engine, checkfirst=True)
+                print("✓ Created 'llm_response_cache' table")
+            else:
+                print("✓ Table 'llm_response_cache' already exists")
+
+            return True
+
+        except Exception as e:
+            print(f"✗ Error running migration: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    print("Running migration: Add LLM response cache...")
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,67 @@
+"""
+Migration script to add denormalized song counters to the playlists table.
+
+This migration adds song_count and total_duration_ms columns to playlists and
+backfills them from playlist_songs. The columns are maintained by the Playlist
+add/remove methods afterwards.
+
+The script is safe to re-run: existing columns are left alone and the counters
+are recomputed each time, so it doubles as the repair job for counter drift
+(e.g. after songs were deleted from the library).
+
+Usage:
+    python migrations/add_playlist_counters.py
+
+Or manually run the SQL (SQLite):
+    ALTER TABLE playlists ADD COLUMN song_count INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE playlists ADD COLUMN total_duration_ms BIGINT NOT NULL DEFAULT 0;
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db, Playlist
+from sqlalchemy import text
+
+def migrate():
+    """Add counter columns to playlists and recompute them"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('playlists')]
+
+            with db.engine.connect() as conn:
+                if 'song_count' not in columns:
+                    conn.execute(text("ALTER TABLE playlists ADD COLUMN song_count INTEGER NOT NULL DEFAULT 0"))
+                    print("✓ Added 'song_count' column to playlists table")
+                else:
+                    print("✓ Column 'song_count' already exists in playlists table")
+
+                if 'total_duration_ms' not in columns:
+                    conn.execute(text("ALTER TABLE playlists ADD COLUMN total_duration_ms BIGINT NOT NULL DEFAULT 0"))
+                    print("✓ Added 'total_duration_ms' column to playlists table")
+                else:
+                    print("✓ Column 'total_duration_ms' already exists in playlists table")
+
+                conn.commit()
+
+            updated, error = Playlist.recompute_counters()
+            if error:
+                print(f"✗ Error recomputing playlist counters: {error}")
+                return False
+
+            print(f"✓ Recomputed counters for {updated} playlist(s)")
+            return True
+
+        except Exception as e:
+            print(f"✗ Error running migration: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    print("Running migration: Add song counters to playlists...")
+    success = migrate()
+    sys.exit(0 if success else 1)
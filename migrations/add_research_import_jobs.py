@@ -0,0 +1,69 @@
+"""
+Migration script to add background research PDF import jobs.
+
+This script creates the research_import_jobs table. Each uploaded PDF gets
+one row, which the worker pool updates as it extracts, summarizes and saves
+the brief, and which the upload progress page polls.
+
+The script is safe to re-run.
+
+Usage:
+    python migrations/add_research_import_jobs.py
+
+Or manually run the SQL (SQLite):
+    CREATE TABLE IF NOT EXISTS research_import_jobs (
+        id VARCHAR(36) PRIMARY KEY,
+        batch_id VARCHAR(36) NOT NULL,
+        user_id INTEGER NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'queued',
+        stage VARCHAR(20) NOT NULL DEFAULT 'queued',
+        original_filename VARCHAR(255) NOT NULL,
+        stored_path VARCHAR(500),
+        content_hash VARCHAR(64),
+        file_size INTEGER NOT NULL DEFAULT 0,
+        tags TEXT,
+        brief_id INTEGER,
+        started_at DATETIME,
+        finished_at DATETIME,
+        error_message TEXT,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (brief_id) REFERENCES research_briefs(id) ON DELETE SET NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS ix_research_import_jobs_batch_id ON research_import_jobs(batch_id);
+    CREATE INDEX IF NOT EXISTS ix_research_import_jobs_user_id ON research_import_jobs(user_id);
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db, ResearchImportJob
+
+def migrate():
+    """Create the research_import_jobs table"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+
+            if 'research_import_jobs' not in inspector.get_table_names():
+                ResearchImportJob.__table__.create(db.engine, checkfirst=True)
+                print("✓ Created 'research_import_jobs' table")
+            else:
+                print("✓ Table 'research_import_jobs' already exists")
+
+            return True
+
+        except Exception as e:
+            print(f"✗ Error running migration: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    print("Running migration: Add research import jobs...")
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,50 @@
+"""
+Migration script to add smart playlist rules to the playlists table.
+
+This migration adds a smart_rules column that stores the compiled rule set
+(JSON) for rule-based smart playlists. Regular playlists keep it NULL.
+
+Usage:
+    python migrations/add_smart_playlists.py
+
+Or manually run the SQL (SQLite):
+    ALTER TABLE playlists ADD COLUMN smart_rules TEXT;
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db
+from sqlalchemy import text
+
+def migrate():
+    """Add smart_rules column to playlists table"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('playlists')]
+            
+            if 'smart_rules' in columns:
+                print("✓ Column 'smart_rules' already exists in playlists table")
+                return True
+            
+            with db.engine.connect() as conn:
+                conn.execute(text("ALTER TABLE playlists ADD COLUMN smart_rules TEXT"))
+                conn.commit()
+            
+            print("✓ Successfully added 'smart_rules' column to playlists table")
+            return True
+            
+        except Exception as e:
+            print(f"✗ Error adding column: {str(e)}")
+            print(f"  You may need to manually run: ALTER TABLE playlists ADD COLUMN smart_rules TEXT;")
+            return False
+
+if __name__ == '__main__':
+    print("Running migration: Add smart_rules to playlists...")
+    success = migrate()
+    sys.exit(0 if success else 1)
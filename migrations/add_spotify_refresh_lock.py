@@ -0,0 +1,60 @@
+"""
+Migration script to coordinate Spotify token refreshes and compact spotify_auth.
+
+This migration adds a refresh_started_at column to spotify_auth, used as a
+compare-and-set claim so only one worker refreshes the shared token at a time.
+It also deletes every spotify_auth row except the newest: earlier versions
+inserted a new row on every connect, and the current code keeps a single row.
+
+The script is safe to re-run.
+
+Usage:
+    python migrations/add_spotify_refresh_lock.py
+
+Or manually run the SQL (SQLite):
+    ALTER TABLE spotify_auth ADD COLUMN refresh_started_at DATETIME;
+    DELETE FROM spotify_auth WHERE id != (SELECT MAX(id) FROM spotify_auth);
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db, SpotifyAuth
+from sqlalchemy import text
+
+def migrate():
+    """Add refresh_started_at to spotify_auth and compact old rows"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('spotify_auth')]
+
+            with db.engine.connect() as conn:
+                if 'refresh_started_at' not in columns:
+                    conn.execute(text("ALTER TABLE spotify_auth ADD COLUMN refresh_started_at DATETIME"))
+                    print("✓ Added 'refresh_started_at' column to spotify_auth table")
+                else:
+                    print("✓ Column 'refresh_started_at' already exists in spotify_auth table")
+
+                conn.commit()
+
+            deleted, error = SpotifyAuth.compact()
+            if error:
+                print(f"✗ Error compacting spotify_auth rows: {error}")
+                return False
+
+            print(f"✓ Removed {deleted} old spotify_auth row(s)")
+            return True
+
+        except Exception as e:
+            print(f"✗ Error running migration: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    print("Running migration: Add Spotify refresh lock and compact auth rows...")
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,53 @@
+"""
+Migration script to add claim tokens to Spotify sync jobs.
+
+This migration adds a claim_token column to spotify_sync_jobs. A runner
+claims a queued or failed job with a compare-and-set that stores a new
+token, and every progress commit checks it, so a job that was failed as
+stale and resumed is never written by two runners.
+
+The script is safe to re-run.
+
+Usage:
+    python migrations/add_spotify_sync_job_claim.py
+
+Or manually run the SQL (SQLite):
+    ALTER TABLE spotify_sync_jobs ADD COLUMN claim_token VARCHAR(36);
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db
+from sqlalchemy import text
+
+def migrate():
+    """Add claim_token to spotify_sync_jobs"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('spotify_sync_jobs')]
+
+            with db.engine.connect() as conn:
+                if 'claim_token' not in columns:
+                    conn.execute(text("ALTER TABLE spotify_sync_jobs ADD COLUMN claim_token VARCHAR(36)"))
+                    print("✓ Added 'claim_token' column to spotify_sync_jobs table")
+                else:
+                    print("✓ Column 'claim_token' already exists in spotify_sync_jobs table")
+
+                conn.commit()
+
+            return True
+
+        except Exception as e:
+            print(f"✗ Error running migration: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    print("Running migration: Add Spotify sync job claim tokens...")
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,71 @@
+"""
+Migration script to add background Spotify export/import jobs.
+
+This script creates the spotify_sync_jobs table, which stores each job's
+options, its resumable work plan and per-batch progress.
+
+The script is safe to re-run.
+
+Usage:
+    python migrations/add_spotify_sync_jobs.py
+
+Or manually run the SQL (SQLite):
+    CREATE TABLE IF NOT EXISTS spotify_sync_jobs (
+        id VARCHAR(36) PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        direction VARCHAR(10) NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'queued',
+        playlist_id INTEGER,
+        spotify_playlist_id VARCHAR(255),
+        options TEXT,
+        plan TEXT,
+        total_batches INTEGER NOT NULL DEFAULT 0,
+        completed_batches INTEGER NOT NULL DEFAULT 0,
+        total_tracks INTEGER NOT NULL DEFAULT 0,
+        processed_tracks INTEGER NOT NULL DEFAULT 0,
+        added_count INTEGER NOT NULL DEFAULT 0,
+        skipped_count INTEGER NOT NULL DEFAULT 0,
+        started_at DATETIME,
+        finished_at DATETIME,
+        result TEXT,
+        error_message TEXT,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (playlist_id) REFERENCES playlists(id) ON DELETE SET NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS ix_spotify_sync_jobs_user_id ON spotify_sync_jobs(user_id);
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db, SpotifySyncJob
+
+def migrate():
+    """Create the spotify_sync_jobs table"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+
+            if 'spotify_sync_jobs' not in inspector.get_table_names():
+                SpotifySyncJob.__table__.create(db.engine, checkfirst=True)
+                print("✓ Created 'spotify_sync_jobs' table")
+            else:
+                print("✓ Table 'spotify_sync_jobs' already exists")
+
+            return True
+
+        except Exception as e:
+            print(f"✗ Error running migration: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    print("Running migration: Add Spotify sync jobs...")
+    success = migrate()
+    sys.exit(0 if success else 1)
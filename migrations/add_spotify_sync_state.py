@@ -0,0 +1,58 @@
+"""
+Migration script to add incremental Spotify sync state to the playlists table.
+
+This migration adds spotify_snapshot_id and spotify_synced_tracks columns to
+playlists. They record the Spotify snapshot and the track list as of the last
+export, so re-exports only send the difference. Playlists synced before this
+migration fall back to reading the remote track list once on their next export.
+
+Usage:
+    python migrations/add_spotify_sync_state.py
+
+Or manually run the SQL (SQLite):
+    ALTER TABLE playlists ADD COLUMN spotify_snapshot_id VARCHAR(255);
+    ALTER TABLE playlists ADD COLUMN spotify_synced_tracks TEXT;
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db
+from sqlalchemy import text
+
+def migrate():
+    """Add Spotify sync state columns to playlists"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('playlists')]
+
+            with db.engine.connect() as conn:
+                if 'spotify_snapshot_id' not in columns:
+                    conn.execute(text("ALTER TABLE playlists ADD COLUMN spotify_snapshot_id VARCHAR(255)"))
+                    print("✓ Added 'spotify_snapshot_id' column to playlists table")
+                else:
+                    print("✓ Column 'spotify_snapshot_id' already exists in playlists table")
+
+                if 'spotify_synced_tracks' not in columns:
+                    conn.execute(text("ALTER TABLE playlists ADD COLUMN spotify_synced_tracks TEXT"))
+                    print("✓ Added 'spotify_synced_tracks' column to playlists table")
+                else:
+                    print("✓ Column 'spotify_synced_tracks' already exists in playlists table")
+
+                conn.commit()
+
+            return True
+
+        except Exception as e:
+            print(f"✗ Error running migration: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    print("Running migration: Add Spotify sync state to playlists...")
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,67 @@
+"""
+Migration script to add per-user tag counts.
+
+This migration creates the user_tag_counts table (how many of each user's
+research briefs carry each tag) and fills it from research_brief_tags. The
+counts are maintained by ResearchBrief.add_tag, remove_tag and safe_delete
+afterwards, and read by the tag filter sidebars.
+
+The script is safe to re-run: the table is left alone if it exists and the
+counts are rebuilt each time, so it doubles as the repair job for count
+drift. Pass a user ID to rebuild only that user's counts.
+
+Usage:
+    python migrations/add_user_tag_counts.py [user_id]
+
+Or manually run the SQL (SQLite):
+    CREATE TABLE IF NOT EXISTS user_tag_counts (
+        user_id INTEGER NOT NULL,
+        tag_id INTEGER NOT NULL,
+        brief_count INTEGER NOT NULL DEFAULT 0,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        PRIMARY KEY (user_id, tag_id),
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+    );
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db, UserTagCount
+
+def migrate(user_id=None):
+    """Create the user_tag_counts table and rebuild the counts"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+
+            if 'user_tag_counts' not in inspector.get_table_names():
+                UserTagCount.__table__.create(db.engine, checkfirst=True)
+                print("✓ Created 'user_tag_counts' table")
+            else:
+                print("✓ Table 'user_tag_counts' already exists")
+
+            rows, error = UserTagCount.rebuild(user_id)
+            if error:
+                print(f"✗ Error rebuilding tag counts: {error}")
+                return False
+
+            scope = f"user {user_id}" if user_id is not None else "all users"
+            print(f"✓ Rebuilt {rows} tag count(s) for {scope}")
+            return True
+
+        except Exception as e:
+            print(f"✗ Error running migration: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    user_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print("Running migration: Add per-user tag counts...")
+    success = migrate(user_id)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,129 @@
+"""
+Migration script to move research brief PDFs into the content-addressed PDF store.
+
+This script creates the pdf_blobs table and the research_briefs.pdf_sha256
+column, then moves every PDF still held in research_briefs.pdf_data into the
+store (PDF_STORE_FOLDER, default <UPLOAD_FOLDER>/pdf_store), a batch of
+briefs at a time so only one batch of PDFs is in memory at once. Identical
+PDFs are stored once and reference-counted. Each batch is committed
+separately, so the script can be interrupted and re-run; it finishes by
+recomputing the reference counts.
+
+The freed space is only returned to the filesystem after a VACUUM (SQLite).
+
+Usage:
+    python migrations/move_pdfs_to_blob_store.py [batch_size]
+
+Or manually run the SQL (SQLite) and then this script to move the data:
+    CREATE TABLE IF NOT EXISTS pdf_blobs (
+        sha256 VARCHAR(64) PRIMARY KEY,
+        size INTEGER NOT NULL DEFAULT 0,
+        ref_count INTEGER NOT NULL DEFAULT 0,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL
+    );
+
+    ALTER TABLE research_briefs ADD COLUMN pdf_sha256 VARCHAR(64) REFERENCES pdf_blobs(sha256);
+    CREATE INDEX IF NOT EXISTS ix_research_briefs_pdf_sha256 ON research_briefs(pdf_sha256);
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from flask_app.models import db, PdfBlob, ResearchBrief
+from sqlalchemy import text
+
+DEFAULT_BATCH_SIZE = 50
+
+def add_schema():
+    """Create the pdf_blobs table and the pdf_sha256 column if missing"""
+    inspector = db.inspect(db.engine)
+
+    if 'pdf_blobs' not in inspector.get_table_names():
+        PdfBlob.__table__.create(db.engine, checkfirst=True)
+        print("✓ Created 'pdf_blobs' table")
+    else:
+        print("✓ Table 'pdf_blobs' already exists")
+
+    columns = [col['name'] for col in inspector.get_columns('research_briefs')]
+    if 'pdf_sha256' not in columns:
+        with db.engine.connect() as conn:
+            conn.execute(text("ALTER TABLE research_briefs ADD COLUMN pdf_sha256 VARCHAR(64) REFERENCES pdf_blobs(sha256)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_research_briefs_pdf_sha256 ON research_briefs(pdf_sha256)"))
+            conn.commit()
+        print("✓ Added 'pdf_sha256' column to research_briefs table")
+    else:
+        print("✓ Column 'pdf_sha256' already exists in research_briefs table")
+
+def move_pdfs(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Move PDFs from research_briefs.pdf_data into the store.
+
+    Batches are selected by id (id > last id seen) rather than by offset, so
+    each query is an index range scan and rows cleared by earlier batches
+    do not shift the window.
+
+    Returns:
+        Number of briefs moved
+    """
+    briefs = ResearchBrief.__table__
+    moved = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.execute(
+            db.select(briefs.c.id, briefs.c.pdf_data)
+            .where(briefs.c.id > last_id, briefs.c.pdf_data.isnot(None), briefs.c.pdf_sha256.is_(None))
+            .order_by(briefs.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        for brief_id, pdf_data in rows:
+            digest, error = PdfBlob.acquire(pdf_data)
+            if error:
+                raise RuntimeError(f"Could not store PDF for research brief {brief_id}: {error}")
+            db.session.execute(
+                briefs.update().where(briefs.c.id == brief_id).values(pdf_sha256=digest, pdf_data=None)
+            )
+        db.session.commit()
+
+        last_id = rows[-1][0]
+        moved += len(rows)
+        print(f"  Moved {moved} PDFs (up to research brief {last_id})")
+
+    return moved
+
+def migrate(batch_size=DEFAULT_BATCH_SIZE):
+    """Create the PDF store schema and move existing PDFs into it"""
+    with app.app_context():
+        try:
+            add_schema()
+
+            moved = move_pdfs(batch_size)
+            print(f"✓ Moved {moved} PDFs into the PDF store")
+
+            updated, error = PdfBlob.recompute_ref_counts()
+            if error:
+                print(f"✗ Error recomputing reference counts: {error}")
+                return False
+            print(f"✓ Recomputed reference counts for {updated} stored PDFs")
+
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"✗ Error running migration: {str(e)}")
+            print("  Batches already committed are kept; re-run the script to continue.")
+            return False
+
+if __name__ == '__main__':
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH_SIZE
+    print("Running migration: Move research brief PDFs to the PDF store...")
+    success = migrate(batch_size)
+    sys.exit(0 if success else 1)
@@ -145,99 +145,244 @@ document.addEventListener('DOMContentLoaded', function() {
         const playlistSongsBody = document.getElementById('playlistSongsBody');
         if (!playlistSongsBody) return;
         
-        // Remove song from playlist
-        const removeSongBtns = document.querySelectorAll('.remove-song-btn');
+        // Virtual scrolling: songs are fetched page by page and only the rows
+        // near the viewport are rendered, so the DOM stays small for any playlist size
+        const scrollContainer = document.getElementById('playlistSongsScroll');
+        const songCountLabel = document.getElementById('playlistSongCount');
+        const ROW_HEIGHT = 64;      // Must match .playlist-virtual-scroll .playlist-song-row
+        const PAGE_SIZE = 200;
+        const OVERSCAN = 10;        // Extra rows rendered above and below the viewport
         
-        removeSongBtns.forEach(btn => {
-            btn.addEventListener('click', function(e) {
-                e.stopPropagation();
-                const trackUri = this.dataset.trackUri;
-                const row = this.closest('tr');
-                const songName = row.querySelector('td:nth-child(3) strong').textContent;
-                
-                if (!confirm(`Remove "${songName}" from this playlist?`)) {
+        let songs = [];
+        let loadedUris = new Set();
+        let nextCursor = null;
+        let total = parseInt(songCountLabel ? songCountLabel.textContent : '0', 10) || 0;
+        let started = false;
+        let loading = false;
+        let loadFailed = false;     // Stops renderRows from retrying a failing request in a loop
+        let renderQueued = false;
+        
+        function loadNextPage() {
+            if (loading || loadFailed || (started && !nextCursor)) return;
+            loading = true;
+            
+            const params = new URLSearchParams({ limit: PAGE_SIZE });
+            if (nextCursor) {
+                params.set('after', nextCursor.after);
+                params.set('after_uri', nextCursor.after_uri);
+            }
+            
+            fetch(`/music/playlists/${PLAYLIST_ID}/songs?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    console.error('Error loading songs:', data.error);
+                    loadFailed = true;
                     return;
                 }
-                
-                fetch(`/music/playlists/${PLAYLIST_ID}/remove-song?track_uri=${encodeURIComponent(trackUri)}`, {
-                    method: 'DELETE'
-                })
-                .then(response => response.json())
-                .then(data => {
-                    if (data.error) {
-                        alert('Error removing song: ' + data.error);
-                        return;
+                started = true;
+                // A song moved since its page was loaded can show up again in a later page
+                data.songs.forEach(song => {
+                    if (!loadedUris.has(song.track_uri)) {
+                        loadedUris.add(song.track_uri);
+                        songs.push(song);
                     }
-                    
-                    // Remove row from table
-                    row.remove();
-                    
-                    // Update row numbers
-                    updateRowNumbers();
-                    
-                    // Show notification
-                    showNotification('Song removed from playlist', 'success');
-                })
-                .catch(error => {
-                    console.error('Error removing song:', error);
-                    alert('Error removing song. Please try again.');
                 });
+                nextCursor = data.next;
+                total = nextCursor ? Math.max(data.total, songs.length) : songs.length;
+            })
+            .catch(error => {
+                console.error('Error loading songs:', error);
+                loadFailed = true;
+            })
+            .finally(() => {
+                loading = false;
+                renderRows();
             });
+        }
+        
+        function reloadSongs() {
+            songs = [];
+            loadedUris = new Set();
+            nextCursor = null;
+            started = false;
+            loadFailed = false;
+            loadNextPage();
+        }
+        
+        function spacerRow(height) {
+            return height > 0 ? `<tr class="playlist-virtual-spacer" style="height: ${height}px;"><td colspan="10"></td></tr>` : '';
+        }
+        
+        function songRow(song, index) {
+            const tempo = song.tempo
+                ? `<span style="font-weight: 600; color: #6c5ce7;">${song.tempo.toFixed(1)} <small style="color: #6c757d; font-weight: normal;">BPM</small></span>`
+                : '<span style="color: #adb5bd;">—</span>';
+            const popularity = song.popularity !== null
+                ? `<span class="badge bg-info">${song.popularity}</span>`
+                : '<span style="color: #adb5bd;">—</span>';
+            const explicit = song.explicit
+                ? '<span class="badge bg-danger">Explicit</span>'
+                : '<span class="badge bg-success">Clean</span>';
+            
+            return `
+                <tr class="playlist-song-row" data-index="${index}" data-track-uri="${escapeHtml(song.track_uri)}">
+                    <td>${index + 1}</td>
+                    <td class="reorder-controls">
+                        <button type="button" class="btn btn-sm btn-link move-up-btn" title="Move Up" ${index === 0 ? 'disabled' : ''}>
+                            <i class="fas fa-arrow-up"></i>
+                        </button>
+                        <button type="button" class="btn btn-sm btn-link move-down-btn" title="Move Down" ${index >= songs.length - 1 ? 'disabled' : ''}>
+                            <i class="fas fa-arrow-down"></i>
+                        </button>
+                    </td>
+                    <td><strong>${escapeHtml(song.track_name || '—')}</strong></td>
+                    <td><span style="color: #6c757d;">${escapeHtml(song.artist_names || '—')}</span></td>
+                    <td><span style="color: #6c757d; font-size: 0.9rem;">${escapeHtml(song.album_name || '—')}</span></td>
+                    <td><span style="color: #6c757d;">${escapeHtml(song.release_date || '—')}</span></td>
+                    <td>${popularity}</td>
+                    <td>${explicit}</td>
+                    <td>${tempo}</td>
+                    <td>
+                        <button type="button" class="btn btn-sm btn-danger remove-song-btn" title="Remove from Playlist">
+                            <i class="fas fa-times"></i>
+                        </button>
+                    </td>
+                </tr>
+            `;
+        }
+        
+        function renderRows() {
+            renderQueued = false;
+            const scrollTop = scrollContainer.scrollTop;
+            const viewportHeight = scrollContainer.clientHeight;
+            const first = Math.max(0, Math.floor(scrollTop / ROW_HEIGHT) - OVERSCAN);
+            const last = Math.min(total, Math.ceil((scrollTop + viewportHeight) / ROW_HEIGHT) + OVERSCAN);
+            const end = Math.min(last, songs.length);
+            
+            let html = spacerRow(Math.min(first, end) * ROW_HEIGHT);
+            for (let index = first; index < end; index++) {
+                html += songRow(songs[index], index);
+            }
+            html += spacerRow((total - Math.max(first, end)) * ROW_HEIGHT);
+            playlistSongsBody.innerHTML = html;
+            
+            if (songCountLabel) {
+                songCountLabel.textContent = total;
+            }
+            
+            // Keyset pages are sequential, so keep fetching until the viewport is covered
+            if (last > songs.length) {
+                loadNextPage();
+            }
+        }
+        
+        scrollContainer.addEventListener('scroll', function() {
+            if (!renderQueued) {
+                renderQueued = true;
+                requestAnimationFrame(renderRows);
+            }
         });
         
-        // Reorder songs - move up
-        const moveUpBtns = document.querySelectorAll('.move-up-btn');
-        moveUpBtns.forEach(btn => {
-            btn.addEventListener('click', function(e) {
-                e.stopPropagation();
-                const row = this.closest('tr');
-                const prevRow = row.previousElementSibling;
-                
-                if (!prevRow || !prevRow.classList.contains('playlist-song-row')) {
-                    return; // Can't move up
-                }
-                
-                // Swap rows
-                playlistSongsBody.insertBefore(row, prevRow);
-                updateRowNumbers();
-                savePlaylistOrder();
-            });
+        // Row actions use delegation because rows are re-rendered while scrolling
+        playlistSongsBody.addEventListener('click', function(e) {
+            const btn = e.target.closest('button');
+            const row = e.target.closest('.playlist-song-row');
+            if (!btn || !row) return;
+            e.stopPropagation();
+            
+            const index = parseInt(row.dataset.index, 10);
+            if (btn.classList.contains('remove-song-btn')) {
+                removeSong(index);
+            } else if (btn.classList.contains('move-up-btn')) {
+                moveSong(index, -1);
+            } else if (btn.classList.contains('move-down-btn')) {
+                moveSong(index, 1);
+            }
         });
         
-        // Reorder songs - move down
-        const moveDownBtns = document.querySelectorAll('.move-down-btn');
-        moveDownBtns.forEach(btn => {
-            btn.addEventListener('click', function(e) {
-                e.stopPropagation();
-                const row = this.closest('tr');
-                const nextRow = row.nextElementSibling;
-                
-                if (!nextRow || !nextRow.classList.contains('playlist-song-row')) {
-                    return; // Can't move down
+        // Remove song from playlist
+        function removeSong(index) {
+            const song = songs[index];
+            if (!confirm(`Remove "${song.track_name || song.track_uri}" from this playlist?`)) {
+                return;
+            }
+            
+            fetch(`/music/playlists/${PLAYLIST_ID}/remove-song?track_uri=${encodeURIComponent(song.track_uri)}`, {
+                method: 'DELETE'
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    alert('Error removing song: ' + data.error);
+                    return;
                 }
                 
-                // Swap rows
-                playlistSongsBody.insertBefore(nextRow, row);
-                updateRowNumbers();
-                savePlaylistOrder();
+                // Remove row from the loaded songs and re-render
+                songs.splice(songs.indexOf(song), 1);
+                loadedUris.delete(song.track_uri);
+                total = Math.max(total - 1, songs.length);
+                renderRows();
+                
+                // Show notification
+                showNotification('Song removed from playlist', 'success');
+            })
+            .catch(error => {
+                console.error('Error removing song:', error);
+                alert('Error removing song. Please try again.');
             });
-        });
+        }
+        
+        // Reorder songs - swap with the previous (-1) or next (1) song
+        function moveSong(index, direction) {
+            const other = index + direction;
+            if (other < 0 || other >= songs.length) {
+                return;
+            }
+            
+            const song = songs[index];
+            const neighbour = songs[other];
+            songs[index] = neighbour;
+            songs[other] = song;
+            renderRows();
+            
+            if (direction < 0) {
+                saveSongMove(song.track_uri, { before: neighbour.track_uri });
+            } else {
+                saveSongMove(song.track_uri, { after: neighbour.track_uri });
+            }
+        }
         
-        // Update row numbers
-        function updateRowNumbers() {
-            const rows = playlistSongsBody.querySelectorAll('.playlist-song-row');
-            rows.forEach((row, index) => {
-                const numberCell = row.querySelector('td:first-child');
-                if (numberCell) {
-                    numberCell.textContent = index + 1;
+        // Save a single song move (only the moved song is rewritten server-side)
+        function saveSongMove(trackUri, target) {
+            fetch(`/music/playlists/${PLAYLIST_ID}/move`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify(Object.assign({ track_uri: trackUri }, target))
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    console.error('Error moving song:', data.error);
+                    // Fall back to saving the full order when every song is loaded,
+                    // otherwise show the order as the server has it
+                    if (started && !nextCursor) {
+                        savePlaylistOrder();
+                    } else {
+                        reloadSongs();
+                    }
                 }
+            })
+            .catch(error => {
+                console.error('Error moving song:', error);
             });
         }
         
         // Save playlist order
         function savePlaylistOrder() {
-            const rows = playlistSongsBody.querySelectorAll('.playlist-song-row');
-            const trackUris = Array.from(rows).map(row => row.dataset.trackUri);
+            const trackUris = songs.map(song => song.track_uri);
             
             fetch(`/music/playlists/${PLAYLIST_ID}/reorder`, {
                 method: 'POST',
@@ -257,6 +402,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 console.error('Error saving playlist order:', error);
             });
         }
+        
+        renderRows();
     }
     
     // ========== SPOTIFY INTEGRATION ==========
@@ -338,6 +485,36 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Poll a background Spotify export/import job until it finishes
+    function pollSpotifyJob(jobId, onProgress, onComplete, onFailed) {
+        const pollInterval = setInterval(function() {
+            fetch(`/music/spotify/jobs/status?job_id=${jobId}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.error) {
+                        clearInterval(pollInterval);
+                        onFailed(data.error);
+                        return;
+                    }
+                    
+                    if (data.status === 'completed') {
+                        clearInterval(pollInterval);
+                        onComplete(data);
+                    } else if (data.status === 'failed') {
+                        clearInterval(pollInterval);
+                        onFailed(data.error_message || 'Unknown error');
+                    } else {
+                        onProgress(data);
+                    }
+                })
+                .catch(error => {
+                    console.error('Error checking Spotify job status:', error);
+                    clearInterval(pollInterval);
+                    onFailed('Lost contact with the server');
+                });
+        }, 1000);
+    }
+    
     // Export playlist to Spotify
     const exportToSpotifyBtn = document.getElementById('export-to-spotify-btn');
     if (exportToSpotifyBtn) {
@@ -365,11 +542,19 @@ document.addEventListener('DOMContentLoaded', function() {
                     return;
                 }
                 
-                showNotification('Playlist exported to Spotify successfully!', 'success');
-                // Reload page to show updated status
-                setTimeout(() => {
-                    window.location.reload();
-                }, 1000);
+                pollSpotifyJob(data.job_id, function(job) {
+                    exportToSpotifyBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Exporting... ${job.progress_percent}%`;
+                }, function() {
+                    showNotification('Playlist exported to Spotify successfully!', 'success');
+                    // Reload page to show updated status
+                    setTimeout(() => {
+                        window.location.reload();
+                    }, 1000);
+                }, function(message) {
+                    alert('Error exporting to Spotify: ' + message);
+                    exportToSpotifyBtn.disabled = false;
+                    exportToSpotifyBtn.innerHTML = '<i class="fab fa-spotify"></i> Export to Spotify';
+                });
             })
             .catch(error => {
                 console.error('Error exporting to Spotify:', error);
@@ -407,11 +592,19 @@ document.addEventListener('DOMContentLoaded', function() {
                     return;
                 }
                 
-                showNotification('Playlist synced to Spotify successfully!', 'success');
-                // Reload page to show updated status
-                setTimeout(() => {
-                    window.location.reload();
-                }, 1000);
+                pollSpotifyJob(data.job_id, function(job) {
+                    resyncToSpotifyBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Syncing... ${job.progress_percent}%`;
+                }, function() {
+                    showNotification('Playlist synced to Spotify successfully!', 'success');
+                    // Reload page to show updated status
+                    setTimeout(() => {
+                        window.location.reload();
+                    }, 1000);
+                }, function(message) {
+                    alert('Error syncing to Spotify: ' + message);
+                    resyncToSpotifyBtn.disabled = false;
+                    resyncToSpotifyBtn.innerHTML = '<i class="fas fa-sync"></i> Re-sync';
+                });
             })
             .catch(error => {
                 console.error('Error syncing to Spotify:', error);
@@ -516,12 +709,20 @@ document.addEventListener('DOMContentLoaded', function() {
                                 return;
                             }
                             
-                            showNotification(`Imported "${playlistName}" (${data.added_count} tracks added, ${data.skipped_count} skipped)`, 'success');
-                            // Close modal and reload page
-                            bootstrap.Modal.getInstance(importSpotifyModal).hide();
-                            setTimeout(() => {
-                                window.location.reload();
-                            }, 1000);
+                            pollSpotifyJob(data.job_id, job => {
+                                this.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ${job.processed_tracks}/${job.total_tracks || '?'}`;
+                            }, job => {
+                                showNotification(`Imported "${playlistName}" (${job.added_count} tracks added, ${job.skipped_count} skipped)`, 'success');
+                                // Close modal and reload page
+                                bootstrap.Modal.getInstance(importSpotifyModal).hide();
+                                setTimeout(() => {
+                                    window.location.reload();
+                                }, 1000);
+                            }, message => {
+                                alert('Error importing playlist: ' + message);
+                                this.disabled = false;
+                                this.innerHTML = 'Import';
+                            });
                         })
                         .catch(error => {
                             console.error('Error importing playlist:', error);
@@ -0,0 +1,336 @@
+"""
+Local stand-in for the parts of the Spotify Web API the app uses.
+
+FakeSpotify is a plain WSGI app with in-memory playlists, audio features and
+access tokens. It can be served from a background thread for tests, or run on
+its own for benchmarking the app offline:
+
+    python tests/fake_spotify.py --port 8001 --tracks 10000 --latency 0.05
+
+then start the app with SPOTIFY_API_URL=http://127.0.0.1:8001/v1/ and
+SPOTIFY_TOKEN_URL=http://127.0.0.1:8001/api/token.
+
+Knobs:
+    latency        Seconds each request takes
+    max_page_size  Largest page returned by list endpoints (Spotify: 100 for playlist items)
+    rate_limit     Requests allowed per rate_window seconds before answering 429
+    retry_after    Retry-After value sent with 429 responses
+    fail_next()    Answer the next N matching requests with an error status
+"""
+
+import argparse
+import itertools
+import json
+import re
+import socketserver
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+STATUS_TEXT = {
+    200: 'OK', 201: 'Created', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found',
+    429: 'Too Many Requests', 500: 'Internal Server Error', 502: 'Bad Gateway', 503: 'Service Unavailable',
+}
+
+# Spotify rejects playlist writes and audio-feature lookups with more than 100 items
+MAX_ITEMS_PER_REQUEST = 100
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class FakeSpotify:
+    """In-memory Spotify Web API (WSGI app)"""
+
+    def __init__(self, latency=0.0, max_page_size=100, rate_limit=None, rate_window=1.0,
+                 retry_after=1, user_id='fakeuser', check_tokens=True):
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.retry_after = retry_after
+        self.user_id = user_id
+        self.check_tokens = check_tokens
+
+        self.playlists = {}
+        self.unavailable_features = set()  # Track URIs with no audio features
+        self.tokens = {}  # access_token -> expires_at
+        self.requests = []  # (method, path, status) of every request
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self._ids = itertools.count(1)
+        self._failures = deque()
+        self._window = deque()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.base_url = None
+
+    # ----- setup helpers -----
+
+    def add_playlist(self, track_uris, name='Fake Playlist', playlist_id=None):
+        """Create a playlist owned by the fake user and return its ID"""
+        playlist_id = playlist_id or f'fakeplaylist{next(self._ids)}'
+        self.playlists[playlist_id] = {
+            'id': playlist_id,
+            'name': name,
+            'description': '',
+            'public': False,
+            'tracks': list(track_uris),
+            'version': 0,
+        }
+        return playlist_id
+
+    def issue_token(self, access_token=None, expires_in=3600):
+        """Register an access token the API will accept"""
+        access_token = access_token or f'fake-token-{next(self._ids)}'
+        with self._lock:
+            self.tokens[access_token] = time.time() + expires_in
+        return {'access_token': access_token, 'token_type': 'Bearer', 'expires_in': expires_in,
+                'expires_at': int(time.time()) + expires_in}
+
+    def fail_next(self, count, status=503, path=None):
+        """Answer the next `count` requests (whose path contains `path`, if given) with `status`"""
+        with self._lock:
+            for _ in range(count):
+                self._failures.append((status, path))
+
+    def count(self, method, pattern, status=None):
+        """Number of requests so far with this method, a path matching the regex and (optionally) status"""
+        return sum(
+            1 for m, p, s in self.requests
+            if m == method and re.search(pattern, p) and (status is None or s == status)
+        )
+
+    # ----- serving -----
+
+    def start(self, port=0):
+        """Serve from a background thread; returns the base URL"""
+        self._server = make_server('127.0.0.1', port, self, server_class=_ThreadingWSGIServer,
+                                   handler_class=_QuietHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.base_url = f'http://127.0.0.1:{self._server.server_address[1]}'
+        return self.base_url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def api_url(self):
+        return f'{self.base_url}/v1/'
+
+    @property
+    def token_url(self):
+        return f'{self.base_url}/api/token'
+
+    # ----- WSGI -----
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '')
+        query = {key: values[-1] for key, values in parse_qs(environ.get('QUERY_STRING', '')).items()}
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else b''
+
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            status, payload, headers = self._handle(method, path, query, body, environ)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        with self._lock:
+            self.requests.append((method, path, status))
+
+        data = json.dumps(payload).encode() if payload is not None else b''
+        headers = [('Content-Type', 'application/json'), ('Content-Length', str(len(data)))] + headers
+        start_response(f'{status} {STATUS_TEXT.get(status, "")}', headers)
+        return [data]
+
+    def _error(self, status, message, headers=None):
+        return status, {'error': {'status': status, 'message': message}}, headers or []
+
+    def _handle(self, method, path, query, body, environ):
+        with self._lock:
+            for index, (status, match) in enumerate(self._failures):
+                if match is None or match in path:
+                    del self._failures[index]
+                    return self._error(status, 'Injected failure')
+
+            if self.rate_limit is not None:
+                now = time.monotonic()
+                while self._window and self._window[0] <= now - self.rate_window:
+                    self._window.popleft()
+                if len(self._window) >= self.rate_limit:
+                    return self._error(429, 'API rate limit exceeded', [('Retry-After', str(self.retry_after))])
+                self._window.append(now)
+
+        if method == 'POST' and path == '/api/token':
+            return self._token(body)
+
+        if not path.startswith('/v1/'):
+            return self._error(404, 'Not found')
+
+        if self.check_tokens:
+            auth = environ.get('HTTP_AUTHORIZATION', '')
+            token = auth[len('Bearer '):] if auth.startswith('Bearer ') else None
+            with self._lock:
+                expires_at = self.tokens.get(token)
+            if expires_at is None:
+                return self._error(401, 'Invalid access token')
+            if expires_at < time.time():
+                return self._error(401, 'The access token expired')
+
+        parts = [part for part in path[len('/v1/'):].split('/') if part]
+        payload = json.loads(body) if body else None
+
+        if parts == ['me'] and method == 'GET':
+            return 200, {'id': self.user_id, 'display_name': 'Fake User'}, []
+        if parts == ['me', 'playlists'] and method == 'GET':
+            return 200, self._page(list(self.playlists.values()), query, self._playlist_summary, path), []
+        if len(parts) == 3 and parts[0] == 'users' and parts[2] == 'playlists' and method == 'POST':
+            playlist_id = self.add_playlist([], name=payload.get('name', ''))
+            self.playlists[playlist_id].update(description=payload.get('description', ''),
+                                               public=payload.get('public', False))
+            return 201, self._playlist_summary(self.playlists[playlist_id]), []
+        if parts and parts[0] == 'audio-features' and method == 'GET':
+            return self._audio_features(query)
+        if len(parts) >= 2 and parts[0] == 'playlists':
+            playlist = self.playlists.get(parts[1])
+            if playlist is None:
+                return self._error(404, 'Not found')
+            if len(parts) == 2 and method == 'GET':
+                return 200, self._playlist_summary(playlist), []
+            if len(parts) == 3 and parts[2] in ('items', 'tracks'):
+                return self._playlist_items(playlist, method, query, payload, path)
+
+        return self._error(404, 'Not found')
+
+    def _token(self, body):
+        form = {key: values[-1] for key, values in parse_qs(body.decode()).items()}
+        if form.get('grant_type') != 'refresh_token' or not form.get('refresh_token'):
+            return 400, {'error': 'invalid_grant', 'error_description': 'Invalid refresh token'}, []
+        token_info = self.issue_token()
+        token_info.pop('expires_at')
+        return 200, dict(token_info, scope='playlist-modify-private'), []
+
+    def _page(self, items, query, render, path):
+        limit = min(int(query.get('limit', 20)), self.max_page_size)
+        offset = int(query.get('offset', 0))
+        page = items[offset:offset + limit]
+        has_next = offset + limit < len(items)
+        return {
+            'href': f'{self.base_url}{path}',
+            'items': [render(item) for item in page],
+            'limit': limit,
+            'offset': offset,
+            'total': len(items),
+            'next': f'{self.base_url}{path}?offset={offset + limit}&limit={limit}' if has_next else None,
+            'previous': None,
+        }
+
+    def _snapshot(self, playlist):
+        return f"{playlist['id']}-snapshot-{playlist['version']}"
+
+    def _playlist_summary(self, playlist):
+        return {
+            'id': playlist['id'],
+            'name': playlist['name'],
+            'description': playlist['description'],
+            'public': playlist['public'],
+            'uri': f"spotify:playlist:{playlist['id']}",
+            'external_urls': {'spotify': f"https://open.spotify.com/playlist/{playlist['id']}"},
+            'snapshot_id': self._snapshot(playlist),
+            'owner': {'id': self.user_id},
+            'tracks': {'total': len(playlist['tracks'])},
+        }
+
+    def _track_item(self, uri):
+        return {'track': {'uri': uri, 'id': uri.rsplit(':', 1)[-1], 'type': 'track', 'name': uri}}
+
+    def _playlist_items(self, playlist, method, query, payload, path):
+        if method == 'GET':
+            return 200, self._page(playlist['tracks'], query, self._track_item, path), []
+
+        if method == 'POST':
+            uris = payload.get('uris', []) if isinstance(payload, dict) else (payload or [])
+            if len(uris) > MAX_ITEMS_PER_REQUEST:
+                return self._error(400, 'Too many ids requested')
+            position = query.get('position')
+            position = len(playlist['tracks']) if position is None else int(position)
+            playlist['tracks'][position:position] = uris
+        elif method == 'DELETE':
+            items = payload.get('items') or payload.get('tracks') or []
+            if len(items) > MAX_ITEMS_PER_REQUEST:
+                return self._error(400, 'Too many ids requested')
+            removed = {item['uri'] for item in items}
+            playlist['tracks'] = [uri for uri in playlist['tracks'] if uri not in removed]
+        elif method == 'PUT':
+            playlist['tracks'] = list(payload.get('uris', []))
+        else:
+            return self._error(404, 'Not found')
+
+        playlist['version'] += 1
+        return (201 if method == 'POST' else 200), {'snapshot_id': self._snapshot(playlist)}, []
+
+    def _audio_features(self, query):
+        ids = [track_id for track_id in query.get('ids', '').split(',') if track_id]
+        if len(ids) > MAX_ITEMS_PER_REQUEST:
+            return self._error(400, 'Too many ids requested')
+        features = []
+        for track_id in ids:
+            uri = f'spotify:track:{track_id}'
+            if uri in self.unavailable_features:
+                features.append(None)
+                continue
+            # Deterministic values derived from the ID so tests can check what was stored
+            seed = sum(ord(char) for char in track_id)
+            features.append({
+                'id': track_id, 'uri': uri, 'type': 'audio_features',
+                'danceability': (seed % 100) / 100, 'energy': ((seed * 7) % 100) / 100,
+                'key': seed % 12, 'loudness': -float(seed % 30), 'mode': seed % 2,
+                'speechiness': 0.05, 'acousticness': 0.2, 'instrumentalness': 0.0, 'liveness': 0.1,
+                'valence': ((seed * 3) % 100) / 100, 'tempo': 60.0 + seed % 120, 'time_signature': 4,
+            })
+        return 200, {'audio_features': features}, []
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for the Spotify Web API')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--tracks', type=int, default=1000, help='Tracks in the seeded playlist')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per request')
+    parser.add_argument('--rate-limit', type=int, default=None, help='Requests per second before 429s')
+    args = parser.parse_args()
+
+    fake = FakeSpotify(latency=args.latency, rate_limit=args.rate_limit, check_tokens=False)
+    playlist_id = fake.add_playlist([f'spotify:track:track{i}' for i in range(args.tracks)], name='Benchmark')
+    fake.start(args.port)
+    print(f'Fake Spotify API on {fake.api_url} (token URL {fake.token_url}), playlist {playlist_id}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,232 @@
+"""
+Generated sample PDFs for PDF extraction tests and benchmarks.
+
+The documents are written directly (no PDF library needed): every page has a
+heading and deterministic pseudo-random words set in Helvetica, so extraction
+output can be compared across runs and extractors. Layouts:
+
+    plain     one column, written top to bottom
+    columns   two columns, written one column after the other
+    table     a grid of short cells, written column by column
+    shuffled  one column, lines written in random order (as some generators do)
+
+Run the extraction benchmarks:
+    python tests/sample_pdfs.py --pages 20 100 300 --workers 4   # serial vs process pool
+    python tests/sample_pdfs.py --backends --pages 50            # backends vs pdfplumber
+"""
+
+import difflib
+import random
+import statistics
+import time
+
+WORDS = (
+    'analysis data model results study method sample effect significant research '
+    'population measure evidence trial outcome variable control growth policy market '
+    'energy climate network protein cell signal response factor rate change system'
+).split()
+
+LINES_PER_PAGE = 40
+LINE_HEIGHT = 16
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def page_lines(page_number, seed=0, lines=LINES_PER_PAGE):
+    """The text lines placed on a page (1-based page number)"""
+    rng = random.Random(f'{seed}-{page_number}')
+    body = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 12))) for _ in range(lines - 1)]
+    return [f'Section {page_number}: {rng.choice(WORDS).title()} {rng.choice(WORDS)}'] + body
+
+
+LAYOUTS = ('plain', 'columns', 'table', 'shuffled')
+
+
+def page_placements(page_number, seed=0, lines=LINES_PER_PAGE, layout='plain'):
+    """
+    Text pieces on a page for a layout.
+
+    Returns:
+        Tuple of (list of (x, y, text) in content stream order, text in reading order)
+    """
+    rng = random.Random(f'{layout}-{seed}-{page_number}')
+    heading = page_lines(page_number, seed, lines)[0]
+    top = 750
+
+    if layout == 'columns':
+        columns = [
+            [' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 5))) for _ in range(lines - 1)]
+            for _ in range(2)
+        ]
+        placements = [(72, top, heading)]
+        for x, column in zip((72, 320), columns):
+            placements += [(x, top - LINE_HEIGHT * (row + 1), text) for row, text in enumerate(column)]
+        return placements, '\n'.join([heading] + columns[0] + columns[1])
+
+    if layout == 'table':
+        rows = [[rng.choice(WORDS) for _ in range(4)] for _ in range(lines - 1)]
+        placements = [(72, top, heading)]
+        for col in range(4):
+            placements += [(72 + 120 * col, top - LINE_HEIGHT * (row + 1), cells[col]) for row, cells in enumerate(rows)]
+        return placements, '\n'.join([heading] + [' '.join(cells) for cells in rows])
+
+    text_lines = page_lines(page_number, seed, lines)
+    placements = [(72, top - LINE_HEIGHT * row, text) for row, text in enumerate(text_lines)]
+    if layout == 'shuffled':
+        rng.shuffle(placements)
+    return placements, '\n'.join(text_lines)
+
+
+def make_sample_pdf(pages=10, seed=0, lines=LINES_PER_PAGE, blank_pages=(), layout='plain'):
+    """
+    Build a text PDF.
+
+    Args:
+        pages: Number of pages
+        seed: Seed for the page text
+        lines: Lines of text per page
+        blank_pages: 1-based page numbers to leave without text
+        layout: One of LAYOUTS
+
+    Returns:
+        PDF bytes
+    """
+    objects = []  # Bodies of objects 1..n
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    font = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    kids = []
+    for number in range(1, pages + 1):
+        if number in blank_pages:
+            stream = b''
+        elif layout == 'plain':
+            ops = [f'BT /F1 11 Tf {LINE_HEIGHT} TL 72 750 Td']
+            ops += [f'({_escape(line)}) Tj T*' for line in page_lines(number, seed, lines)]
+            ops.append('ET')
+            stream = '\n'.join(ops).encode('latin-1')
+        else:
+            placements, _ = page_placements(number, seed, lines, layout)
+            ops = ['BT /F1 11 Tf']
+            ops += [f'1 0 0 1 {x} {y} Tm ({_escape(text)}) Tj' for x, y, text in placements]
+            ops.append('ET')
+            stream = '\n'.join(ops).encode('latin-1')
+        content = add(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        kids.append(add(
+            f'<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 612 792] '
+            f'/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>'.encode()
+        ))
+
+    objects[catalog - 1] = f'<< /Type /Catalog /Pages {page_tree} 0 R >>'.encode()
+    objects[page_tree - 1] = (
+        f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>".encode()
+    )
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def run_benchmark(page_counts, workers):
+    """Time serial and process-pool extraction on generated documents"""
+    from flask_app.utils.pdf_extraction import extract_pdf_pages, shutdown_pdf_pool
+
+    # Start the pool before timing; worker start-up is paid once per process
+    extract_pdf_pages(make_sample_pdf(workers * 2), workers=workers, pages_per_task=1, min_parallel_pages=1)
+
+    print(f"{'pages':>6} {'serial s':>9} {'parallel s':>11} {'speedup':>8} {'same text':>10}")
+    for pages in page_counts:
+        pdf_data = make_sample_pdf(pages, seed=pages)
+        timings = []
+        results = []
+        for worker_count in (1, workers):
+            started = time.perf_counter()
+            results.append(extract_pdf_pages(pdf_data, workers=worker_count, min_parallel_pages=1))
+            timings.append(time.perf_counter() - started)
+        same = results[0]['pages'] == results[1]['pages']
+        print(f'{pages:>6} {timings[0]:>9.2f} {timings[1]:>11.2f} {timings[0] / timings[1]:>7.2f}x {str(same):>10}')
+
+    shutdown_pdf_pool()
+
+
+def text_similarity(text, reference):
+    """Word-level similarity of two texts, 0.0-1.0 (order matters)"""
+    if not text and not reference:
+        return 1.0
+    return difflib.SequenceMatcher(None, (text or '').split(), (reference or '').split(), autojunk=False).ratio()
+
+
+def run_backend_benchmark(pages, layouts=LAYOUTS):
+    """
+    Compare extraction backends on generated documents of each layout.
+
+    Reports pages/sec and the mean per-page text similarity against
+    pdfplumber and against the text that was written to the page.
+    """
+    from flask_app.utils.pdf_extraction import BACKENDS, extract_pdf_pages
+
+    rows = []
+    for layout in layouts:
+        pdf_data = make_sample_pdf(pages, layout=layout)
+        truth = [page_placements(number, layout=layout)[1] for number in range(1, pages + 1)]
+        results = {}
+        for backend in list(BACKENDS) + ['auto']:
+            started = time.perf_counter()
+            results[backend] = extract_pdf_pages(pdf_data, backend=backend)
+            results[backend]['rate'] = pages / (time.perf_counter() - started)
+
+        for backend, result in results.items():
+            rows.append({
+                'layout': layout,
+                'backend': backend if backend != 'auto' else f"auto ({result['backend']})",
+                'pages_per_sec': result['rate'],
+                'vs_pdfplumber': statistics.mean(
+                    text_similarity(text, reference)
+                    for text, reference in zip(result['pages'], results['pdfplumber']['pages'])
+                ),
+                'vs_source': statistics.mean(
+                    text_similarity(text, reference) for text, reference in zip(result['pages'], truth)
+                ),
+            })
+    return rows
+
+
+def print_backend_benchmark(rows):
+    print(f"{'layout':<10} {'backend':<20} {'pages/s':>9} {'vs pdfplumber':>14} {'vs source':>10}")
+    for row in rows:
+        print(f"{row['layout']:<10} {row['backend']:<20} {row['pages_per_sec']:>9.1f} "
+              f"{row['vs_pdfplumber']:>14.3f} {row['vs_source']:>10.3f}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    parser = argparse.ArgumentParser(description='Benchmark PDF text extraction on generated documents')
+    parser.add_argument('--pages', type=int, nargs='+', default=[20, 100, 300])
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--backends', action='store_true', help='Compare extraction backends instead of serial vs parallel')
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=list(LAYOUTS))
+    args = parser.parse_args()
+    if args.backends:
+        for pages in args.pages:
+            print_backend_benchmark(run_backend_benchmark(pages, args.layouts))
+    else:
+        run_benchmark(args.pages, args.workers)
@@ -0,0 +1,156 @@
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from fake_spotify import FakeSpotify
+from flask_app.models import Song, Playlist, SpotifyAuth, SpotifySyncJob, db
+from flask_app.utils.spotify_client import spotify_client_manager
+from flask_app.utils.spotify_jobs import run_spotify_sync_job
+from flask_app.utils.spotify_service import SpotifyService
+
+
+@pytest.fixture
+def fake_spotify(app):
+    """Point the shared Spotify client at a local stand-in API"""
+    fake = FakeSpotify()
+    fake.start()
+    overrides = {
+        'SPOTIFY_API_URL': fake.api_url,
+        'SPOTIFY_TOKEN_URL': fake.token_url,
+        'SPOTIFY_RATE_LIMIT': 1000,
+        'SPOTIFY_RATE_BURST': 100,
+        'SPOTIPY_CLIENT_ID': 'fake-client',
+        'SPOTIPY_CLIENT_SECRET': 'fake-secret',
+    }
+    saved = {key: app.config.get(key) for key in overrides}
+    app.config.update(overrides)
+    spotify_client_manager.reset()
+    spotify_client_manager.init_app(app)
+    yield fake
+    app.config.update(saved)
+    spotify_client_manager.reset()
+    spotify_client_manager.init_app(app)
+    fake.stop()
+
+
+@pytest.fixture
+def connected(fake_spotify, test_user):
+    """Store a Spotify connection whose token the fake API accepts"""
+    db.session.add(test_user)
+    db.session.commit()
+    token = fake_spotify.issue_token()
+    auth, _ = SpotifyAuth.create_or_update(test_user.id, token['access_token'], 'fake-refresh', expires_in=3600)
+    return test_user
+
+
+@pytest.fixture
+def library(app):
+    """Create 250 local songs"""
+    songs = [Song(track_uri=f'spotify:track:{i}', track_name=f'Song {i}', artist_names='Artist') for i in range(250)]
+    db.session.add_all(songs)
+    db.session.commit()
+    return [song.track_uri for song in songs]
+
+
+def run_job(app, job):
+    run_spotify_sync_job(job.id, app)
+    db.session.expire_all()
+    return db.session.get(SpotifySyncJob, job.id)
+
+
+class TestAgainstFakeSpotify:
+    """Test SpotifyService over HTTP against the local stand-in API"""
+
+    def test_import_pages_concurrently(self, fake_spotify, connected, library):
+        """Test that an import reads every page, in parallel, whatever the page size"""
+        fake_spotify.latency = 0.01
+        fake_spotify.max_page_size = 50
+        remote_id = fake_spotify.add_playlist([f'spotify:track:{i}' for i in range(1049, -1, -1)])
+
+        result, error = SpotifyService().sync_spotify_to_local(remote_id, connected.id)
+
+        assert error is None
+        assert (result['added_count'], result['skipped_count']) == (250, 800)
+        assert result['playlist'].get_track_uris() == library[::-1]
+        assert fake_spotify.count('GET', r'/playlists/\w+/items$') == 21
+        assert fake_spotify.max_in_flight > 1
+
+    def test_export_survives_rate_limit(self, app, fake_spotify, connected, library):
+        """Test that 429s during an export are waited out and the re-sync is incremental"""
+        fake_spotify.rate_limit = 3
+        fake_spotify.rate_window = 0.5
+        fake_spotify.retry_after = 0.5
+        playlist, _ = Playlist.create_for_user(connected.id, 'Export me')
+        playlist.add_songs(library)
+
+        job, _ = SpotifySyncJob.create(connected.id, 'export', playlist_id=playlist.id)
+        job = run_job(app, job)
+
+        assert job.status == 'completed'
+        remote = fake_spotify.playlists[job.spotify_playlist_id]
+        assert remote['tracks'] == library
+        assert fake_spotify.count('POST', r'/items$', status=201) == 3
+        scheduler = spotify_client_manager.get_metrics()['scheduler']
+        assert sum(stats['rate_limited'] for stats in scheduler['endpoints'].values()) >= 1
+
+        playlist = db.session.get(Playlist, playlist.id)
+        playlist.move_song(library[200], before=library[0])
+        job, _ = SpotifySyncJob.create(connected.id, 'export', playlist_id=playlist.id)
+        job = run_job(app, job)
+
+        assert job.status == 'completed'
+        assert remote['tracks'] == [library[200]] + library[:200] + library[201:]
+        assert fake_spotify.count('GET', r'/items$') == 0  # Snapshot matched, no re-read
+
+    def test_expired_token_is_refreshed_over_http(self, fake_spotify, connected, tmp_path, monkeypatch):
+        """Test that an expired token is exchanged at the token endpoint and then used, without a token file"""
+        monkeypatch.chdir(tmp_path)
+        auth = SpotifyAuth.get_current()
+        auth.token_expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+        db.session.commit()
+
+        client = SpotifyService().get_client()
+
+        assert client.current_user()['id'] == fake_spotify.user_id
+        assert fake_spotify.count('POST', '/api/token') == 1
+        assert SpotifyAuth.get_current().access_token in fake_spotify.tokens
+        assert list(tmp_path.iterdir()) == []
+
+    def test_enrichment_retries_server_errors(self, app, fake_spotify, connected, library):
+        """Test that enrichment rides out injected failures and stores the fake's features"""
+        fake_spotify.unavailable_features = {library[7]}
+        fake_spotify.fail_next(2, status=503, path='audio-features')
+
+        job, _ = SpotifySyncJob.create(connected.id, 'enrich')
+        job = run_job(app, job)
+
+        assert job.status == 'completed'
+        assert (job.added_count, job.skipped_count) == (249, 1)
+        assert fake_spotify.count('GET', 'audio-features') == 5
+        assert db.session.get(Song, 'spotify:track:12').tempo == 60.0 + (ord('1') + ord('2')) % 120
+        assert Song.count_missing_audio_features() == 1
+
+    def test_oversized_writes_are_rejected(self, fake_spotify, connected):
+        """Test that the stand-in enforces Spotify's 100 item limit"""
+        remote_id = fake_spotify.add_playlist([])
+        client = SpotifyService().get_client()
+
+        with pytest.raises(Exception) as exc:
+            client.playlist_add_items(remote_id, [f'spotify:track:{i}' for i in range(101)])
+
+        assert getattr(exc.value, 'http_status', None) == 400
+        assert fake_spotify.playlists[remote_id]['tracks'] == []
+
+    @pytest.mark.slow
+    def test_import_throughput(self, fake_spotify, connected, library):
+        """Benchmark: a 10,000 track import at 20ms per request beats sequential paging"""
+        fake_spotify.latency = 0.02
+        remote_id = fake_spotify.add_playlist([f'spotify:track:{i}' for i in range(10000)])
+
+        started = time.monotonic()
+        result, error = SpotifyService().sync_spotify_to_local(remote_id, connected.id)
+        elapsed = time.monotonic() - started
+
+        assert error is None
+        assert result['added_count'] == 250
+        sequential = 100 * fake_spotify.latency
+        assert elapsed < sequential * 0.75, f'{elapsed:.2f}s vs {sequential:.2f}s sequential'
@@ -0,0 +1,94 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from flask_app.models import LlmResponseCache, SystemMetrics, db
+from flask_app.utils import openai_service
+from flask_app.utils.openai_service import BRIEF_PROMPT_VERSION, generate_research_brief
+
+SOURCE_TEXT = 'Deep learning  improves\nprotein folding.\n\n' + 'Results are reported in detail. ' * 50
+
+
+def completion(title='Protein Folding', prompt_tokens=1000, completion_tokens=200):
+    """An OpenAI chat completion returning a brief as JSON"""
+    choice = MagicMock(finish_reason='stop')
+    choice.message.content = json.dumps({
+        'title': title, 'citation': 'Author (2024)', 'summary': 'Key Findings:\n• It works'
+    })
+    response = MagicMock(choices=[choice])
+    response.usage.prompt_tokens = prompt_tokens
+    response.usage.completion_tokens = completion_tokens
+    return response
+
+
+@pytest.fixture
+def openai_client(app, monkeypatch):
+    """Patch the OpenAI client and enable the cache"""
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setitem(app.config, 'LLM_CACHE_ENABLED', True)
+    with patch.object(openai_service, 'OpenAI') as client_class:
+        client = client_class.return_value
+        client.chat.completions.create.return_value = completion()
+        yield client
+
+
+class TestLlmResponseCache:
+    """Test caching of research brief responses"""
+
+    def test_repeated_text_is_served_from_cache(self, app, openai_client):
+        """Test that the same text, differently spaced, is answered without a second API call"""
+        first, error = generate_research_brief(SOURCE_TEXT, model='gpt-4o')
+        second, _ = generate_research_brief('  ' + SOURCE_TEXT.replace('  ', ' ').replace('\n', ' '), model='gpt-4o')
+
+        assert error is None
+        assert openai_client.chat.completions.create.call_count == 1
+        assert second == first
+        assert second['model_name'] == 'gpt-4o'
+        entry = LlmResponseCache.query.one()
+        assert (entry.prompt_version, entry.hit_count) == (BRIEF_PROMPT_VERSION, 1)
+        assert 'model_name' not in json.loads(entry.response)
+
+        stats = LlmResponseCache.get_stats()
+        assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+        assert stats['tokens_saved'] == 1200
+
+    def test_model_and_prompt_version_are_part_of_the_key(self, app, openai_client, monkeypatch):
+        """Test that another model or prompt version does not reuse a cached brief"""
+        generate_research_brief(SOURCE_TEXT, model='gpt-4o')
+        generate_research_brief(SOURCE_TEXT, model='gpt-4o-mini')
+        monkeypatch.setattr(openai_service, 'BRIEF_PROMPT_VERSION', BRIEF_PROMPT_VERSION + 1)
+        generate_research_brief(SOURCE_TEXT, model='gpt-4o')
+
+        assert openai_client.chat.completions.create.call_count == 3
+        assert LlmResponseCache.query.count() == 3
+
+    def test_cache_can_be_disabled(self, app, openai_client, monkeypatch):
+        """Test that every call reaches the API when LLM_CACHE_ENABLED is off"""
+        monkeypatch.setitem(app.config, 'LLM_CACHE_ENABLED', False)
+
+        generate_research_brief(SOURCE_TEXT, model='gpt-4o')
+        generate_research_brief(SOURCE_TEXT, model='gpt-4o')
+
+        assert openai_client.chat.completions.create.call_count == 2
+        assert LlmResponseCache.query.count() == 0
+
+    def test_least_recently_used_entries_are_evicted(self, app):
+        """Test that eviction keeps the most recently used responses within the size bound"""
+        data = {'title': 't', 'citation': 'c', 'summary': 'x' * 500}
+        for number in range(3):
+            assert LlmResponseCache.store('gpt-4o', 1, f'text {number}', data) == (True, None)
+        LlmResponseCache.lookup('gpt-4o', 1, 'text 0')
+        size = LlmResponseCache.query.first().size
+
+        assert LlmResponseCache.store('gpt-4o', 1, 'text 3', data, max_bytes=size * 2) == (True, None)
+
+        remaining = {entry.text_sha256 for entry in LlmResponseCache.query.all()}
+        assert remaining == {LlmResponseCache.hash_text('text 0'), LlmResponseCache.hash_text('text 3')}
+
+    def test_increment_metric_accumulates(self, app):
+        """Test that counters start at the first increment and add up"""
+        SystemMetrics.increment_metric('llm_cache_hits')
+        SystemMetrics.increment_metric('llm_cache_hits', 4)
+
+        assert SystemMetrics.get_metric('llm_cache_hits') == 5
+        db.session.expire_all()
+        assert SystemMetrics.query.filter_by(metric_name='llm_cache_hits').count() == 1
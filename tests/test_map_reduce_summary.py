@@ -0,0 +1,133 @@
+import json
+import re
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from flask_app.models import LlmResponseCache
+from flask_app.utils import openai_service
+from flask_app.utils.openai_service import chunk_text, generate_research_brief
+
+
+class FakeCompletions:
+    """Stand-in for client.chat.completions, answering notes or brief prompts and tracking how many run at once"""
+
+    def __init__(self, delay=0.05, fail_part=None):
+        self.delay = delay
+        self.fail_part = fail_part
+        self.prompts = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def create(self, **params):
+        prompt = params['messages'][-1]['content']
+        with self.lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            part = re.match(r'The following text is part (\d+) of (\d+)', prompt)
+            if part and int(part.group(1)) == self.fail_part:
+                return self.reply('not json')
+            if part:
+                return self.reply(json.dumps({'notes': f'• Notes on part {part.group(1)}'}))
+            return self.reply(json.dumps({
+                'title': 'Long Report', 'citation': 'Author (2024)', 'summary': 'Key Findings:\n• It works'
+            }))
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    @staticmethod
+    def reply(content):
+        choice = MagicMock(finish_reason='stop')
+        choice.message.content = content
+        response = MagicMock(choices=[choice])
+        response.usage.prompt_tokens = 100
+        response.usage.completion_tokens = 10
+        return response
+
+
+@pytest.fixture
+def completions(app, monkeypatch):
+    """Patch the OpenAI client with FakeCompletions and use small chunks"""
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setitem(app.config, 'LLM_CACHE_ENABLED', True)
+    monkeypatch.setitem(app.config, 'RESEARCH_CHUNK_SIZE', 1000)
+    monkeypatch.setitem(app.config, 'RESEARCH_SUMMARY_WORKERS', 3)
+    monkeypatch.setattr(openai_service, 'MAX_PROMPT_CHARS', 2000)
+    fake = FakeCompletions()
+    with patch.object(openai_service, 'OpenAI') as client_class:
+        client_class.return_value.chat.completions = fake
+        yield fake
+
+
+def long_text(paragraphs):
+    return '\n\n'.join(f'Section {number}. ' + 'Finding repeated for length. ' * 30 for number in range(paragraphs))
+
+
+class TestMapReduceSummary:
+    """Test summarizing documents too long for one request"""
+
+    def test_short_text_uses_one_request(self, app, completions):
+        """Test that text within MAX_PROMPT_CHARS is summarized directly"""
+        brief, error = generate_research_brief('A short paper. ' * 20, model='gpt-4o')
+
+        assert error is None
+        assert brief['title'] == 'Long Report'
+        assert len(completions.prompts) == 1
+        assert 'Text to analyze:\nA short paper.' in completions.prompts[0]
+
+    def test_long_text_is_mapped_in_parallel_then_reduced(self, app, completions):
+        """Test that every chunk is summarized, a bounded number at once, and the notes reach one reduce request"""
+        text = long_text(9)
+        chunks = chunk_text(text, 1000)
+
+        brief, error = generate_research_brief(text, model='gpt-4o')
+
+        assert error is None
+        assert brief['title'] == 'Long Report'
+        assert brief['summary'] == 'Key Findings:\n• It works'
+        assert len(chunks) == 9
+        assert len(completions.prompts) == 10
+        assert completions.max_active == 3
+        reduce_prompt = completions.prompts[-1]
+        assert 'Notes to analyze:' in reduce_prompt
+        assert [int(part) for part in re.findall(r'• Notes on part (\d+)', reduce_prompt)] == list(range(1, 10))
+        assert 'Section 8.' in ''.join(completions.prompts[:-1])  # The end of the document is read, not truncated
+        entry = LlmResponseCache.query.one()
+        assert (entry.prompt_tokens, entry.completion_tokens) == (1000, 100)
+
+    def test_failed_chunk_fails_the_brief(self, app, completions):
+        """Test that an unusable chunk response is reported instead of a brief from partial notes"""
+        completions.fail_part = 2
+
+        brief, error = generate_research_brief(long_text(6), model='gpt-4o')
+
+        assert brief is None
+        assert error.startswith('Error summarizing part 2 of 6: OpenAI API returned invalid JSON')
+        assert not any('Notes to analyze' in prompt for prompt in completions.prompts)
+        assert LlmResponseCache.query.count() == 0
+
+
+class TestChunkText:
+    """Test splitting text for map-reduce summarization"""
+
+    def test_chunks_cover_text_once_within_limit(self):
+        """Test that no text is repeated or lost and every chunk fits"""
+        text = 'Intro paragraph.\n\n' + '. '.join(f'Sentence {number} of a long paragraph' for number in range(40))
+
+        chunks = chunk_text(text, 200)
+
+        assert all(len(chunk) <= 200 for chunk in chunks)
+        assert sum(chunk.count('Intro paragraph') for chunk in chunks) == 1
+        assert [int(number) for number in re.findall(r'Sentence (\d+)', ' '.join(chunks))] == list(range(40))
+
+    def test_unbroken_text_is_cut_at_the_limit(self):
+        """Test that text with no paragraph or sentence breaks is still split"""
+        chunks = chunk_text('x' * 350, 100)
+
+        assert [len(chunk) for chunk in chunks] == [100, 100, 100, 51]
+        assert chunk_text('short', 100) == ['short']
@@ -0,0 +1,247 @@
+import os
+import time
+import pytest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+import pdfplumber
+from sample_pdfs import LAYOUTS, make_sample_pdf, page_lines, page_placements, run_backend_benchmark
+from flask_app.utils import pdf_extraction
+from flask_app.utils.openai_service import extract_text_from_pdf
+from flask_app.utils.pdf_extraction import (
+    BACKENDS, choose_backend, extract_page_range, extract_pdf_pages, get_backend, shutdown_pdf_pool
+)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def stop_pool():
+    yield
+    shutdown_pdf_pool()
+
+
+class CrashingPool:
+    """Runs tasks inline, failing any multi-page task that includes a bad page like a dead worker would"""
+
+    def __init__(self, bad_pages):
+        self.bad_pages = bad_pages
+        self.submitted = []
+
+    def submit(self, fn, path, start, stop, *args):
+        self.submitted.append((start, stop))
+        future = Future()
+        if any(start <= page < stop for page in self.bad_pages):
+            future.set_exception(BrokenProcessPool('worker died'))
+        else:
+            future.set_result(fn(path, start, stop, *args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class TestPdfExtraction:
+    """Test page-level PDF text extraction"""
+
+    def test_parallel_matches_serial(self):
+        """Test that pages extracted in worker processes come back complete and in order"""
+        pdf_data = make_sample_pdf(6, blank_pages=(4,))
+
+        serial = extract_pdf_pages(pdf_data)
+        parallel = extract_pdf_pages(pdf_data, workers=2, pages_per_task=2, min_parallel_pages=1)
+
+        assert (serial['parallel'], parallel['parallel']) == (False, True)
+        assert parallel['pages'] == serial['pages']
+        assert parallel['pages'][0].splitlines() == page_lines(1)
+        assert parallel['pages'][3] == ''
+        assert parallel['errors'] == []
+
+    def test_short_documents_stay_in_process(self):
+        """Test that documents below the page threshold skip the pool"""
+        with patch.object(pdf_extraction, 'get_pdf_pool') as get_pool:
+            result = extract_pdf_pages(make_sample_pdf(3), workers=4, min_parallel_pages=16)
+
+        assert result['parallel'] is False
+        get_pool.assert_not_called()
+
+    def test_bad_page_falls_back_to_pdfminer(self):
+        """Test that a page pdfplumber fails on is read with pdfminer instead"""
+        original = pdfplumber.page.Page.extract_text
+
+        def flaky(page, *args, **kwargs):
+            if page.page_number == 2:
+                raise ValueError('bad page')
+            return original(page, *args, **kwargs)
+
+        with patch.object(pdfplumber.page.Page, 'extract_text', flaky):
+            results = extract_page_range(make_sample_pdf(3), 0, 3)
+
+        assert [error for _, error in results] == [None, None, None]
+        assert page_lines(2)[0] in results[1][0]
+
+    def test_unreadable_page_is_skipped(self):
+        """Test that a page neither extractor can read is reported and the rest kept"""
+        original = pdfplumber.page.Page.extract_text
+
+        def broken(page, *args, **kwargs):
+            if page.page_number == 2:
+                raise ValueError('bad page')
+            return original(page, *args, **kwargs)
+
+        with patch.object(pdfplumber.page.Page, 'extract_text', broken), \
+             patch.object(pdf_extraction, '_fallback_page_text', side_effect=ValueError('still bad')):
+            result = extract_pdf_pages(make_sample_pdf(3))
+
+        assert result['pages'][1] is None
+        assert result['pages'][2].splitlines() == page_lines(3)
+        assert result['errors'] == ['Page 2: bad page']
+
+    def test_dead_worker_only_loses_its_page(self):
+        """Test that a task whose worker dies is retried page by page"""
+        pool = CrashingPool(bad_pages={5})
+
+        with patch.object(pdf_extraction, 'get_pdf_pool', return_value=pool):
+            result = extract_pdf_pages(make_sample_pdf(8), workers=2, pages_per_task=4, min_parallel_pages=1)
+
+        assert pool.submitted == [(0, 4), (4, 8), (4, 5), (5, 6), (6, 7), (7, 8)]
+        assert [page is None for page in result['pages']] == [False] * 5 + [True] + [False] * 2
+        assert result['errors'] == ['Page 6: worker died']
+
+    def test_time_budget_returns_partial_text(self):
+        """Test that extraction stops at the time budget and keeps what it has"""
+        original = pdfplumber.page.Page.extract_text
+
+        def slow(page, *args, **kwargs):
+            time.sleep(0.1)
+            return original(page, *args, **kwargs)
+
+        with patch.object(pdfplumber.page.Page, 'extract_text', slow):
+            result = extract_pdf_pages(make_sample_pdf(10), time_budget=0.25)
+
+        assert result['timed_out'] is True
+        assert result['pages'][0].splitlines() == page_lines(1)
+        assert result['pages'][-1] is None
+        assert 'Time budget of 0.25s exceeded' in result['errors'][-1]
+
+    def test_extract_text_from_pdf_uses_config(self, app):
+        """Test that extract_text_from_pdf joins pages and honours the configured time budget"""
+        pdf_data = make_sample_pdf(3, blank_pages=(2,))
+
+        text, error = extract_text_from_pdf(pdf_data)
+
+        assert error is None
+        assert text == '\n\n'.join('\n'.join(page_lines(number)) for number in (1, 3))
+
+        budget = app.config.get('PDF_EXTRACT_TIME_BUDGET')
+        app.config['PDF_EXTRACT_TIME_BUDGET'] = 1e-9
+        try:
+            text, error = extract_text_from_pdf(pdf_data)
+        finally:
+            app.config['PDF_EXTRACT_TIME_BUDGET'] = budget
+
+        assert text is None
+        assert 'took too long' in error
+
+    @pytest.mark.slow
+    @pytest.mark.skipif((os.cpu_count() or 1) < 2, reason='needs more than one CPU')
+    def test_parallel_throughput(self):
+        """Benchmark: a 60 page document extracts faster across processes than serially"""
+        pdf_data = make_sample_pdf(60)
+        extract_pdf_pages(make_sample_pdf(4), workers=2, pages_per_task=1, min_parallel_pages=1)  # Warm up the pool
+
+        started = time.monotonic()
+        serial = extract_pdf_pages(pdf_data)
+        serial_seconds = time.monotonic() - started
+
+        started = time.monotonic()
+        parallel = extract_pdf_pages(pdf_data, workers=2, min_parallel_pages=1)
+        parallel_seconds = time.monotonic() - started
+
+        assert parallel['pages'] == serial['pages']
+        assert parallel_seconds < serial_seconds * 0.8, f'{parallel_seconds:.2f}s vs {serial_seconds:.2f}s serial'
+
+
+class TestPdfBackends:
+    """Test the pluggable extraction backends and automatic selection"""
+
+    def test_pdfium_matches_pdfplumber_on_plain_text(self):
+        """Test that the fast backend gives the same text as pdfplumber for ordinary pages"""
+        pdf_data = make_sample_pdf(4, blank_pages=(3,))
+
+        pdfium = extract_pdf_pages(pdf_data, backend='pdfium')
+        plumber = extract_pdf_pages(pdf_data, backend='pdfplumber')
+
+        assert pdfium['pages'] == plumber['pages']
+        assert pdfium['pages'][2] == ''
+        assert pdfium['backend'] == 'pdfium'
+
+    @pytest.mark.parametrize('layout,expected', [
+        ('plain', 'pdfium'),
+        ('columns', 'pdfium'),
+        ('table', 'pdfplumber'),
+        ('shuffled', 'pdfplumber'),
+    ])
+    def test_auto_selection_by_layout(self, layout, expected):
+        """Test that tables and out-of-order content go to pdfplumber, everything else to PDFium"""
+        pdf_data = make_sample_pdf(2, layout=layout)
+
+        result = extract_pdf_pages(pdf_data, backend='auto')
+
+        assert choose_backend(pdf_data) == expected
+        assert result['backend'] == expected
+        assert result['pages'][0] == page_placements(1, layout=layout)[1]
+
+    def test_pdfium_page_failure_falls_back_to_pdfplumber(self):
+        """Test that a page PDFium fails on is read with pdfplumber"""
+        backend = BACKENDS['pdfium']
+        original = type(backend).page_text
+
+        def flaky(self, document, index):
+            if index == 1:
+                raise RuntimeError('pdfium error')
+            return original(self, document, index)
+
+        with patch.object(type(backend), 'page_text', flaky):
+            results = extract_page_range(make_sample_pdf(3), 0, 3, backend='pdfium')
+
+        assert [error for _, error in results] == [None, None, None]
+        assert results[1][0].splitlines() == page_lines(2)
+
+    def test_parallel_extraction_with_pdfium(self):
+        """Test that worker processes use the chosen backend"""
+        pdf_data = make_sample_pdf(6)
+
+        result = extract_pdf_pages(pdf_data, workers=2, pages_per_task=2, min_parallel_pages=1, backend='pdfium')
+
+        assert result['parallel'] is True
+        assert result['pages'] == extract_pdf_pages(pdf_data)['pages']
+
+    def test_configured_backend(self, app):
+        """Test that PDF_EXTRACT_BACKEND selects the backend used for uploads"""
+        pdf_data = make_sample_pdf(2, layout='columns')
+
+        backend = app.config.get('PDF_EXTRACT_BACKEND')
+        app.config['PDF_EXTRACT_BACKEND'] = 'pdfplumber'
+        try:
+            text, _ = extract_text_from_pdf(pdf_data)
+        finally:
+            app.config['PDF_EXTRACT_BACKEND'] = backend
+        auto_text, _ = extract_text_from_pdf(pdf_data)
+
+        columns = page_placements(1, layout='columns')[1].splitlines()
+        assert auto_text.splitlines()[:len(columns)] == columns
+        assert text.splitlines()[:len(columns)] != columns  # pdfplumber reads across both columns
+
+    def test_unknown_backend(self):
+        """Test that a misconfigured backend name is reported clearly"""
+        with pytest.raises(ValueError, match='Unknown PDF extraction backend'):
+            get_backend('pdfbox')
+
+    @pytest.mark.slow
+    def test_backend_benchmark(self):
+        """Benchmark: PDFium is much faster on prose, and auto never loses text quality"""
+        rows = {(row['layout'], row['backend'].split()[0]): row for row in run_backend_benchmark(10)}
+
+        for layout in LAYOUTS:
+            assert rows[(layout, 'auto')]['vs_source'] > 0.99
+        assert rows[('plain', 'pdfium')]['vs_pdfplumber'] > 0.99
+        assert rows[('plain', 'pdfium')]['pages_per_sec'] > 5 * rows[('plain', 'pdfplumber')]['pages_per_sec']
@@ -0,0 +1,198 @@
+import os
+import pytest
+from flask_app.models import PdfBlob, ResearchBrief, User, UserTagCount, db
+from flask_app.utils.pdf_store import blob_path, hash_pdf, write_blob
+from sample_pdfs import make_sample_pdf
+
+
+@pytest.fixture
+def store(app, tmp_path):
+    """Keep stored PDFs in a temp folder"""
+    saved = app.config.get('PDF_STORE_FOLDER')
+    app.config['PDF_STORE_FOLDER'] = str(tmp_path / 'pdf_store')
+    yield tmp_path / 'pdf_store'
+    app.config['PDF_STORE_FOLDER'] = saved
+
+
+def create_brief(user_id, pdf_data=None, title='Paper', legacy=False):
+    """Create a PDF brief the way the import job does (or with the PDF inline, as before the store)"""
+    pdf_sha256 = None
+    if pdf_data is not None and not legacy:
+        pdf_sha256, error = PdfBlob.acquire(pdf_data)
+        assert error is None
+    brief, error = ResearchBrief.safe_create(
+        user_id=user_id, title=title, citation='c', summary='s', source_text='t',
+        pdf_filename=f'{title}.pdf', pdf_sha256=pdf_sha256, pdf_data=pdf_data if legacy else None,
+        source_type='pdf'
+    )
+    assert error is None
+    return brief
+
+
+class TestPdfStore:
+    """Test the content-addressed PDF store and its reference counting"""
+
+    def test_blobs_are_sharded_by_hash(self, app, store):
+        """Test that a PDF is stored once under its SHA-256"""
+        pdf_data = make_sample_pdf(1)
+
+        digest, path = write_blob(pdf_data)
+        write_blob(pdf_data)
+
+        assert digest == hash_pdf(pdf_data)
+        assert path == blob_path(digest) == str(store / digest[:2] / digest[2:4] / f'{digest}.pdf')
+        with open(path, 'rb') as f:
+            assert f.read() == pdf_data
+        assert os.listdir(os.path.dirname(path)) == [f'{digest}.pdf']
+
+    def test_identical_pdfs_share_a_blob_across_users(self, app, test_user, store):
+        """Test that the file is kept until the last brief referencing it is deleted"""
+        db.session.add(test_user)
+        other = User(username='other', email='other@example.com', password_hash='x')
+        db.session.add(other)
+        db.session.commit()
+        pdf_data = make_sample_pdf(2)
+
+        first = create_brief(test_user.id, pdf_data)
+        second = create_brief(other.id, pdf_data)
+        digest = first.pdf_sha256
+        blob = db.session.get(PdfBlob, digest)
+        path = blob.path()
+
+        assert second.pdf_sha256 == first.pdf_sha256
+        assert (blob.ref_count, blob.size) == (2, len(pdf_data))
+
+        assert first.safe_delete() == (True, None)
+        db.session.expire_all()
+        assert db.session.get(PdfBlob, second.pdf_sha256).ref_count == 1
+        assert os.path.exists(path)
+
+        assert second.safe_delete() == (True, None)
+        assert db.session.get(PdfBlob, digest) is None
+        assert not os.path.exists(path)
+
+    def test_deleting_a_user_releases_their_pdfs(self, app, test_user, store):
+        """Test that deleting a user drops their briefs' references and tag counts"""
+        db.session.add(test_user)
+        other = User(username='other', email='other@example.com', password_hash='x')
+        db.session.add(other)
+        db.session.commit()
+        shared = make_sample_pdf(2, seed=5)
+        own = make_sample_pdf(1, seed=6)
+
+        create_brief(test_user.id, shared, title='Shared')
+        create_brief(test_user.id, shared, title='Shared again')
+        create_brief(test_user.id, own, title='Own').add_tag('mine')
+        create_brief(other.id, shared, title='Theirs')
+        user_id = test_user.id
+
+        assert test_user.safe_delete() == (True, None)
+
+        db.session.expire_all()
+        assert db.session.get(PdfBlob, hash_pdf(shared)).ref_count == 1
+        assert os.path.exists(blob_path(hash_pdf(shared)))
+        assert db.session.get(PdfBlob, hash_pdf(own)) is None
+        assert not os.path.exists(blob_path(hash_pdf(own)))
+        assert UserTagCount.query.filter_by(user_id=user_id).count() == 0
+
+    def test_upload_racing_a_purge_keeps_its_file(self, app, test_user, store, monkeypatch):
+        """Test that a PDF uploaded while its unreferenced blob is purged still has a file"""
+        db.session.add(test_user)
+        db.session.commit()
+        pdf_data = make_sample_pdf(2, seed=4)
+        digest, path = write_blob(pdf_data)
+        PdfBlob.upsert({'sha256': digest, 'size': len(pdf_data), 'ref_count': 0}, ['sha256'], {'ref_count': 0})
+        db.session.commit()
+
+        upsert = PdfBlob.upsert.__func__
+
+        def purge_first(cls, *args, **kwargs):
+            assert PdfBlob.purge([digest]) == (1, None)  # Lands between the upload's hash and its upsert
+            assert not os.path.exists(path)
+            return upsert(cls, *args, **kwargs)
+
+        monkeypatch.setattr(PdfBlob, 'upsert', classmethod(purge_first))
+        brief = create_brief(test_user.id, pdf_data)
+
+        assert brief.pdf_sha256 == digest
+        assert db.session.get(PdfBlob, digest).ref_count == 1
+        with open(path, 'rb') as f:
+            assert f.read() == pdf_data
+
+    def test_garbage_collection_repairs_counts(self, app, test_user, store):
+        """Test that collect_garbage fixes drifted counts and removes unreferenced and orphaned files"""
+        db.session.add(test_user)
+        db.session.commit()
+        kept = create_brief(test_user.id, make_sample_pdf(1, seed=1), title='Kept')
+        dropped = create_brief(test_user.id, make_sample_pdf(1, seed=2), title='Dropped')
+        dropped_sha256 = dropped.pdf_sha256
+        db.session.delete(dropped)  # Bypasses safe_delete, as a cascade would
+        db.session.execute(db.update(PdfBlob).where(PdfBlob.sha256 == kept.pdf_sha256).values(ref_count=5))
+        db.session.commit()
+        _, orphan_path = write_blob(make_sample_pdf(1, seed=3))  # File of an upload that was rolled back
+        os.utime(orphan_path, (0, 0))
+
+        removed, error = PdfBlob.collect_garbage()
+
+        assert (removed, error) == (2, None)
+        assert db.session.get(PdfBlob, kept.pdf_sha256).ref_count == 1
+        assert db.session.get(PdfBlob, dropped_sha256) is None
+        assert not os.path.exists(blob_path(dropped_sha256))
+        assert not os.path.exists(orphan_path)
+        assert os.path.exists(blob_path(kept.pdf_sha256))
+
+    def test_download_streams_file_with_range_support(self, app, logged_in_user, store):
+        """Test that downloads are served from the stored file and honour Range requests"""
+        client, user = logged_in_user
+        pdf_data = make_sample_pdf(3)
+        brief = create_brief(user.id, pdf_data)
+
+        response = client.get(f'/research/{brief.id}/download')
+        assert response.status_code == 200
+        assert response.data == pdf_data
+        assert 'Paper.pdf' in response.headers['Content-Disposition']
+        etag = response.headers['ETag']
+        response.close()
+
+        partial = client.get(f'/research/{brief.id}/download', headers={'Range': 'bytes=0-99'})
+        assert partial.status_code == 206
+        assert partial.data == pdf_data[:100]
+        assert partial.headers['Content-Range'] == f'bytes 0-99/{len(pdf_data)}'
+        partial.close()
+
+        cached = client.get(f'/research/{brief.id}/download', headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+
+    def test_legacy_inline_pdf_still_downloads(self, app, logged_in_user, store):
+        """Test that briefs not yet moved to the store are served from pdf_data"""
+        client, user = logged_in_user
+        pdf_data = make_sample_pdf(1)
+        brief = create_brief(user.id, pdf_data, legacy=True)
+
+        response = client.get(f'/research/{brief.id}/download')
+
+        assert response.status_code == 200
+        assert response.data == pdf_data
+
+    def test_migration_moves_inline_pdfs_in_batches(self, app, test_user, store):
+        """Test that the migration moves pdf_data into the store, deduplicating identical PDFs"""
+        from migrations.move_pdfs_to_blob_store import move_pdfs
+        db.session.add(test_user)
+        db.session.commit()
+        pdfs = [make_sample_pdf(1, seed=seed) for seed in (1, 2, 1, 3, 2)]
+        for number, pdf_data in enumerate(pdfs):
+            create_brief(test_user.id, pdf_data, title=f'Paper {number}', legacy=True)
+        ResearchBrief.safe_create(user_id=test_user.id, title='Text', citation='c', summary='s',
+                                  source_text='t', source_type='text')
+
+        assert move_pdfs(batch_size=2) == 5
+        assert move_pdfs(batch_size=2) == 0  # Re-running finds nothing left to move
+
+        db.session.expire_all()
+        briefs = ResearchBrief.query.filter_by(source_type='pdf').order_by(ResearchBrief.id).all()
+        assert [brief.pdf_data for brief in briefs] == [None] * 5
+        assert [brief.pdf_sha256 for brief in briefs] == [hash_pdf(pdf_data) for pdf_data in pdfs]
+        assert sorted(blob.ref_count for blob in PdfBlob.query.all()) == [1, 2, 2]
+        for brief, pdf_data in zip(briefs, pdfs):
+            with open(blob_path(brief.pdf_sha256), 'rb') as f:
+                assert f.read() == pdf_data
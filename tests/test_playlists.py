@@ -0,0 +1,666 @@
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from flask_app.models import User, Song, Playlist, playlist_songs, db
+from flask_app.models.playlist import POSITION_GAP
+from flask_app.utils.playlist_sets import create_playlist_from_set
+
+
+@pytest.fixture
+def owner(app):
+    """Create a persisted playlist owner"""
+    user = User(
+        username='playlistowner',
+        email='owner@example.com',
+        password_hash=generate_password_hash('ownerpass123')
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def songs(app):
+    """Create a small library of songs"""
+    library = []
+    for i in range(5):
+        library.append(Song(
+            track_uri=f'spotify:track:song{i}',
+            track_name=f'Song {i}',
+            artist_names='Artist',
+            duration_ms=60000 * (i + 1)
+        ))
+    db.session.add_all(library)
+    db.session.commit()
+    return library
+
+
+@pytest.fixture
+def playlist(owner):
+    """Create an empty playlist"""
+    playlist, error = Playlist.create_for_user(owner.id, 'Test Playlist')
+    assert error is None
+    return playlist
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def positions(playlist):
+    """Return {track_uri: position} for a playlist"""
+    rows = db.session.query(playlist_songs.c.track_uri, playlist_songs.c.position)\
+        .filter(playlist_songs.c.playlist_id == playlist.id)\
+        .all()
+    return {track_uri: position for track_uri, position in rows}
+
+
+class TestPlaylistBulkAdd:
+    """Test Playlist.add_songs bulk insertion"""
+
+    def test_add_songs_appends_in_order(self, playlist, songs):
+        """Test that all songs are added with contiguous positions"""
+        uris = [s.track_uri for s in songs]
+        added, errors = playlist.add_songs(uris)
+
+        assert added == uris
+        assert errors == []
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == uris
+
+    def test_add_songs_after_existing(self, playlist, songs):
+        """Test that bulk-added songs go after songs already in the playlist"""
+        playlist.add_song(songs[0].track_uri)
+        added, errors = playlist.add_songs([songs[1].track_uri, songs[2].track_uri])
+
+        assert errors == []
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == [
+            songs[0].track_uri, songs[1].track_uri, songs[2].track_uri
+        ]
+        assert len(set(positions(playlist).values())) == 3
+
+    def test_add_songs_reports_per_track_errors(self, playlist, songs):
+        """Test that missing, existing and repeated songs are reported individually"""
+        playlist.add_song(songs[0].track_uri)
+        added, errors = playlist.add_songs([
+            songs[0].track_uri,
+            'spotify:track:missing',
+            songs[1].track_uri,
+            songs[1].track_uri,
+        ])
+
+        assert added == [songs[1].track_uri]
+        assert errors == [
+            {'track_uri': songs[0].track_uri, 'error': 'Song already in playlist'},
+            {'track_uri': 'spotify:track:missing', 'error': 'Song not found'},
+            {'track_uri': songs[1].track_uri, 'error': 'Song already in playlist'},
+        ]
+
+    def test_add_songs_empty_list(self, playlist):
+        """Test that an empty list is a no-op"""
+        assert playlist.add_songs([]) == ([], [])
+
+
+class TestPlaylistAddSongsRoute:
+    """Test the bulk add-songs endpoint"""
+
+    def test_add_songs_route(self, logged_in_user, songs):
+        """Test that the endpoint reports added songs and per-track errors"""
+        client, user = logged_in_user
+        playlist, _ = Playlist.create_for_user(user.id, 'Route Playlist')
+
+        response = client.post(f'/music/playlists/{playlist.id}/add-songs', json={
+            'track_uris': [songs[0].track_uri, 'spotify:track:missing']
+        })
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['added'] == [songs[0].track_uri]
+        assert data['added_count'] == 1
+        assert data['error_count'] == 1
+        assert data['errors'][0]['error'] == 'Song not found'
+
+
+class TestPlaylistOrdering:
+    """Test sparse positions, single-song moves and full reorders"""
+
+    def test_move_song_before_touches_one_row(self, playlist, songs):
+        """Test moving a song before another rewrites only the moved row"""
+        uris = [s.track_uri for s in songs]
+        playlist.add_songs(uris)
+        before = positions(playlist)
+
+        success, error = playlist.move_song(uris[4], before=uris[1])
+
+        assert success and error is None
+        after = positions(playlist)
+        assert [uri for uri in uris if after[uri] != before[uri]] == [uris[4]]
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == [
+            uris[0], uris[4], uris[1], uris[2], uris[3]
+        ]
+
+    def test_move_song_after_last(self, playlist, songs):
+        """Test moving a song after the last song"""
+        uris = [s.track_uri for s in songs]
+        playlist.add_songs(uris)
+
+        success, _ = playlist.move_song(uris[0], after=uris[4])
+
+        assert success
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == uris[1:] + [uris[0]]
+
+    def test_move_song_rebalances_when_gap_exhausted(self, playlist, songs):
+        """Test that repeated moves into the same slot rebalance positions"""
+        uris = [s.track_uri for s in songs[:3]]
+        for position, uri in enumerate(uris):
+            playlist.add_song(uri, position=position)
+
+        success, _ = playlist.move_song(uris[2], before=uris[1])
+
+        assert success
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == [uris[0], uris[2], uris[1]]
+
+    def test_move_song_validation(self, playlist, songs):
+        """Test move_song argument and membership validation"""
+        playlist.add_songs([songs[0].track_uri, songs[1].track_uri])
+
+        assert playlist.move_song(songs[0].track_uri)[0] is False
+        assert playlist.move_song(songs[0].track_uri, before=songs[1].track_uri,
+                                  after=songs[1].track_uri)[0] is False
+        assert playlist.move_song(songs[3].track_uri, before=songs[1].track_uri) == (False, 'Song not in playlist')
+        assert playlist.move_song(songs[0].track_uri, before=songs[3].track_uri) == (False, 'Target song not in playlist')
+
+    def test_reorder_songs_single_statement(self, playlist, songs):
+        """Test full reorder writes evenly spaced positions in the given order"""
+        uris = [s.track_uri for s in songs]
+        playlist.add_songs(uris)
+
+        success, _ = playlist.reorder_songs(list(reversed(uris)))
+
+        assert success
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == list(reversed(uris))
+        assert sorted(positions(playlist).values()) == [i * 1024 for i in range(5)]
+
+    def test_reorder_large_playlist_in_chunks(self, playlist):
+        """Test that a large reorder is written in chunks small enough for SQLite's bind variable limit"""
+        uris = [f'spotify:track:big{i:04d}' for i in range(1000)]
+        db.session.add_all([Song(track_uri=uri, track_name=uri) for uri in uris])
+        db.session.commit()
+        playlist.add_songs(uris)
+
+        with count_queries() as statements:
+            success, _ = playlist.reorder_songs(list(reversed(uris)))
+
+        assert success
+        assert len([s for s in statements if s.startswith('UPDATE playlist_songs')]) == 3
+        assert playlist.get_track_uris() == list(reversed(uris))
+        assert sorted(positions(playlist).values()) == [i * POSITION_GAP for i in range(1000)]
+
+    def test_move_route(self, logged_in_user, songs):
+        """Test the move endpoint"""
+        client, user = logged_in_user
+        playlist, _ = Playlist.create_for_user(user.id, 'Move Playlist')
+        playlist.add_songs([songs[0].track_uri, songs[1].track_uri])
+
+        response = client.post(f'/music/playlists/{playlist.id}/move', json={
+            'track_uri': songs[1].track_uri, 'before': songs[0].track_uri
+        })
+        assert response.status_code == 200
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == [songs[1].track_uri, songs[0].track_uri]
+
+        response = client.post(f'/music/playlists/{playlist.id}/move', json={'track_uri': songs[1].track_uri})
+        assert response.status_code == 400
+
+
+class TestPlaylistPagination:
+    """Test keyset-paginated playlist songs"""
+
+    def test_pages_cover_playlist_in_order(self, playlist, songs):
+        """Test that walking the cursor returns every song once, in order, even with tied positions"""
+        uris = [s.track_uri for s in songs]
+        playlist.add_songs(uris)
+        # Legacy rows could share a position; the track URI breaks the tie
+        db.session.execute(
+            playlist_songs.update()
+            .where(playlist_songs.c.track_uri.in_(uris[1:3]))
+            .values(position=POSITION_GAP)
+        )
+        db.session.commit()
+
+        seen = []
+        cursor = {'after': None, 'after_uri': None}
+        while cursor:
+            page, cursor = playlist.get_songs_page(cursor['after'], cursor['after_uri'], limit=2)
+            assert len(page) <= 2
+            seen.extend(song['track_uri'] for song in page)
+
+        assert seen == uris
+        assert set(page[0]) >= {'track_uri', 'track_name', 'position', 'tempo', 'duration_ms'}
+
+    def test_songs_route(self, logged_in_user, songs):
+        """Test the JSON endpoint and that the view no longer renders songs inline"""
+        client, user = logged_in_user
+        playlist, _ = Playlist.create_for_user(user.id, 'Paged Playlist')
+        playlist.add_songs([s.track_uri for s in songs])
+
+        response = client.get(f'/music/playlists/{playlist.id}/songs?limit=3')
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data['total'] == 5
+        assert [s['track_uri'] for s in data['songs']] == [s.track_uri for s in songs[:3]]
+
+        response = client.get(f"/music/playlists/{playlist.id}/songs", query_string={
+            'after': data['next']['after'], 'after_uri': data['next']['after_uri'], 'limit': 3
+        })
+        data = response.get_json()
+        assert [s['track_uri'] for s in data['songs']] == [s.track_uri for s in songs[3:]]
+        assert data['next'] is None
+
+        response = client.get(f'/music/playlists/{playlist.id}')
+        assert response.status_code == 200
+        assert b'Song 4' not in response.data
+
+        assert client.get('/music/playlists/999999/songs').status_code == 404
+
+
+class TestPlaylistSetOperations:
+    """Test creating playlists from union, intersect and difference"""
+
+    @pytest.fixture
+    def sources(self, playlist, owner, songs):
+        """Two overlapping playlists: [4, 0, 1, 2] and [3, 2, 1]"""
+        playlist.add_songs([songs[i].track_uri for i in (4, 0, 1, 2)])
+        other, _ = Playlist.create_for_user(owner.id, 'Other')
+        other.add_songs([songs[i].track_uri for i in (3, 2, 1)])
+        return playlist, other
+
+    @pytest.mark.parametrize('operation, expected', [
+        ('union', [4, 0, 1, 2, 3]),
+        ('intersect', [1, 2]),
+        ('difference', [4, 0]),
+    ])
+    def test_operations(self, sources, owner, songs, operation, expected):
+        """Test membership, order, positions and counters of the result"""
+        first, second = sources
+
+        with count_queries() as statements:
+            result, error = create_playlist_from_set(owner.id, 'Result', operation, [first.id, second.id])
+
+        assert error is None
+        expected_uris = [songs[i].track_uri for i in expected]
+        assert [s.track_uri for s in result.get_songs_ordered()] == expected_uris
+        assert sorted(positions(result).values()) == [i * POSITION_GAP for i in range(len(expected))]
+        assert result.song_count == len(expected)
+        assert result.total_duration_ms == sum(songs[i].duration_ms for i in expected)
+        assert sum('INSERT INTO playlist_songs' in s for s in statements) == 1
+        assert not any('FROM songs' in s and 'playlist_songs' not in s for s in statements)
+
+    def test_combine_route(self, logged_in_user, owner, songs):
+        """Test the endpoint validation and ownership checks"""
+        client, user = logged_in_user
+        first, _ = Playlist.create_for_user(user.id, 'First')
+        second, _ = Playlist.create_for_user(user.id, 'Second')
+        first.add_songs([s.track_uri for s in songs[:3]])
+        second.add_songs([s.track_uri for s in songs[2:]])
+        foreign, _ = Playlist.create_for_user(owner.id, 'Not yours')
+
+        response = client.post('/music/playlists/combine', json={
+            'name': 'Merged', 'operation': 'union', 'playlist_ids': [first.id, second.id]
+        })
+        assert response.status_code == 201
+        assert response.get_json()['song_count'] == 5
+
+        response = client.post('/music/playlists/combine', json={
+            'name': 'Bad', 'operation': 'xor', 'playlist_ids': [first.id, second.id]
+        })
+        assert response.status_code == 400
+
+        response = client.post('/music/playlists/combine', json={
+            'name': 'Bad', 'operation': 'union', 'playlist_ids': [first.id, first.id]
+        })
+        assert response.status_code == 400
+
+        response = client.post('/music/playlists/combine', json={
+            'name': 'Bad', 'operation': 'union', 'playlist_ids': [first.id, foreign.id]
+        })
+        assert response.status_code == 404
+
+
+class TestPlaylistCounters:
+    """Test denormalized song_count and total_duration_ms"""
+
+    def test_counters_follow_add_and_remove(self, playlist, songs):
+        """Test that add_song, add_songs and remove_song maintain the counters"""
+        playlist.add_song(songs[0].track_uri)
+        playlist.add_songs([songs[1].track_uri, songs[2].track_uri, 'spotify:track:missing'])
+        assert playlist.song_count == 3
+        assert playlist.total_duration_ms == 60000 + 120000 + 180000
+
+        playlist.remove_song(songs[1].track_uri)
+        playlist.remove_song(songs[1].track_uri)
+        assert playlist.song_count == 2
+        assert playlist.get_total_duration_ms() == 60000 + 180000
+        assert playlist.get_total_duration_formatted() == '4m'
+
+    def test_recompute_counters_repairs_drift(self, playlist, songs):
+        """Test that recompute_counters restores counts after out-of-band changes"""
+        playlist.add_songs([s.track_uri for s in songs])
+        db.session.execute(playlist_songs.delete().where(playlist_songs.c.track_uri == songs[0].track_uri))
+        db.session.commit()
+        assert playlist.song_count == 5
+
+        updated, error = Playlist.recompute_counters([playlist.id])
+
+        assert error is None
+        assert updated == 1
+        db.session.refresh(playlist)
+        assert playlist.song_count == 4
+        assert playlist.total_duration_ms == sum(s.duration_ms for s in songs[1:])
+
+    def test_user_playlists_json_has_no_per_playlist_queries(self, logged_in_user, songs):
+        """Test that serializing the playlist list does not scale with playlist count"""
+        client, user = logged_in_user
+        for i in range(3):
+            playlist, _ = Playlist.create_for_user(user.id, f'Playlist {i}')
+            playlist.add_songs([s.track_uri for s in songs[:i + 1]])
+        client.get('/music/playlists/user-playlists')
+        db.session.remove()
+
+        with count_queries() as few:
+            client.get('/music/playlists/user-playlists')
+        for i in range(3, 8):
+            Playlist.create_for_user(user.id, f'Playlist {i}')
+        db.session.remove()
+        with count_queries() as many:
+            response = client.get('/music/playlists/user-playlists')
+
+        data = response.get_json()
+        assert len(data) == 8
+        assert sorted(p['song_count'] for p in data)[-3:] == [1, 2, 3]
+        assert len(many) == len(few)
+
+
+class TestSmartPlaylists:
+    """Test rule-based smart playlists"""
+
+    @pytest.fixture
+    def feature_songs(self, app):
+        """Create songs with audio features and genres"""
+        library = [
+            Song(track_uri='spotify:track:house1', track_name='A', tempo=124.0, energy=0.8,
+                 genres='deep house,dance', explicit=False, duration_ms=1000),
+            Song(track_uri='spotify:track:house2', track_name='B', tempo=128.0, energy=0.6,
+                 genres='tech house', explicit=False, duration_ms=1000),
+            Song(track_uri='spotify:track:house3', track_name='C', tempo=126.0, energy=0.9,
+                 genres='House', explicit=True, duration_ms=1000),
+            Song(track_uri='spotify:track:rock1', track_name='D', tempo=125.0, energy=0.95,
+                 genres='rock', explicit=None, duration_ms=1000),
+            Song(track_uri='spotify:track:nofeat', track_name='E', genres='house', duration_ms=1000),
+        ]
+        db.session.add_all(library)
+        db.session.commit()
+        return library
+
+    RULES = [
+        {'field': 'tempo', 'op': 'between', 'value': [120, 130]},
+        {'field': 'energy', 'op': 'gt', 'value': 0.7},
+        {'field': 'genres', 'op': 'contains', 'value': 'house'},
+        {'field': 'explicit', 'op': 'is', 'value': False},
+    ]
+
+    def test_compile_rules_validation(self):
+        """Test that invalid rules are rejected with a message"""
+        from flask_app.utils.smart_playlists import compile_rules
+
+        assert compile_rules([])[1] is not None
+        assert compile_rules([{'field': 'password', 'op': 'eq', 'value': 1}])[1] is not None
+        assert compile_rules([{'field': 'tempo', 'op': 'contains', 'value': 'x'}])[1] is not None
+        assert compile_rules([{'field': 'tempo', 'op': 'gt', 'value': 'fast'}])[1] is not None
+        assert compile_rules(self.RULES, match='some')[1] is not None
+
+        rule_set, error = compile_rules([{'field': 'tempo', 'op': 'between', 'value': [130, 120]}])
+        assert error is None
+        assert rule_set['rules'][0]['value'] == [120.0, 130.0]
+
+    def test_vectorized_evaluation_matches_sql(self, feature_songs):
+        """Test that the NumPy evaluator agrees with the SQL filter"""
+        from flask_app.utils.smart_playlists import compile_rules, build_filter, build_columns, evaluate_rules
+
+        for match in ('all', 'any'):
+            rule_set, _ = compile_rules(self.RULES + [
+                {'field': 'genres', 'op': 'not_contains', 'value': 'tech'}
+            ], match=match)
+            sql_matches = {s.track_uri for s in Song.query.filter(build_filter(rule_set)).all()}
+            columns = build_columns(feature_songs, {r['field'] for r in rule_set['rules']})
+            mask = evaluate_rules(rule_set, columns, len(feature_songs))
+            numpy_matches = {s.track_uri for s, matched in zip(feature_songs, mask) if matched}
+            assert numpy_matches == sql_matches
+
+    def test_create_smart_playlist_route(self, logged_in_user, feature_songs):
+        """Test creating a smart playlist materializes matching songs"""
+        client, user = logged_in_user
+
+        response = client.post('/music/playlists/smart/create', json={
+            'name': 'Peak House', 'rules': self.RULES
+        })
+
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['is_smart'] is True
+        assert data['song_count'] == 1
+        playlist = db.session.get(Playlist, data['id'])
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == ['spotify:track:house1']
+
+        response = client.post(f"/music/playlists/{data['id']}/rules", json={
+            'rules': [{'field': 'genres', 'op': 'contains', 'value': 'house'}]
+        })
+        assert response.status_code == 200
+        assert response.get_json()['song_count'] == 4
+
+        response = client.post('/music/playlists/smart/create', json={'name': 'Bad', 'rules': []})
+        assert response.status_code == 400
+
+    def test_rules_route_refuses_regular_playlists(self, logged_in_user, feature_songs):
+        """Test that posting rules to a regular playlist leaves its hand-picked songs alone"""
+        client, user = logged_in_user
+        playlist, _ = Playlist.create_for_user(user.id, 'Hand Picked')
+        playlist.add_songs(['spotify:track:rock1'])
+
+        response = client.post(f'/music/playlists/{playlist.id}/rules', json={'rules': self.RULES})
+
+        assert response.status_code == 400
+        db.session.refresh(playlist)
+        assert not playlist.is_smart()
+        assert playlist.get_track_uris() == ['spotify:track:rock1']
+
+    def test_failed_smart_create_leaves_nothing_behind(self, logged_in_user, feature_songs):
+        """Test that a smart playlist whose songs cannot be written is not created"""
+        from unittest.mock import patch
+        from flask_app.utils import smart_playlists
+        client, _ = logged_in_user
+
+        with patch.object(smart_playlists, '_write_smart_songs', side_effect=RuntimeError('disk full')):
+            response = client.post('/music/playlists/smart/create', json={'name': 'Peak House', 'rules': self.RULES})
+
+        assert response.status_code == 500
+        assert Playlist.query.count() == 0
+
+    def test_new_songs_added_to_matching_smart_playlists(self, owner, feature_songs):
+        """Test that only new songs are evaluated and appended after an import"""
+        import json
+        from flask_app.utils.smart_playlists import compile_rules, materialize_playlist, materialize_new_songs
+
+        rule_set, _ = compile_rules(self.RULES)
+        playlist, _ = Playlist.create_for_user(owner.id, 'Smart')
+        playlist.safe_update(smart_rules=json.dumps(rule_set))
+        materialize_playlist(playlist)
+        regular, _ = Playlist.create_for_user(owner.id, 'Regular')
+
+        db.session.add_all([
+            Song(track_uri='spotify:track:new1', tempo=122.0, energy=0.75, genres='house',
+                 explicit=False, duration_ms=5000),
+            Song(track_uri='spotify:track:new2', tempo=90.0, energy=0.75, genres='house',
+                 explicit=False, duration_ms=5000),
+        ])
+        db.session.commit()
+
+        added, error = materialize_new_songs(['spotify:track:new1', 'spotify:track:new2'])
+
+        assert error is None
+        assert added == 1
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == [
+            'spotify:track:house1', 'spotify:track:new1'
+        ]
+        assert playlist.song_count == 2
+        assert playlist.total_duration_ms == 6000
+        assert regular.song_count == 0
+
+    def test_new_songs_are_matched_in_chunks(self, owner, feature_songs, monkeypatch):
+        """Test that a large set of new songs is evaluated a chunk at a time with positions and counters kept in step"""
+        import json
+        from flask_app.utils import smart_playlists
+        from flask_app.utils.smart_playlists import compile_rules, materialize_playlist, materialize_new_songs
+
+        monkeypatch.setattr(smart_playlists, 'RULE_MATCH_CHUNK', 4)
+        rule_set, _ = compile_rules(self.RULES)
+        playlist, _ = Playlist.create_for_user(owner.id, 'Smart')
+        playlist.safe_update(smart_rules=json.dumps(rule_set))
+        materialize_playlist(playlist)
+        new_uris = [f'spotify:track:new{i:02d}' for i in range(10)]
+        db.session.add_all([
+            Song(track_uri=uri, tempo=122.0, energy=0.75 if i % 2 == 0 else 0.5, genres='house',
+                 explicit=False, duration_ms=5000)
+            for i, uri in enumerate(new_uris)
+        ])
+        db.session.commit()
+
+        with count_queries() as statements:
+            added, error = materialize_new_songs(new_uris)
+
+        assert (added, error) == (5, None)
+        assert len([s for s in statements if s.startswith('SELECT songs.')]) == 3
+        db.session.refresh(playlist)
+        assert playlist.get_track_uris() == ['spotify:track:house1'] + new_uris[::2]
+        assert (playlist.song_count, playlist.total_duration_ms) == (6, 26000)
+        assert len(set(positions(playlist).values())) == 6
+
+    def test_changed_features_rematch_smart_playlists(self, owner, feature_songs):
+        """Test that songs whose features change join or leave smart playlists, with counters kept in step"""
+        import json
+        from flask_app.utils.smart_playlists import compile_rules, materialize_playlist, rematch_songs
+
+        rule_set, _ = compile_rules(self.RULES)
+        playlist, _ = Playlist.create_for_user(owner.id, 'Smart')
+        playlist.safe_update(smart_rules=json.dumps(rule_set))
+        assert materialize_playlist(playlist) == (1, None)
+        assert (playlist.song_count, playlist.total_duration_ms) == (1, 1000)
+
+        Song.bulk_update_audio_features([
+            {'track_uri': 'spotify:track:house1', 'energy': 0.2},
+            {'track_uri': 'spotify:track:nofeat', 'tempo': 125.0, 'energy': 0.8},
+        ])
+        added, removed, error = rematch_songs(['spotify:track:house1', 'spotify:track:nofeat'])
+
+        assert (added, removed, error) == (1, 1, None)
+        db.session.refresh(playlist)
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == ['spotify:track:nofeat']
+        assert (playlist.song_count, playlist.total_duration_ms) == (1, 1000)
+
+
+class TestDJSequencer:
+    """Test harmonic playlist sequencing"""
+
+    def test_camelot_codes(self):
+        """Test Camelot wheel mapping for known keys"""
+        from flask_app.utils.dj_sequencer import camelot_code
+
+        assert camelot_code(0, 1) == '8B'   # C major
+        assert camelot_code(9, 0) == '8A'   # A minor
+        assert camelot_code(7, 1) == '9B'   # G major
+        assert camelot_code(6, 1) == '2B'   # F# major
+        assert camelot_code(None, 1) is None
+        assert camelot_code(-1, 0) is None
+
+    def test_sequence_prefers_compatible_transitions(self):
+        """Test that the sequencer lowers the total transition cost"""
+        from flask_app.utils.dj_sequencer import sequence_tracks
+
+        tracks = [
+            {'track_uri': 'a', 'key': 0, 'mode': 1, 'tempo': 120.0, 'energy': 0.3},
+            {'track_uri': 'b', 'key': 6, 'mode': 1, 'tempo': 140.0, 'energy': 0.9},
+            {'track_uri': 'c', 'key': 7, 'mode': 1, 'tempo': 122.0, 'energy': 0.4},
+            {'track_uri': 'd', 'key': 1, 'mode': 1, 'tempo': 138.0, 'energy': 0.8},
+            {'track_uri': 'e', 'key': 2, 'mode': 1, 'tempo': 124.0, 'energy': 0.5},
+        ]
+        order, stats = sequence_tracks(tracks)
+
+        assert sorted(order) == ['a', 'b', 'c', 'd', 'e']
+        assert order[:3] == ['a', 'c', 'e']
+        assert stats['cost_after'] < stats['cost_before']
+
+    def test_sequence_handles_missing_features(self):
+        """Test that tracks without audio features are still placed"""
+        from flask_app.utils.dj_sequencer import sequence_tracks
+
+        tracks = [{'track_uri': str(i), 'key': None, 'mode': None, 'tempo': None, 'energy': None}
+                  for i in range(6)]
+        order, _ = sequence_tracks(tracks)
+        assert sorted(order) == [str(i) for i in range(6)]
+
+    @pytest.mark.slow
+    def test_sequence_1000_tracks_under_a_second(self):
+        """Benchmark: a 1,000-track playlist is sequenced within the time budget (wall clock)"""
+        import time
+        import random
+        from flask_app.utils.dj_sequencer import sequence_tracks
+
+        rng = random.Random(7)
+        tracks = [{
+            'track_uri': f'spotify:track:{i}',
+            'key': rng.randint(0, 11),
+            'mode': rng.randint(0, 1),
+            'tempo': rng.uniform(90, 150),
+            'energy': rng.random(),
+        } for i in range(1000)]
+
+        started = time.perf_counter()
+        order, stats = sequence_tracks(tracks)
+        elapsed = time.perf_counter() - started
+
+        assert len(set(order)) == 1000
+        assert stats['cost_after'] < stats['cost_before']
+        assert elapsed < 1.0
+
+    def test_sequence_route_writes_order(self, logged_in_user, app):
+        """Test that the endpoint reorders the playlist"""
+        client, user = logged_in_user
+        db.session.add_all([
+            Song(track_uri='spotify:track:x1', key=0, mode=1, tempo=120.0, energy=0.2),
+            Song(track_uri='spotify:track:x2', key=6, mode=0, tempo=150.0, energy=0.9),
+            Song(track_uri='spotify:track:x3', key=7, mode=1, tempo=121.0, energy=0.3),
+        ])
+        db.session.commit()
+        playlist, _ = Playlist.create_for_user(user.id, 'Set')
+        playlist.add_songs(['spotify:track:x2', 'spotify:track:x1', 'spotify:track:x3'])
+
+        response = client.post(f'/music/playlists/{playlist.id}/sequence', json={'dry_run': True})
+        assert response.status_code == 200
+        assert response.get_json()['applied'] is False
+        assert playlist.get_songs_ordered()[0].track_uri == 'spotify:track:x2'
+
+        response = client.post(f'/music/playlists/{playlist.id}/sequence')
+        data = response.get_json()
+        assert data['track_uris'] == ['spotify:track:x1', 'spotify:track:x3', 'spotify:track:x2']
+        assert data['camelot'][0] == '8B'
+        assert [s.track_uri for s in playlist.get_songs_ordered()] == data['track_uris']
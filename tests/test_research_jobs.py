@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+import pytest
+from datetime import datetime, timezone, timedelta
+from io import BytesIO
+from unittest.mock import patch
+from flask_app.models import ResearchBrief, ResearchImportJob, db
+from flask_app.utils import research_jobs
+from flask_app.utils.research_jobs import (
+    enqueue_research_jobs, recover_research_jobs, run_research_job, shutdown_research_executor
+)
+
+
+class FakePipeline:
+    """Stand-in for PDF extraction and the OpenAI call, tracking how many run at once"""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.running = threading.Event()  # Cleared to hold every job at its first stage
+        self.running.set()
+
+    def _run(self):
+        assert self.running.wait(timeout=10)
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+
+    def extract(self, pdf_data):
+        self._run()
+        if pdf_data.startswith(b'broken'):
+            return None, 'Could not extract text from PDF.'
+        return pdf_data.decode() * 10, None
+
+    def summarize(self, source_text=None, pdf_data=None, pdf_filename=None):
+        self._run()
+        return {
+            'title': source_text[:20],
+            'citation': 'Author (2024)',
+            'summary': '<p>Summary</p>',
+            'source_text': source_text,
+            'model_name': 'test-model',
+        }, None
+
+
+@pytest.fixture
+def pipeline(app, tmp_path):
+    """Run research jobs against the fake pipeline with uploads stored in a temp folder"""
+    fake = FakePipeline()
+    saved = {key: app.config.get(key) for key in ('UPLOAD_FOLDER', 'RESEARCH_CONCURRENCY')}
+    app.config.update({'UPLOAD_FOLDER': str(tmp_path), 'RESEARCH_CONCURRENCY': 4})
+    shutdown_research_executor()
+    with patch.object(research_jobs, 'extract_text_from_pdf', fake.extract), \
+         patch.object(research_jobs, 'process_research_brief', fake.summarize):
+        yield fake
+    shutdown_research_executor()
+    app.config.update(saved)
+
+
+def wait_for_batch(batch_id, user_id, timeout=10):
+    """Wait until every job in the batch has finished and removed its upload"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        jobs = ResearchImportJob.find_by_batch(batch_id, user_id)
+        uploads_left = any(job.stored_path and os.path.exists(job.stored_path) for job in jobs)
+        if jobs and all(job.is_finished() for job in jobs) and not uploads_left:
+            return jobs
+        time.sleep(0.05)
+    raise AssertionError(f'Batch {batch_id} did not finish')
+
+
+def upload(client, files, tags=''):
+    data = {
+        'source_type': 'pdf',
+        'tags': tags,
+        'pdf_file': [(BytesIO(content), name) for name, content in files],
+    }
+    return client.post('/research/create', data=data, content_type='multipart/form-data')
+
+
+class TestResearchImportJobs:
+    """Test background processing of uploaded research PDFs"""
+
+    def test_upload_returns_before_processing(self, app, logged_in_user, pipeline):
+        """Test that a multi-file upload is queued and redirects to the progress page"""
+        client, user = logged_in_user
+        pipeline.running.clear()
+
+        response = upload(client, [(f'paper{i}.pdf', f'paper {i} text. '.encode()) for i in range(3)], tags='ml, Papers')
+
+        assert response.status_code == 302
+        assert '/research/uploads/' in response.location
+        batch_id = response.location.rstrip('/').split('/')[-1]
+        assert not any(job.is_finished() for job in ResearchImportJob.find_by_batch(batch_id, user.id))
+
+        pipeline.running.set()
+        jobs = wait_for_batch(batch_id, user.id)
+
+        assert [job.status for job in jobs] == ['completed'] * 3
+        assert all(job.stored_path and not os.path.exists(job.stored_path) for job in jobs)
+        brief = db.session.get(ResearchBrief, jobs[0].brief_id)
+        assert brief.pdf_filename == jobs[0].original_filename
+        assert brief.get_tag_names() == ['ml', 'papers']
+
+        status = client.get(f'/research/uploads/{batch_id}/status').get_json()
+        assert status['finished'] is True
+        assert {job['status'] for job in status['jobs']} == {'completed'}
+        assert client.get(f'/research/uploads/{batch_id}').status_code == 200
+
+    def test_duplicates_and_empty_files_are_reported_without_queueing(self, app, logged_in_user, pipeline):
+        """Test that duplicate and empty uploads finish immediately"""
+        client, user = logged_in_user
+        ResearchBrief.safe_create(
+            user_id=user.id, title='Existing', citation='c', summary='s', source_text='t',
+            pdf_filename='existing.pdf', content_hash=None, source_type='pdf'
+        )
+
+        with patch('flask_app.routes.research.enqueue_research_jobs'):
+            response = upload(client, [
+                ('existing.pdf', b'other content'),
+                ('new.pdf', b'new paper text. '),
+                ('copy.pdf', b'new paper text. '),
+                ('empty.pdf', b''),
+            ])
+        batch_id = response.location.rstrip('/').split('/')[-1]
+        jobs = {job.original_filename: job for job in ResearchImportJob.find_by_batch(batch_id, user.id)}
+
+        assert jobs['existing.pdf'].status == 'duplicate'
+        assert jobs['existing.pdf'].brief_id is not None
+        assert jobs['copy.pdf'].status == 'duplicate'
+        assert 'new.pdf' in jobs['copy.pdf'].error_message
+        assert jobs['empty.pdf'].status == 'failed'
+        assert jobs['new.pdf'].status == 'queued'
+        assert os.path.exists(jobs['new.pdf'].stored_path)
+
+    def test_failed_extraction_marks_job_failed(self, app, logged_in_user, pipeline, tmp_path):
+        """Test that an extraction error fails the job and removes the upload"""
+        client, user = logged_in_user
+        path = tmp_path / 'broken.pdf'
+        path.write_bytes(b'broken pdf')
+        job = ResearchImportJob(batch_id='b1', user_id=user.id, original_filename='broken.pdf',
+                                stored_path=str(path), content_hash='abc')
+        db.session.add(job)
+        db.session.commit()
+
+        run_research_job(job.id, app)
+        db.session.expire_all()
+        job = db.session.get(ResearchImportJob, job.id)
+
+        assert (job.status, job.stage) == ('failed', 'done')
+        assert job.error_message == 'Could not extract text from PDF.'
+        assert not path.exists()
+        assert ResearchBrief.query.count() == 0
+
+    def test_other_users_cannot_see_batch(self, app, logged_in_user, pipeline):
+        """Test that batch status is scoped to the uploading user"""
+        client, user = logged_in_user
+        job = ResearchImportJob(batch_id='b2', user_id=user.id + 1, original_filename='x.pdf')
+        db.session.add(job)
+        db.session.commit()
+
+        assert client.get('/research/uploads/b2/status').status_code == 404
+
+    def test_throughput_scales_with_concurrency(self, app, test_user, pipeline, tmp_path):
+        """Test that jobs run in parallel, bounded by RESEARCH_CONCURRENCY"""
+        db.session.add(test_user)
+        db.session.commit()
+        pipeline.delay = 0.1
+        jobs = []
+        for i in range(8):
+            path = tmp_path / f'paper{i}.pdf'
+            path.write_bytes(f'paper {i} text. '.encode())
+            jobs.append(ResearchImportJob(batch_id='b3', user_id=test_user.id, original_filename=path.name,
+                                          stored_path=str(path), content_hash=f'hash{i}'))
+        db.session.add_all(jobs)
+        db.session.commit()
+
+        for future in enqueue_research_jobs([job.id for job in jobs], app):
+            future.result()
+
+        assert pipeline.max_in_flight == 4
+        assert ResearchBrief.query.count() == 8
+
+    def test_restart_recovers_unfinished_jobs(self, app, test_user, pipeline, tmp_path):
+        """Test that queued jobs are queued again and abandoned running jobs are failed with their uploads removed"""
+        db.session.add(test_user)
+        db.session.commit()
+        paths = {}
+        for name in ('queued', 'lost', 'running', 'recent'):
+            paths[name] = tmp_path / f'{name}.pdf'
+            paths[name].write_bytes(f'{name} paper text. '.encode())
+        paths['lost'].unlink()
+        long_ago = datetime.now(timezone.utc) - timedelta(seconds=app.config['RESEARCH_JOB_LEASE_SECONDS'] + 60)
+        jobs = {
+            'queued': ResearchImportJob(status='queued'),
+            'lost': ResearchImportJob(status='queued'),
+            'running': ResearchImportJob(status='running', stage='summarizing', updated_at=long_ago),
+            'recent': ResearchImportJob(status='running', stage='summarizing'),
+        }
+        for name, job in jobs.items():
+            job.batch_id, job.user_id, job.original_filename = 'b4', test_user.id, f'{name}.pdf'
+            job.stored_path, job.content_hash = str(paths[name]), f'hash-{name}'
+        db.session.add_all(jobs.values())
+        db.session.commit()
+
+        assert recover_research_jobs(app) == (1, 2)
+        shutdown_research_executor()
+        db.session.expire_all()
+
+        assert jobs['queued'].status == 'completed'
+        assert not paths['queued'].exists()
+        assert jobs['lost'].status == 'failed'
+        assert (jobs['running'].status, jobs['running'].stage) == ('failed', 'done')
+        assert 'interrupted' in jobs['running'].error_message
+        assert not paths['running'].exists()
+        assert jobs['recent'].status == 'running'
+        assert paths['recent'].exists()
+
+        # Running a job twice only processes it once
+        run_research_job(jobs['queued'].id, app)
+        assert ResearchBrief.query.count() == 1
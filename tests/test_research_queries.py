@@ -0,0 +1,274 @@
+import re
+from contextlib import contextmanager
+from sqlalchemy import event
+from flask_app.models import ResearchBrief, Tag, User, UserTagCount, db
+from flask_app.models.research_brief import research_brief_tags
+
+
+@contextmanager
+def capture_queries():
+    """Collect the SQL statements run inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def selected_columns(statement):
+    """research_briefs columns a SELECT returns, ignoring ones only tested for NULL"""
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return set()
+    columns = re.split(r'\sFROM\s', statement, maxsplit=1)[0]  # Outer select list (a count(*) subquery returns no columns)
+    columns = re.sub(r'research_briefs\.(\w+) IS NOT NULL', '', columns)
+    return set(re.findall(r'research_briefs\.(\w+)', columns))
+
+
+def research_queries(statements):
+    """Statements other than the logged-in user lookup, which depends on session state"""
+    return [statement for statement in statements if 'FROM users' not in statement]
+
+
+def create_briefs(user_id, count, source_type='pdf', pdf_data=b'%PDF-1.4 ' + b'x' * 200_000):
+    for number in range(count):
+        db.session.add(ResearchBrief(
+            user_id=user_id, title=f'Paper {number}', citation='Author (2024)', summary='<p>Summary</p>',
+            source_text='word ' * 30_000, pdf_filename=f'paper{number}.pdf', pdf_data=pdf_data,
+            source_type=source_type
+        ))
+    db.session.commit()
+    db.session.expire_all()
+
+
+class TestResearchListQueries:
+    """Test what the research list pages load from the database"""
+
+    def test_list_does_not_load_heavy_columns(self, app, logged_in_user):
+        """Test that the list page never reads source text or PDF data"""
+        client, user = logged_in_user
+        create_briefs(user.id, 3)
+
+        with capture_queries() as statements:
+            response = client.get('/research')
+
+        assert response.status_code == 200
+        assert b'Paper 2' in response.data
+        assert response.data.count(b'Download PDF') == 3  # Legacy inline PDFs are detected without loading them
+        loaded = set().union(*map(selected_columns, statements))
+        assert 'title' in loaded
+        assert not loaded & {'source_text', 'pdf_data', 'summary'}
+
+    def test_heavy_columns_are_deferred(self, app, logged_in_user):
+        """Test that a plain query leaves source text and PDF data unloaded until accessed"""
+        client, user = logged_in_user
+        create_briefs(user.id, 1, source_type='text', pdf_data=None)
+
+        brief = ResearchBrief.query.first()
+        unloaded = db.inspect(brief).unloaded
+
+        assert {'source_text', 'pdf_data'} <= unloaded
+        assert 'summary' not in unloaded
+        assert brief.source_text.startswith('word ')
+
+    def test_view_loads_source_text_with_the_brief(self, app, logged_in_user):
+        """Test that the view page reads the source text in the same query as the brief"""
+        client, user = logged_in_user
+        create_briefs(user.id, 1, source_type='text', pdf_data=None)
+        brief_id = ResearchBrief.query.first().id
+
+        with capture_queries() as statements:
+            response = client.get(f'/research/{brief_id}')
+
+        assert response.status_code == 200
+        assert b'word word' in response.data
+        brief_queries = [columns for columns in map(selected_columns, statements) if 'title' in columns]
+        assert len(brief_queries) == 1
+        assert 'source_text' in brief_queries[0]
+        assert 'pdf_data' not in set().union(*map(selected_columns, statements))
+
+    def test_list_query_count_is_constant(self, app, logged_in_user):
+        """Test that the list page runs the same number of queries for 2 or 20 tagged briefs"""
+        client, user = logged_in_user
+        user_id = user.id
+
+        def tagged_briefs(count):
+            create_briefs(user_id, count, source_type='text', pdf_data=None)
+            for brief in ResearchBrief.query.order_by(ResearchBrief.id.desc()).limit(count):
+                brief.add_tag(f'topic-{brief.id % 3}')
+                brief.add_tag('shared')
+
+        tagged_briefs(2)
+        client.get('/research')  # Warm up per-process caches
+        with capture_queries() as few:
+            client.get('/research')
+        tagged_briefs(18)
+        with capture_queries() as many:
+            response = client.get('/research')
+
+        assert response.status_code == 200
+        assert response.data.count(b'<i class="fas fa-tag"></i> shared') == 20
+        assert len(research_queries(many)) == len(research_queries(few)) == 4  # Count, page, tag counts, page tags
+
+        shared = next(tag for tag in ResearchBrief.query.first().tags if tag.name == 'shared')
+        with capture_queries() as filtered:
+            response = client.get(f'/research?tag={shared.id}')
+        assert b'Filtered by: <strong>shared</strong>' in response.data
+        assert len(research_queries(filtered)) == 4
+
+    def test_get_tags_for_briefs(self, app, test_user):
+        """Test that tags are grouped per brief and ordered by name"""
+        db.session.add(test_user)
+        db.session.commit()
+        create_briefs(test_user.id, 3, source_type='text', pdf_data=None)
+        first, second, third = ResearchBrief.query.order_by(ResearchBrief.id).all()
+        first.add_tag('zeta')
+        first.add_tag('alpha')
+        second.add_tag('alpha')
+        brief_ids = [first.id, second.id, third.id]
+
+        with capture_queries() as statements:
+            tags_by_brief, error = ResearchBrief.get_tags_for_briefs(brief_ids)
+
+        assert error is None
+        assert len(statements) == 1
+        assert {brief_id: [tag.name for tag in tags] for brief_id, tags in tags_by_brief.items()} == {
+            brief_ids[0]: ['alpha', 'zeta'],
+            brief_ids[1]: ['alpha'],
+        }
+        assert ResearchBrief.get_tags_for_briefs([]) == ({}, None)
+
+
+class TestResearchByTagsQueries:
+    """Test the by-tags page's grouped queries and per-user tag counts"""
+
+    def setup_briefs(self, user):
+        """Three briefs for the user (two tagged) and one for someone else sharing a tag"""
+        other = User(username='other', email='other@example.com', password_hash='x')
+        db.session.add(other)
+        db.session.commit()
+        create_briefs(user.id, 3, source_type='text', pdf_data=None)
+        create_briefs(other.id, 1, source_type='text', pdf_data=None)
+        first, second, untagged, others = ResearchBrief.query.order_by(ResearchBrief.id).all()
+        first.add_tag('ml')
+        first.add_tag('biology')
+        second.add_tag('ml')
+        others.add_tag('ml')
+        others.add_tag('physics')
+        return first, second, untagged
+
+    def test_briefs_are_grouped_per_user(self, app, logged_in_user):
+        """Test grouping, untagged briefs and per-user counts"""
+        client, user = logged_in_user
+        first, second, untagged = self.setup_briefs(user)
+
+        tags_with_briefs, error = ResearchBrief.find_by_user_grouped_by_tag(user.id)
+        counts, _ = Tag.get_user_tags_with_counts(user.id)
+
+        assert error is None
+        assert [(tag.name, [brief.id for brief in briefs]) for tag, briefs in tags_with_briefs] == [
+            ('biology', [first.id]),
+            ('ml', [second.id, first.id]),
+        ]
+        assert [brief.id for brief in ResearchBrief.find_untagged_by_user(user.id)] == [untagged.id]
+        assert [(tag.name, count) for tag, count in counts] == [('biology', 1), ('ml', 2)]
+
+        response = client.get('/research/by-tags')
+        assert response.status_code == 200
+        assert 'physics' not in response.get_data(as_text=True)
+
+    def test_by_tags_query_count(self, app, logged_in_user):
+        """Test that the page runs three queries whatever the number of tags"""
+        client, user = logged_in_user
+        self.setup_briefs(user)
+
+        with capture_queries() as statements:
+            response = client.get('/research/by-tags')
+        ml = next(tag for tag, _ in Tag.get_user_tags_with_counts(user.id)[0] if tag.name == 'ml')
+        with capture_queries() as filtered:
+            filtered_response = client.get(f'/research/by-tags?tag={ml.id}')
+
+        assert len(research_queries(statements)) == 3  # Counts, grouped briefs, untagged briefs
+        assert response.get_data(as_text=True).count('brief-card-full-title') == 4  # 'ml' twice, 'biology', untagged
+        assert len(research_queries(filtered)) == 2  # Counts (which load the selected tag), its briefs
+        assert filtered_response.get_data(as_text=True).count('brief-card-full-title') == 2
+
+    def test_tag_edits_maintain_counts(self, app, logged_in_user):
+        """Test that adding or removing a tag, or deleting a brief, updates the user's counts"""
+        client, user = logged_in_user
+        first, second, untagged = self.setup_briefs(user)
+
+        def counts():
+            return {tag.name: count for tag, count in Tag.get_user_tags_with_counts(user.id)[0]}
+
+        assert counts() == {'biology': 1, 'ml': 2}
+        untagged.add_tag('ml')
+        assert counts() == {'biology': 1, 'ml': 3}
+        first.remove_tag('biology')
+        assert counts() == {'ml': 3}
+        second.safe_delete()
+        assert counts() == {'ml': 2}
+
+
+class TestUserTagCounts:
+    """Test the per-user tag-usage table"""
+
+    def test_list_sidebar_counts_only_own_briefs(self, app, logged_in_user):
+        """Test that the /research filter sidebar shows the user's own counts in one indexed read"""
+        client, user = logged_in_user
+        other = User(username='other', email='other@example.com', password_hash='x')
+        db.session.add(other)
+        db.session.commit()
+        create_briefs(user.id, 1, source_type='text', pdf_data=None)
+        create_briefs(other.id, 2, source_type='text', pdf_data=None)
+        for brief in ResearchBrief.query.all():
+            brief.add_tag('shared')
+        ResearchBrief.query.filter_by(user_id=other.id).first().add_tag('private')
+
+        with capture_queries() as statements:
+            text = client.get('/research').get_data(as_text=True)
+
+        assert '<span class="tag-name">shared</span>' in text
+        assert '<span class="tag-count">(1)</span>' in text
+        assert 'private' not in text
+        counts_query = next(statement for statement in statements if 'user_tag_counts' in statement)
+        assert 'research_brief' not in counts_query
+
+    def test_adding_a_tag_twice_counts_once(self, app, test_user):
+        """Test that re-adding an existing tag does not change the count"""
+        db.session.add(test_user)
+        db.session.commit()
+        create_briefs(test_user.id, 1, source_type='text', pdf_data=None)
+        brief = ResearchBrief.query.first()
+
+        brief.add_tag('ml')
+        brief.add_tag('ML ')
+        brief.remove_tag('unused')
+
+        assert [(row.tag_id, row.brief_count) for row in UserTagCount.query.all()] == [
+            (Tag.query.filter_by(name='ml').one().id, 1)
+        ]
+
+    def test_rebuild_repairs_drift(self, app, test_user):
+        """Test that rebuild recomputes counts from research_brief_tags"""
+        db.session.add(test_user)
+        db.session.commit()
+        create_briefs(test_user.id, 3, source_type='text', pdf_data=None)
+        briefs = ResearchBrief.query.all()
+        for brief in briefs:
+            brief.add_tag('ml')
+        briefs[0].add_tag('stats')
+        db.session.execute(research_brief_tags.delete().where(research_brief_tags.c.research_brief_id == briefs[1].id))
+        db.session.execute(db.update(UserTagCount).values(brief_count=7))
+        db.session.commit()
+
+        rows, error = UserTagCount.rebuild()
+
+        assert (rows, error) == (2, None)
+        db.session.expire_all()
+        counts = {tag.name: count for tag, count in Tag.get_user_tags_with_counts(test_user.id)[0]}
+        assert counts == {'ml': 2, 'stats': 1}
@@ -0,0 +1,337 @@
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from flask_app.models import SpotifyAuth
+from flask_app.utils.spotify_client import SpotifyClientManager, spotify_client_manager
+from flask_app.utils.spotify_scheduler import (
+    BACKGROUND, INTERACTIVE, ScheduledSession, SpotifyRequestScheduler, TokenBucket,
+    endpoint_name, request_priority
+)
+from flask_app.utils.spotify_service import SpotifyService
+
+
+@pytest.fixture(autouse=True)
+def reset_manager():
+    """Start every test with an empty shared client"""
+    spotify_client_manager.reset()
+    yield
+    spotify_client_manager.reset()
+
+
+@pytest.fixture
+def local_server():
+    """Serve empty JSON over HTTP/1.1 keep-alive on a random local port"""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = b'{}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+class TestSpotifyClientManager:
+    """Test the process-wide Spotify client"""
+
+    def test_token_is_cached_until_expiry(self):
+        """Test that the loader only runs when the cached token is stale"""
+        manager = SpotifyClientManager()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return {'access_token': f'token{len(loads)}', 'expires_at': time.time() + 3600}
+
+        client = manager.get_client(loader)
+        assert manager.get_client(loader) is client
+        assert manager.get_access_token() == 'token1'
+        assert len(loads) == 1
+
+        manager._expires_at = time.time() + 5  # Inside the expiry margin
+        assert manager.get_access_token() == 'token2'
+        assert client._auth_headers() == {'Authorization': 'Bearer token2'}
+
+        metrics = manager.get_metrics()
+        assert metrics['token_cache']['loads'] == 2
+        assert metrics['token_cache']['hits'] >= 2
+        assert metrics['pool']['sessions_created'] == 1
+
+    def test_session_reuses_connections(self, local_server):
+        """Test that sequential requests share one keep-alive connection"""
+        manager = SpotifyClientManager(pool_size=4)
+        client = manager.get_client(lambda: {'access_token': 't', 'expires_at': time.time() + 3600})
+
+        for _ in range(5):
+            assert client._session.get(local_server).status_code == 200
+
+        hosts = manager.get_metrics()['pool']['hosts']
+        assert hosts[0]['connections_opened'] == 1
+        assert hosts[0]['requests'] == 5
+        assert manager.get_metrics()['pool']['max_size'] == 4
+
+    def test_service_reads_database_once(self, app, test_user):
+        """Test that separate SpotifyService instances share the cached token"""
+        from flask_app.models import db
+        db.session.add(test_user)
+        db.session.commit()
+        SpotifyAuth.create_or_update(test_user.id, 'db-token', 'refresh', expires_in=3600)
+
+        with patch.object(SpotifyAuth, 'get_current', wraps=SpotifyAuth.get_current) as lookup:
+            first = SpotifyService().get_client()
+            second = SpotifyService().get_client()
+
+        assert first is second
+        assert lookup.call_count == 1
+        assert spotify_client_manager.get_access_token() == 'db-token'
+
+    def test_missing_auth_raises(self, app):
+        """Test that get_client still fails fast without a connected account"""
+        with pytest.raises(ValueError):
+            SpotifyService().get_client()
+
+    def test_metrics_route_is_admin_only(self, logged_in_admin):
+        """Test the metrics endpoint"""
+        admin_client, _ = logged_in_admin
+        response = admin_client.get('/music/spotify/metrics')
+        assert response.status_code == 200
+        assert set(response.get_json()) == {'token_cache', 'pool', 'scheduler'}
+
+
+@pytest.fixture
+def expired_auth(app, test_user):
+    """A shared Spotify auth row whose access token has expired"""
+    from datetime import datetime, timedelta, timezone
+    from flask_app.models import db
+    db.session.add(test_user)
+    db.session.commit()
+    auth, _ = SpotifyAuth.create_or_update(test_user.id, 'old-token', 'refresh-token', expires_in=3600)
+    auth.token_expires_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    db.session.commit()
+    return auth
+
+
+class TestSpotifyTokenRefresh:
+    """Test single-flight token refresh and auth row compaction"""
+
+    def test_concurrent_loads_are_single_flight(self):
+        """Test that threads finding a stale token share one load"""
+        manager = SpotifyClientManager()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            time.sleep(0.2)
+            return {'access_token': 'fresh', 'expires_at': time.time() + 3600}
+
+        manager._token_loader = loader
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(manager.get_access_token())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ['fresh'] * 8
+        assert len(loads) == 1
+        assert manager.get_metrics()['token_cache']['waits'] == 7
+
+    def test_expired_token_is_refreshed(self, expired_auth):
+        """Test that an expired shared token is refreshed once and stored in place"""
+        service = SpotifyService()
+        oauth = service._oauth_manager = type('OAuth', (), {})()
+        calls = []
+        oauth.refresh_access_token = lambda refresh_token: calls.append(refresh_token) or {
+            'access_token': 'new-token', 'expires_in': 3600, 'expires_at': int(time.time()) + 3600
+        }
+
+        service.get_client()
+        SpotifyService().get_client()
+
+        assert calls == ['refresh-token']
+        assert SpotifyAuth.query.count() == 1
+        assert SpotifyAuth.get_current().access_token == 'new-token'
+        assert SpotifyAuth.get_current().refresh_started_at is None
+
+    def test_waits_for_refresh_claimed_elsewhere(self, app, expired_auth):
+        """Test that a worker losing the claim uses the token stored by the winner"""
+        assert expired_auth.claim_refresh()  # Another process is refreshing
+        auth_id = expired_auth.id
+
+        def finish_refresh():
+            time.sleep(0.3)
+            with app.app_context():
+                from flask_app.models import db
+                other = db.session.get(SpotifyAuth, auth_id)
+                other.complete_refresh('old-token', 'their-token', expires_in=3600)
+
+        thread = threading.Thread(target=finish_refresh)
+        thread.start()
+        service = SpotifyService()
+        service.get_oauth_manager = lambda: pytest.fail('Refresh must not be repeated')
+        token_info = service.refresh_token(expired_auth)
+        thread.join()
+
+        assert token_info['access_token'] == 'their-token'
+
+    def test_stale_claim_can_be_taken_over(self, expired_auth):
+        """Test that a claim abandoned by a crashed worker expires"""
+        assert expired_auth.claim_refresh(lease_seconds=30)
+        assert not expired_auth.claim_refresh(lease_seconds=30)
+        assert expired_auth.claim_refresh(lease_seconds=-1)
+
+    def test_reconnect_reuses_single_row(self, app, test_user):
+        """Test that connecting again updates the row and compaction removes leftovers"""
+        from flask_app.models import db
+        db.session.add(test_user)
+        db.session.commit()
+        db.session.add_all([
+            SpotifyAuth(user_id=test_user.id, access_token=f'legacy{i}') for i in range(3)
+        ])
+        db.session.commit()
+
+        auth, error = SpotifyAuth.create_or_update(test_user.id, 'token', 'refresh', expires_in=3600)
+
+        assert error is None
+        assert SpotifyAuth.query.count() == 1
+        assert SpotifyAuth.get_active_auth().id == auth.id
+
+
+@pytest.fixture
+def scripted_server():
+    """Serve a queue of (status, headers) responses, then 200s, recording request paths"""
+    script = []
+    paths = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            paths.append(self.path)
+            status, headers = script.pop(0) if script else (200, {})
+            body = b'{}'
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', script, paths
+    server.shutdown()
+    server.server_close()
+
+
+class TestSpotifyRequestScheduler:
+    """Test rate limiting, retries and priorities for Spotify calls"""
+
+    def test_bucket_limits_rate(self):
+        """Test that calls beyond the burst are spaced at the configured rate"""
+        bucket = TokenBucket(rate=50, capacity=2)
+        started = time.monotonic()
+        waits = [bucket.acquire() for _ in range(7)]
+        assert time.monotonic() - started >= 0.09
+        assert waits[0] == pytest.approx(0, abs=0.01)
+
+    def test_interactive_calls_go_first(self):
+        """Test that a waiting interactive call is served before background calls"""
+        bucket = TokenBucket(rate=20, capacity=2, reserve=1)
+        bucket.tokens = 0
+        order = []
+
+        def call(priority):
+            bucket.acquire(priority)
+            order.append(priority)
+
+        background = [threading.Thread(target=call, args=(BACKGROUND,)) for _ in range(3)]
+        for thread in background:
+            thread.start()
+        time.sleep(0.01)
+        interactive = threading.Thread(target=call, args=(INTERACTIVE,))
+        interactive.start()
+        for thread in background + [interactive]:
+            thread.join()
+
+        assert order[0] == INTERACTIVE
+
+    def test_429_honours_retry_after(self, scripted_server):
+        """Test that a rate-limited call waits for Retry-After and then succeeds"""
+        url, script, paths = scripted_server
+        script.append((429, {'Retry-After': '0.3'}))
+        scheduler = SpotifyRequestScheduler(rate=100, burst=10)
+        session = ScheduledSession(scheduler)
+
+        started = time.monotonic()
+        response = session.get(f'{url}/v1/playlists/abc123/tracks?offset=0')
+
+        assert response.status_code == 200
+        assert time.monotonic() - started >= 0.3
+        assert len(paths) == 2
+        stats = scheduler.get_metrics()['endpoints']['GET /v1/playlists/{id}/tracks']
+        assert stats['calls'] == 2
+        assert stats['rate_limited'] == 1
+        assert stats['retries'] == 1
+        assert stats['throttled_seconds'] >= 0.3
+
+    def test_server_errors_back_off_and_give_up(self, scripted_server):
+        """Test that 5xx responses are retried and the last one returned when retries run out"""
+        url, script, paths = scripted_server
+        script.extend([(503, {})] * 3)
+        scheduler = SpotifyRequestScheduler(rate=100, burst=10, max_retries=2, backoff_factor=0.01)
+
+        response = ScheduledSession(scheduler).get(f'{url}/v1/me')
+
+        assert response.status_code == 503
+        assert len(paths) == 3
+        assert scheduler.get_metrics()['endpoints']['GET /v1/me']['server_errors'] == 3
+
+    def test_long_retry_after_fails_fast(self, scripted_server):
+        """Test that a Retry-After beyond the limit is returned instead of waited out"""
+        url, script, paths = scripted_server
+        script.append((429, {'Retry-After': '3600'}))
+        scheduler = SpotifyRequestScheduler(max_retry_after=60)
+
+        assert ScheduledSession(scheduler).get(f'{url}/v1/me').status_code == 429
+        assert len(paths) == 1
+
+    def test_shared_client_uses_scheduler(self, scripted_server):
+        """Test that spotipy calls on the shared client are scheduled and retried"""
+        url, script, paths = scripted_server
+        script.append((429, {'Retry-After': '0'}))
+        manager = SpotifyClientManager()
+        client = manager.get_client(lambda: {'access_token': 't', 'expires_at': time.time() + 3600})
+        client.prefix = f'{url}/v1/'
+
+        with request_priority(BACKGROUND):
+            assert client.playlist_items('abc', limit=100) == {}
+
+        assert len(paths) == 2
+        endpoints = manager.get_metrics()['scheduler']['endpoints']
+        assert endpoints['GET /v1/playlists/{id}/items']['rate_limited'] == 1
+
+    def test_endpoint_names(self):
+        """Test that IDs are collapsed out of endpoint labels"""
+        assert endpoint_name('get', 'https://api.spotify.com/v1/users/someone/playlists') == 'GET /v1/users/{id}/playlists'
+        assert endpoint_name('POST', 'https://api.spotify.com/v1/me/playlists') == 'POST /v1/me/playlists'
+        assert endpoint_name('GET', 'https://api.spotify.com/v1/audio-features?ids=a,b') == 'GET /v1/audio-features'
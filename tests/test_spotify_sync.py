@@ -0,0 +1,488 @@
+import random
+import threading
+import time
+import pytest
+from datetime import datetime, timezone, timedelta
+from unittest.mock import MagicMock, patch
+from flask_app.models import Song, Playlist, SpotifySyncJob, db
+from flask_app.utils.spotify_jobs import run_spotify_sync_job
+from flask_app.utils.spotify_service import SpotifyService, compute_playlist_diff
+
+
+def apply_diff(base, diff):
+    """Apply a diff the way Spotify would, returning the resulting track list"""
+    removed = set(diff['remove'])
+    tracks = [uri for uri in base if uri not in removed]
+    for position, uris in diff['insert']:
+        assert len(uris) <= 100
+        tracks[position:position] = uris
+    return tracks
+
+
+class FakeSpotifyClient:
+    """In-memory stand-in for the spotipy playlist endpoints used by the sync"""
+
+    def __init__(self, tracks, snapshot_id='snap-0'):
+        self.tracks = list(tracks)
+        self.snapshot = 0
+        self.snapshot_id = snapshot_id
+        self.calls = []
+        self.fail_after = None  # Raise on the nth write, to simulate an outage mid-sync
+        self.page_delay = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.unavailable = set()  # Tracks Spotify has no audio features for
+
+    def _bump(self):
+        self.snapshot += 1
+        self.snapshot_id = f'snap-{self.snapshot}'
+        return {'snapshot_id': self.snapshot_id}
+
+    def playlist(self, playlist_id, fields=None):
+        self.calls.append('playlist')
+        return {'id': playlist_id, 'name': 'Remote', 'uri': f'spotify:playlist:{playlist_id}',
+                'external_urls': {}, 'snapshot_id': self.snapshot_id}
+
+    def playlist_items(self, playlist_id, fields=None, limit=100, offset=0):
+        with self.lock:
+            self.calls.append('playlist_items')
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.page_delay)
+        with self.lock:
+            self.in_flight -= 1
+        page = self.tracks[offset:offset + limit]
+        has_next = offset + limit < len(self.tracks)
+        return {'items': [{'track': {'uri': uri, 'type': 'track'}} for uri in page],
+                'next': 'next' if has_next else None, 'total': len(self.tracks)}
+
+    def audio_features(self, tracks):
+        with self.lock:
+            self.calls.append('audio_features')
+            if self.fail_after is not None and self.calls.count('audio_features') > self.fail_after:
+                raise RuntimeError('Spotify unavailable')
+        assert len(tracks) <= 100
+        return [None if uri in self.unavailable else {'uri': uri, 'danceability': 0.5, 'energy': 0.7, 'key': 5,
+                'loudness': -6.0, 'mode': 1, 'speechiness': 0.05, 'acousticness': 0.1, 'instrumentalness': 0.0,
+                'liveness': 0.1, 'valence': 0.6, 'tempo': 120.0 + len(uri), 'time_signature': 4}
+                for uri in tracks]
+
+    def current_user(self):
+        return {'id': 'me'}
+
+    def user_playlist_create(self, user, name, public=False, description=None):
+        self.calls.append('create')
+        return {'id': 'remote1', 'name': name, 'uri': 'spotify:playlist:remote1',
+                'external_urls': {}, 'snapshot_id': self.snapshot_id}
+
+    def _write(self, op):
+        if self.fail_after is not None and self.calls.count('remove') + self.calls.count('add') >= self.fail_after:
+            raise RuntimeError('Spotify unavailable')
+        self.calls.append(op)
+
+    def playlist_remove_all_occurrences_of_items(self, playlist_id, items, snapshot_id=None):
+        self._write('remove')
+        assert len(items) <= 100
+        removed = set(items)
+        self.tracks = [uri for uri in self.tracks if uri not in removed]
+        return self._bump()
+
+    def playlist_add_items(self, playlist_id, items, position=None):
+        self._write('add')
+        assert len(items) <= 100
+        position = len(self.tracks) if position is None else position
+        self.tracks[position:position] = items
+        return self._bump()
+
+
+def make_local_playlist(track_uris, synced_tracks, snapshot_id):
+    """Build a stand-in local playlist that was previously synced"""
+    playlist = MagicMock()
+    playlist.is_synced_to_spotify.return_value = True
+    playlist.spotify_playlist_id = 'remote1'
+    playlist.spotify_snapshot_id = snapshot_id
+    playlist.get_spotify_synced_tracks.return_value = synced_tracks
+    playlist.get_track_uris.return_value = track_uris
+    return playlist
+
+
+class TestComputePlaylistDiff:
+    """Test the pure playlist diff"""
+
+    def test_no_changes(self):
+        """Test that identical lists produce an empty diff"""
+        uris = [f'u{i}' for i in range(10)]
+        diff = compute_playlist_diff(uris, uris)
+        assert diff['remove'] == []
+        assert diff['insert'] == []
+
+    def test_add_remove_and_move(self):
+        """Test that a mix of edits is reproduced exactly"""
+        base = ['a', 'b', 'c', 'd', 'e']
+        target = ['e', 'a', 'c', 'x', 'd']
+        diff = compute_playlist_diff(base, target)
+
+        assert apply_diff(base, diff) == target
+        assert diff['added'] == 1
+        assert diff['removed'] == 1
+        assert diff['moved'] == 1
+
+    def test_duplicates_on_remote_are_collapsed(self):
+        """Test that tracks duplicated on Spotify end up once, in place"""
+        base = ['a', 'b', 'a', 'c']
+        target = ['a', 'b', 'c']
+        assert apply_diff(base, compute_playlist_diff(base, target)) == target
+
+    def test_random_edits(self):
+        """Test that random edits are always reproduced"""
+        rng = random.Random(42)
+        pool = [f'u{i}' for i in range(300)]
+        for _ in range(50):
+            base = rng.sample(pool, rng.randint(0, 250))
+            target = rng.sample(pool, rng.randint(0, 250))
+            assert apply_diff(base, compute_playlist_diff(base, target)) == target
+
+    def test_large_insert_is_batched(self):
+        """Test that a long run of new tracks is split into 100-track inserts"""
+        target = [f'u{i}' for i in range(250)]
+        diff = compute_playlist_diff([], target)
+        assert [position for position, _ in diff['insert']] == [0, 100, 200]
+        assert apply_diff([], diff) == target
+
+
+class TestIncrementalSpotifySync:
+    """Test SpotifyService.sync_local_to_spotify against an in-memory client"""
+
+    def sync(self, client, playlist):
+        service = SpotifyService()
+        with patch.object(SpotifyService, 'get_client', return_value=client):
+            return service.sync_local_to_spotify(playlist)
+
+    def test_small_change_to_large_playlist(self, app):
+        """Test that 3 edits to a 5,000 track playlist take a handful of calls"""
+        with app.app_context():
+            base = [f'spotify:track:{i}' for i in range(5000)]
+            target = list(base)
+            target.remove('spotify:track:10')
+            target.insert(2500, 'spotify:track:new')
+            target.insert(0, target.pop(4000))
+            client = FakeSpotifyClient(base)
+
+            result, error = self.sync(client, make_local_playlist(target, base, client.snapshot_id))
+
+            assert error is None
+            assert client.tracks == target
+            assert 'playlist_items' not in client.calls
+            assert len(client.calls) <= 5
+            assert result['changes']['api_calls'] == len(client.calls)
+            assert result['snapshot_id'] == client.snapshot_id
+            assert result['track_uris'] == target
+
+    def test_stale_snapshot_rereads_remote(self, app):
+        """Test that edits made on Spotify are picked up before diffing"""
+        with app.app_context():
+            local = [f'spotify:track:{i}' for i in range(150)]
+            remote = local[:100] + ['spotify:track:remote-only'] + local[100:]
+            client = FakeSpotifyClient(remote, snapshot_id='changed-on-spotify')
+
+            result, error = self.sync(client, make_local_playlist(local, local, 'old-snapshot'))
+
+            assert error is None
+            assert client.tracks == local
+            assert client.calls.count('playlist_items') == 2
+            assert result['changes']['removed'] == 1
+
+
+@pytest.fixture
+def library(app):
+    """Create 250 local songs"""
+    songs = [Song(track_uri=f'spotify:track:{i}', track_name=f'Song {i}', artist_names='Artist') for i in range(250)]
+    db.session.add_all(songs)
+    db.session.commit()
+    return [song.track_uri for song in songs]
+
+
+class TestSpotifySyncJobs:
+    """Test background export/import jobs and resuming them"""
+
+    def run_job(self, app, job, client):
+        with patch.object(SpotifyService, 'get_client', return_value=client):
+            run_spotify_sync_job(job.id, app)
+        db.session.expire_all()
+        return db.session.get(SpotifySyncJob, job.id)
+
+    def test_export_resumes_after_failed_batch(self, app, logged_in_user, library):
+        """Test that a resumed export only sends the batches that had not completed"""
+        _, user = logged_in_user
+        playlist, _ = Playlist.create_for_user(user.id, 'Big')
+        playlist.add_songs(library)
+        job, _ = SpotifySyncJob.create(user.id, 'export', playlist_id=playlist.id)
+        client = FakeSpotifyClient([])
+        client.fail_after = 1
+
+        job = self.run_job(app, job, client)
+
+        assert job.status == 'failed'
+        assert job.can_resume()
+        assert (job.completed_batches, job.total_batches) == (1, 3)
+        assert client.tracks == library[:100]
+
+        client.fail_after = None
+        job = self.run_job(app, job, client)
+
+        assert job.status == 'completed'
+        assert job.to_dict()['progress_percent'] == 100
+        assert client.tracks == library
+        assert client.calls.count('create') == 1
+        assert client.calls.count('add') == 3
+        assert db.session.get(Playlist, playlist.id).spotify_playlist_id == 'remote1'
+
+    def test_stale_runner_stops_once_its_job_is_claimed_again(self, app, logged_in_user, library):
+        """Test that a runner whose job was failed as stale and resumed elsewhere writes nothing more"""
+        _, user = logged_in_user
+        playlist, _ = Playlist.create_for_user(user.id, 'Big')
+        playlist.add_songs(library)
+        job, _ = SpotifySyncJob.create(user.id, 'export', playlist_id=playlist.id)
+        client = FakeSpotifyClient([])
+        add_items = client.playlist_add_items
+        claims = []
+
+        def slow_add_items(playlist_id, items, position=None):
+            result = add_items(playlist_id, items, position)
+            if not claims:
+                # The first write outlives the lease: the job is failed and claimed by another runner
+                SpotifySyncJob.fail_stale(lease_seconds=-1)
+                claims.append(SpotifySyncJob.claim(job.id))
+            return result
+
+        client.playlist_add_items = slow_add_items
+        job = self.run_job(app, job, client)
+
+        assert claims[0] is not None
+        assert client.calls.count('add') == 1
+        assert (job.status, job.claim_token, job.completed_batches) == ('running', claims[0], 0)
+
+    def test_a_job_is_claimed_once(self, app, logged_in_user):
+        """Test that only one of two resumes of a failed job gets to run it"""
+        _, user = logged_in_user
+        job, _ = SpotifySyncJob.create(user.id, 'import', spotify_playlist_id='remote1')
+        SpotifySyncJob.query.filter_by(id=job.id).update({'status': 'failed'})
+        db.session.commit()
+
+        first = SpotifySyncJob.claim(job.id)
+
+        assert first is not None
+        assert SpotifySyncJob.claim(job.id) is None
+        assert db.session.get(SpotifySyncJob, job.id).status == 'running'
+
+    def test_import_resumes_after_failed_insert(self, app, logged_in_user, library):
+        """Test that pages stored before a failure are kept and a resumed import continues after them"""
+        _, user = logged_in_user
+        remote = library + ['spotify:track:unknown']
+        job, _ = SpotifySyncJob.create(user.id, 'import', spotify_playlist_id='remote1', options={'name': 'Imported'})
+        client = FakeSpotifyClient(remote)
+        add_songs = Playlist.add_songs
+        calls = []
+
+        def failing_add_songs(self, uris):
+            calls.append(uris)
+            if len(calls) == 2:
+                return [], [{'track_uri': uris[0], 'error': 'database is locked'}]
+            return add_songs(self, uris)
+
+        with patch.object(Playlist, 'add_songs', failing_add_songs):
+            job = self.run_job(app, job, client)
+
+        assert job.status == 'failed'
+        assert job.processed_tracks == 100
+        assert (job.completed_batches, job.total_batches, job.total_tracks) == (1, 3, 251)
+        assert db.session.get(Playlist, job.playlist_id).get_track_uris() == library[:100]
+
+        client.calls = []
+        job = self.run_job(app, job, client)
+
+        assert job.status == 'completed'
+        assert client.calls.count('playlist_items') == 2
+        assert job.processed_tracks == 251
+        assert (job.completed_batches, job.total_batches) == (3, 3)
+        assert (job.added_count, job.skipped_count) == (250, 1)
+        assert Playlist.query.count() == 1
+        assert db.session.get(Playlist, job.playlist_id).get_track_uris() == library
+
+    def test_large_import_fetches_pages_concurrently(self, app, logged_in_user, library):
+        """Test that a 10,000 track import fetches pages in parallel and stores them in order as they arrive"""
+        _, user = logged_in_user
+        remote = [f'spotify:track:{i}' for i in range(10000)]
+        random.Random(7).shuffle(remote)
+        client = FakeSpotifyClient(remote)
+        client.page_delay = 0.005
+        offsets = []
+
+        with patch.object(Playlist, 'add_songs', autospec=True, side_effect=Playlist.add_songs) as add_songs, \
+                patch.object(SpotifyService, 'get_client', return_value=client):
+            result, error = SpotifyService().sync_spotify_to_local(
+                'remote1', user.id, on_page=lambda playlist, next_offset, *counts: offsets.append(next_offset)
+            )
+
+        assert error is None
+        assert client.calls.count('playlist_items') == 100
+        assert client.max_in_flight > 1
+        assert add_songs.call_count == 100
+        assert offsets == list(range(100, 10001, 100))
+        assert (result['added_count'], result['skipped_count']) == (250, 9750)
+        assert result['playlist'].get_track_uris() == [uri for uri in remote if uri in set(library)]
+
+    def test_routes_queue_job_and_report_status(self, logged_in_user):
+        """Test that export returns a job id immediately and its status can be polled"""
+        client, user = logged_in_user
+        playlist, _ = Playlist.create_for_user(user.id, 'Mine')
+
+        with patch('flask_app.routes.music.start_spotify_sync_job') as start:
+            response = client.post(f'/music/playlists/{playlist.id}/export-to-spotify', json={})
+            assert response.status_code == 200
+            job_id = response.get_json()['job_id']
+            assert start.call_count == 1
+
+            # A second export of the same playlist is refused while the first is queued
+            assert client.post(f'/music/playlists/{playlist.id}/export-to-spotify', json={}).status_code == 409
+
+            status = client.get(f'/music/spotify/jobs/status?job_id={job_id}').get_json()
+            assert status['status'] == 'queued'
+            assert status['direction'] == 'export'
+
+            assert client.post(f'/music/spotify/jobs/{job_id}/resume').status_code == 400
+            SpotifySyncJob.query.filter_by(id=job_id).update({'status': 'failed'})
+            db.session.commit()
+            assert client.post(f'/music/spotify/jobs/{job_id}/resume').status_code == 200
+            assert start.call_count == 2
+
+        assert client.get('/music/spotify/jobs/status').status_code == 400
+        assert client.get('/music/spotify/jobs/status?job_id=missing').status_code == 404
+
+    def test_interrupted_job_is_failed_after_its_lease(self, app, logged_in_user):
+        """Test that a job left running by a dead process stops blocking exports and can be resumed"""
+        client, user = logged_in_user
+        playlist, _ = Playlist.create_for_user(user.id, 'Mine')
+        job, _ = SpotifySyncJob.create(user.id, 'export', playlist_id=playlist.id)
+        job_id = job.id
+        lease = app.config['SPOTIFY_JOB_LEASE_SECONDS']
+        SpotifySyncJob.query.filter_by(id=job_id).update({
+            'status': 'running', 'updated_at': datetime.now(timezone.utc) - timedelta(seconds=lease - 10)
+        })
+        db.session.commit()
+
+        assert SpotifySyncJob.fail_stale() == (0, None)
+
+        SpotifySyncJob.query.filter_by(id=job_id).update({
+            'updated_at': datetime.now(timezone.utc) - timedelta(seconds=lease + 10)
+        })
+        db.session.commit()
+
+        with patch('flask_app.routes.music.start_spotify_sync_job') as start:
+            assert client.post(f'/music/playlists/{playlist.id}/export-to-spotify', json={}).status_code == 200
+            status = client.get(f'/music/spotify/jobs/status?job_id={job_id}').get_json()
+            assert status['status'] == 'failed'
+            assert status['can_resume']
+            assert status['error_message'].startswith('Interrupted')
+            assert client.post(f'/music/spotify/jobs/{job_id}/resume').status_code == 200
+            assert start.call_count == 2
+
+
+class TestAudioFeatureEnrichment:
+    """Test the background job filling in missing audio features"""
+
+    def run_job(self, app, job, client):
+        with patch.object(SpotifyService, 'get_client', return_value=client):
+            run_spotify_sync_job(job.id, app)
+        db.session.expire_all()
+        return db.session.get(SpotifySyncJob, job.id)
+
+    def test_enrich_in_full_batches(self, app, logged_in_user, library):
+        """Test that missing features are fetched 100 at a time and stored"""
+        _, user = logged_in_user
+        complete = db.session.get(Song, library[0])
+        complete.danceability, complete.energy, complete.key, complete.loudness = 0.1, 0.1, 1, -1.0
+        complete.mode, complete.speechiness, complete.acousticness, complete.instrumentalness = 0, 0.1, 0.1, 0.1
+        complete.liveness, complete.valence, complete.tempo, complete.time_signature = 0.1, 0.1, 90.0, 3
+        db.session.commit()
+        client = FakeSpotifyClient([])
+        client.unavailable = {library[5]}
+
+        job, _ = SpotifySyncJob.create(user.id, 'enrich')
+        job = self.run_job(app, job, client)
+
+        assert job.status == 'completed'
+        assert client.calls == ['audio_features'] * 3
+        assert (job.total_tracks, job.processed_tracks) == (249, 249)
+        assert (job.added_count, job.skipped_count) == (248, 1)
+        assert db.session.get(Song, library[0]).tempo == 90.0
+        assert db.session.get(Song, library[1]).tempo == 120.0 + len(library[1])
+        assert db.session.get(Song, library[5]).tempo is None
+        assert Song.count_missing_audio_features() == 1
+
+    def test_enrich_resumes_after_failure(self, app, logged_in_user, library):
+        """Test that a resumed job skips batches it already stored"""
+        _, user = logged_in_user
+        client = FakeSpotifyClient([])
+        client.fail_after = 1
+
+        job, _ = SpotifySyncJob.create(user.id, 'enrich')
+        job = self.run_job(app, job, client)
+
+        assert job.status == 'failed'
+        assert job.completed_batches == 1
+        assert Song.count_missing_audio_features() == 150
+
+        client.fail_after = None
+        client.calls = []
+        job = self.run_job(app, job, client)
+
+        assert job.status == 'completed'
+        assert client.calls == ['audio_features'] * 2
+        assert job.added_count == 250
+        assert Song.count_missing_audio_features() == 0
+
+    def test_enriched_songs_join_smart_playlists(self, app, logged_in_user, library):
+        """Test that songs whose new features match a smart playlist's rules are added to it"""
+        import json
+        from flask_app.utils.smart_playlists import compile_rules, materialize_playlist
+        _, user = logged_in_user
+        rule_set, _ = compile_rules([{'field': 'tempo', 'op': 'between', 'value': [134.5, 135.5]}])
+        playlist, _ = Playlist.create_for_user(user.id, 'Smart')
+        playlist.safe_update(smart_rules=json.dumps(rule_set))
+        assert materialize_playlist(playlist) == (0, None)
+
+        job, _ = SpotifySyncJob.create(user.id, 'enrich')
+        job = self.run_job(app, job, FakeSpotifyClient([]))
+
+        assert job.status == 'completed'
+        playlist = db.session.get(Playlist, playlist.id)
+        assert sorted(playlist.get_track_uris()) == sorted(f'spotify:track:{i}' for i in range(10))
+        assert playlist.song_count == 10
+
+    def test_enrich_route(self, logged_in_admin, library):
+        """Test that the enrichment route queues one job at a time"""
+        admin_client, _ = logged_in_admin
+
+        with patch('flask_app.routes.music.start_spotify_sync_job') as start:
+            response = admin_client.post('/music/spotify/enrich-features')
+            assert response.status_code == 200
+            assert response.get_json()['missing_count'] == 250
+            assert admin_client.post('/music/spotify/enrich-features').status_code == 409
+            assert start.call_count == 1
+
+            # A job abandoned by a restart stops blocking enrichment once its lease expires
+            SpotifySyncJob.query.update({
+                'status': 'running', 'updated_at': datetime.now(timezone.utc) - timedelta(hours=1)
+            })
+            db.session.commit()
+            assert admin_client.post('/music/spotify/enrich-features').status_code == 200
+            assert start.call_count == 2
+            assert [job.status for job in SpotifySyncJob.query.order_by(SpotifySyncJob.created_at)] == ['failed', 'queued']
+
+    def test_enrich_route_is_admin_only(self, logged_in_user, library):
+        """Test that regular users cannot start enrichment"""
+        client, _ = logged_in_user
+        assert client.post('/music/spotify/enrich-features').status_code == 302
+        assert SpotifySyncJob.query.count() == 0